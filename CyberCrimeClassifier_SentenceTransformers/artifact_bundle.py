@@ -0,0 +1,237 @@
+"""
+artifact_bundle.py
+
+Frozen, versioned classifier bundle for near-instant startup.
+
+`python artifact_bundle.py build --out bundles/v1` loads the classifier once and
+writes everything serving needs into one directory:
+
+    metadata.json          format version, bundle id, model/tokenizer versions, file hashes
+    tokenizer/             encoder fast tokenizer files
+    model/config.json      encoder config
+    model/model.safetensors  every parameter and buffer of the encoder
+    prototypes.npy         row-normalized float32 prototype matrix (or centroid bank)
+    keyword_tables.json    keyword tables and prototype phrases used by classify()
+    spacy/                 en_core_web_sm pipeline (if spaCy is installed)
+
+With CLASSIFIER_BUNDLE_DIR pointing at a bundle, FraudClassifier.load_model()
+opens it instead of contacting HuggingFace or embedding prototypes: the encoder
+is built on the meta device and its tensors are views into a private mmap of
+model.safetensors, and the prototype matrix is mmap'd as well. Pages are read
+lazily and shared through the page cache by every process on the host.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+
+# FraudClassifier attributes frozen into keyword_tables.json
+KEYWORD_TABLE_ATTRS = [
+    "financial_keywords", "social_keywords", "platform_keywords", "issue_keywords", "prototype_texts",
+    "prototype_phrases",
+    "fraud_call_signals", "call_focus_words", "completed_transaction_words", "social_signals",
+    "financial_signals", "strong_signals", "platform_variations", "issue_variations",
+    "issue_inference", "platform_context", "stage_words",
+]
+
+_SAFETENSORS_DTYPES = {
+    "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def mmap_safetensors(path: str) -> Dict[str, torch.Tensor]:
+    """
+    Tensors of a .safetensors file as zero-copy views into one private
+    (copy-on-write) memory map of the file.
+    """
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+    nbytes = os.path.getsize(path)
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=nbytes)
+    raw = torch.empty(0, dtype=torch.uint8).set_(storage)
+    base = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        tensors[name] = raw[base + start:base + end].view(dtype).reshape(info["shape"])
+    return tensors
+
+
+def _assign(module: torch.nn.Module, name: str, tensor: torch.Tensor):
+    *path, leaf = name.split(".")
+    for part in path:
+        module = getattr(module, part)
+    if leaf in module._parameters:
+        module._parameters[leaf] = torch.nn.Parameter(tensor, requires_grad=False)
+    else:
+        module._buffers[leaf] = tensor
+
+
+def load_mmap_model(model_dir: str):
+    """Build the encoder on the meta device and point every tensor at the mmap'd weights."""
+    from transformers import AutoConfig, AutoModel
+    from transformers.modeling_utils import no_init_weights
+
+    config = AutoConfig.from_pretrained(model_dir)
+    # no allocation and no random init: every tensor is replaced below
+    with no_init_weights(), torch.device("meta"):
+        model = AutoModel.from_config(config)
+    for name, tensor in mmap_safetensors(os.path.join(model_dir, "model.safetensors")).items():
+        _assign(model, name, tensor)
+    missing = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if missing:
+        raise ValueError(f"Bundle weights are missing tensors: {missing[:5]}")
+    model.eval()
+    return model
+
+
+def save_model(model: torch.nn.Module, model_dir: str):
+    from safetensors.torch import save_file
+
+    os.makedirs(model_dir, exist_ok=True)
+    model.config.save_pretrained(model_dir)
+    # buffers too (e.g. position_ids is not part of the persistent state dict)
+    tensors = {n: t.detach().cpu().contiguous() for n, t in model.named_parameters()}
+    tensors.update({n: t.detach().cpu().contiguous() for n, t in model.named_buffers()})
+    save_file(tensors, os.path.join(model_dir, "model.safetensors"), metadata={"format": "pt"})
+
+
+def build(out_dir: str, include_spacy: bool = True) -> Dict[str, Any]:
+    """Load the classifier from its usual sources and freeze it into out_dir."""
+    from classifier import FraudClassifier, tokenizer_version
+    import transformers
+    import entity_extractor
+
+    classifier = FraudClassifier(backend="torch", prototype_cache_dir=None)
+    embedder = classifier.embedder
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".bundle-")
+    os.chmod(staging, 0o755)
+    embedder.tokenizer.save_pretrained(os.path.join(staging, "tokenizer"))
+    save_model(embedder.model, os.path.join(staging, "model"))
+    np.save(os.path.join(staging, "prototypes.npy"), np.ascontiguousarray(classifier.proto_matrix, dtype=np.float32))
+    tables = {attr: getattr(classifier, attr) for attr in KEYWORD_TABLE_ATTRS}
+    with open(os.path.join(staging, "keyword_tables.json"), "w", encoding="utf-8") as f:
+        json.dump(tables, f, ensure_ascii=False, indent=1)
+    nlp = entity_extractor.load_nlp() if include_spacy else None
+    if nlp is not None:
+        nlp.to_disk(os.path.join(staging, "spacy"))
+
+    files = {}
+    for root, _, names in os.walk(staging):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, staging).replace(os.sep, "/")] = _sha256(path)
+    bundle_id = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:16]
+    metadata = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "bundle_id": bundle_id,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model_name": embedder.model_name,
+        "tokenizer_version": tokenizer_version(embedder.tokenizer),
+        "transformers_version": transformers.__version__,
+        "torch_version": torch.__version__,
+        "prototype_keys": list(classifier.proto_row_keys),
+        "prototype_centroids": classifier.prototype_centroids,
+        "prototype_row_norms": [float(n) for n in classifier.proto_row_norms],
+        "tables_version": classifier.tables_version,
+        "prototype_shape": list(classifier.proto_matrix.shape),
+        "has_spacy": nlp is not None,
+        "files": files,
+    }
+    with open(os.path.join(staging, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(staging, out_dir)
+    logger.info(f"Wrote bundle {bundle_id} to {out_dir}")
+    return metadata
+
+
+def read_metadata(bundle_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(bundle_dir, "metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    if metadata.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {metadata.get('format_version')} in {bundle_dir}")
+    return metadata
+
+
+def read_keyword_tables(bundle_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(bundle_dir, "keyword_tables.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_prototypes(bundle_dir: str, metadata: Dict[str, Any]) -> np.ndarray:
+    matrix = np.load(os.path.join(bundle_dir, "prototypes.npy"), mmap_mode="r")
+    if list(matrix.shape) != metadata["prototype_shape"]:
+        raise ValueError(f"prototypes.npy shape {matrix.shape} does not match bundle metadata")
+    return matrix
+
+
+def spacy_model(bundle_dir: Optional[str], default: str = "en_core_web_sm") -> str:
+    """spaCy pipeline to load: the bundled copy if there is one."""
+    if bundle_dir and os.path.isdir(os.path.join(bundle_dir, "spacy")):
+        return os.path.join(bundle_dir, "spacy")
+    return default
+
+
+def verify(bundle_dir: str) -> List[str]:
+    """Paths whose content no longer matches the hashes recorded at build time."""
+    metadata = read_metadata(bundle_dir)
+    return [rel for rel, digest in metadata["files"].items()
+            if not os.path.exists(os.path.join(bundle_dir, rel)) or _sha256(os.path.join(bundle_dir, rel)) != digest]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or inspect a frozen classifier bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="load the classifier and write a bundle")
+    build_cmd.add_argument("--out", required=True, help="bundle directory to (re)create")
+    build_cmd.add_argument("--no-spacy", action="store_true", help="leave the spaCy pipeline out")
+    info_cmd = sub.add_parser("info", help="print bundle metadata and verify file hashes")
+    info_cmd.add_argument("bundle_dir")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        meta = build(args.out, include_spacy=not args.no_spacy)
+        print(f"✅ Bundle {meta['bundle_id']} written to {args.out}")
+    else:
+        meta = read_metadata(args.bundle_dir)
+        print(json.dumps({k: v for k, v in meta.items() if k != "files"}, indent=2, ensure_ascii=False))
+        corrupted = verify(args.bundle_dir)
+        if corrupted:
+            print(f"❌ Modified or missing files: {corrupted}")
+            sys.exit(1)
+        print(f"✅ {len(meta['files'])} files match their recorded hashes")
@@ -0,0 +1,125 @@
+"""
+backbones.py
+
+Side-by-side evaluation of encoder backbones (CLASSIFIER_MODEL_NAME) on the
+labelled example corpus (see corpus.py).
+
+    python backbones.py compare [--models distilbert,minilm-l6,minilm-l3] [--out backbones.json]
+
+Every backbone is evaluated in a fresh interpreter with CLASSIFIER_MODEL_NAME
+set, so startup is measured cold: import, model + prototype load (the prototype
+cache is per backbone) and first classify(). The child then classifies every
+example (regression.evaluate) and reports primary / subcategory / priority
+accuracy, classify() latency, peak RSS, parameter count and embedding size.
+The torch engine is used and CLASSIFIER_BUNDLE_DIR is ignored.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger("backbones")
+
+DEFAULT_MODELS = "distilbert,minilm-l6,minilm-l3"
+
+
+def evaluate_backbone(repeat: int = 3) -> Dict[str, Any]:
+    """Startup, accuracy, latency and memory of the configured backbone; call in a fresh interpreter."""
+    start = time.perf_counter()
+    from benchmark import environment, peak_rss_mb
+    from classifier import FraudClassifier
+    from corpus import load_examples
+    from regression import evaluate
+
+    imported = time.perf_counter()
+    classifier = FraudClassifier(backend="torch", bundle_dir=None)
+    loaded = time.perf_counter()
+    examples = load_examples()
+    classifier.classify(examples[0]["text"])
+    classified = time.perf_counter()
+
+    result = evaluate(classifier.classify, examples, repeat)
+    model = classifier.embedder.model
+    return {
+        "environment": environment(classifier),
+        "parameters": sum(p.numel() for p in model.parameters()),
+        "dim": classifier.embedder.dim,
+        "layers": classifier.embedder.n_layers,
+        "startup": {
+            "import_s": imported - start,
+            "model_load_s": loaded - imported,
+            "first_classify_s": classified - loaded,
+            "total_s": classified - start,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "accuracy": result["accuracy"],
+        "latency": result["latency"],
+    }
+
+
+def measure_backbone(model: str, repeat: int = 3) -> Dict[str, Any]:
+    env = dict(os.environ, CLASSIFIER_MODEL_NAME=model)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "evaluate", "--repeat", str(repeat)],
+                         env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(models: List[str], repeat: int = 3) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "backbones": {},
+    }
+    for model in models:
+        logger.info(f"Evaluating backbone '{model}'")
+        report["backbones"][model] = measure_backbone(model, repeat)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    width = max([14] + [len(name) for name in report["backbones"]])
+    lines = [f"{'backbone':{width}s} {'params':>7s} {'dim':>4s} {'primary':>9s} {'sub':>9s} {'priority':>9s} "
+             f"{'p50 ms':>7s} {'p95 ms':>7s} {'start s':>7s} {'RSS MB':>7s}"]
+    for name, result in report["backbones"].items():
+        if "error" in result:
+            lines.append(f"{name:{width}s} {result['error']}")
+            continue
+        acc = [result["accuracy"][k] for k in ("primary", "subcategory", "priority")]
+        cells = " ".join(f"{a['correct']:>4d}/{a['total']:<4d}" for a in acc)
+        lat, rss = result["latency"], result["peak_rss_mb"]
+        rss_cell = "n/a" if rss is None else f"{rss:.0f}"  # no getrusage on Windows
+        lines.append(f"{name:{width}s} {result['parameters'] / 1e6:6.1f}M {result['dim']:4d} {cells} "
+                     f"{lat['p50_ms']:7.2f} {lat['p95_ms']:7.2f} {result['startup']['total_s']:7.2f} "
+                     f"{rss_cell:>7s}")
+    return lines
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_compare = sub.add_parser("compare", help="evaluate several backbones side by side")
+    p_compare.add_argument("--models", default=DEFAULT_MODELS,
+                           help="comma-separated short names (classifier.BACKBONES) or HuggingFace ids")
+    p_compare.add_argument("--repeat", type=int, default=3, help="classify() runs per example for its latency")
+    p_compare.add_argument("--out", help="write the JSON report here")
+    p_eval = sub.add_parser("evaluate", help="evaluate the configured backbone in this process (JSON on stdout)")
+    p_eval.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "evaluate":
+        print(json.dumps(evaluate_backbone(args.repeat)))
+        sys.exit(0)
+    final = compare([m.strip() for m in args.models.split(",") if m.strip()], repeat=args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(final, f, indent=2, ensure_ascii=False)
+    print("\n".join(format_report(final)))
+    sys.exit(1 if any("error" in r for r in final["backbones"].values()) else 0)
@@ -0,0 +1,209 @@
+"""
+batcher.py
+
+Request-coalescing micro-batcher for the classifier.
+
+Concurrent callers submit complaint texts; a single worker thread collects them
+for up to `window_ms` (or until `max_batch_size` texts are waiting), embeds the
+whole batch with one padded DistilBERT forward pass via
+FraudClassifier.classify_batch, and routes each result back to its caller's
+Future. Queue depth and batch-size statistics are kept for the stats endpoint.
+
+The worker thread is the only place model work runs for /classify and
+/classify/batch, so admission control happens here: at most `max_queue` texts
+may be queued or in the running batch, and submissions beyond that raise
+Overloaded (reason="queue_full") right away. Each submission reports how long
+it waited for its batch separately from the forward pass itself. stop() fails
+the submissions the worker has not started with RuntimeError.
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+import math
+import queue
+import threading
+import time
+
+from inference_executor import Overloaded, TimedResult, summarize
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_WINDOW = 1000  # recent submissions kept for latency percentiles
+
+
+class MicroBatcher:
+    def __init__(self, classifier, max_batch_size: int = 16, window_ms: float = 5.0, max_queue: int = 0):
+        self.classifier = classifier
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_s = max(0.0, float(window_ms)) / 1000.0
+        self.max_queue = max(0, int(max_queue))  # 0: unbounded
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._carry = None  # submission that did not fit into the previous batch
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # texts queued or in the running batch
+        self._mean_forward: float | None = None  # EWMA of classify_batch time (seconds)
+        # statistics
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._last_batch_size = 0
+        self._batch_size_counts: Dict[int, int] = {}
+        self._rejected = 0
+        self._waits: Deque[float] = deque(maxlen=_WINDOW)
+        self._forwards: Deque[float] = deque(maxlen=_WINDOW)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="classify-batcher", daemon=True)
+            self._thread.start()
+        logger.info(f"Micro-batcher started (max_batch_size={self.max_batch_size}, window_ms={self.window_s * 1000:g})")
+
+    def stop(self, timeout: float | None = 5.0):
+        """Stop the worker; the running batch finishes, queued submissions fail."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None  # no submission is admitted from here on
+        if thread is None:
+            return
+        self._fail_queued()
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._fail_queued()  # taken back by a worker that outlived the join timeout
+
+    def _fail_queued(self):
+        items, stop = [], False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+            else:
+                items.append(item)
+        if stop:
+            self._queue.put(_STOP)  # still meant for a worker busy past the join timeout
+        error = RuntimeError("MicroBatcher stopped before this submission ran")
+        with self._lock:
+            self._pending -= sum(len(item[0]) for item in items)
+        for _, fut, _ in items:
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(error)
+
+    def _retry_after(self) -> int:
+        # time to drain the queued batches, at least one second
+        per_batch = self._mean_forward or 0.1
+        return max(1, math.ceil(self._pending / self.max_batch_size * per_batch))
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queue texts that must stay in one forward pass (a /classify/batch chunk may
+        exceed max_batch_size). The Future resolves to a TimedResult: the classify()
+        tuples, the wait for the batch to start and the batch's forward time.
+        """
+        fut: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                raise RuntimeError("MicroBatcher is not running; call start() first")
+            # a submission larger than max_queue is still admitted when nothing else is waiting
+            if self.max_queue and self._pending and self._pending + len(texts) > self.max_queue:
+                self._rejected += 1
+                raise Overloaded("queue_full", self._retry_after())
+            self._pending += len(texts)
+            # queued under the lock, so stop() sees every admitted submission
+            self._queue.put((list(texts), fut, time.monotonic()))
+        return fut
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "pending_texts": self._pending,
+                "max_queue": self.max_queue,
+                "rejected_queue_full": self._rejected,
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window_s * 1000,
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "last_batch_size": self._last_batch_size,
+                "batch_size_counts": {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+                "batch_wait": summarize(self._waits),
+                "forward": summarize(self._forwards),
+            }
+
+    def _collect(self, first) -> Tuple[List[Tuple[List[str], Future, float]], bool]:
+        """Gather a batch starting with `first`; returns (batch, stop_requested)."""
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.window_s
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item  # starts the next batch
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self):
+        while True:
+            first, self._carry = self._carry or self._queue.get(), None
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List[Tuple[List[str], Future, float]]):
+        # callers that gave up (cancelled) are dropped before the forward pass
+        live = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        texts = [text for item in live for text in item[0]]
+        started = time.monotonic()
+        results, error = [], None
+        if texts:
+            try:
+                results = self.classifier.classify_batch(texts)
+            except Exception as e:
+                logger.warning(f"Batched classification failed for {len(texts)} texts: {e}")
+                error = e
+        forward = time.monotonic() - started
+
+        size = len(texts)
+        with self._lock:
+            # freed before the callers resume, so they can submit again right away
+            self._pending -= sum(len(item[0]) for item in batch)
+            if size:
+                self._batches += 1
+                self._items += size
+                self._largest_batch = max(self._largest_batch, size)
+                self._last_batch_size = size
+                self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            if size and error is None:
+                self._waits.extend(started - enqueued for _, _, enqueued in live)
+                self._forwards.append(forward)
+                self._mean_forward = forward if self._mean_forward is None else 0.8 * self._mean_forward + 0.2 * forward
+
+        offset = 0
+        for item_texts, fut, enqueued in live:
+            if error is not None:
+                fut.set_exception(error)
+                continue
+            item_results = results[offset:offset + len(item_texts)]
+            offset += len(item_texts)
+            fut.set_result(TimedResult(item_results, started - enqueued, forward))
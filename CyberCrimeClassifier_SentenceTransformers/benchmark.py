@@ -0,0 +1,327 @@
+"""
+benchmark.py
+
+In-process latency and throughput benchmark of FraudClassifier.classify() and
+extract_entities() on a fixed corpus (the example complaints of corpus.py).
+
+    python benchmark.py run --out bench.json
+    python benchmark.py run --out bench-int8.json --backend onnx-int8 --threads 1,4
+    python benchmark.py compare bench.json bench-int8.json
+
+`run` measures, and writes to one JSON file:
+
+    cold_start   import, model load, first classify and first extract_entities
+                 times plus peak RSS, measured in a fresh interpreter
+    latency      p50/p95/p99 per stage over --repeat passes of the corpus, one
+                 text at a time: tokenize / forward / scoring (raw samples of
+                 classifier_phase_seconds), rules (classify minus those phases),
+                 classify, extract_entities, spacy and total
+    throughput   texts/s of classify_batch() + extract_entities_batch() for every
+                 --batch-sizes x --threads combination (torch intra-op threads)
+    peak_rss_mb  of the benchmark process
+
+together with the engine (backend, bundle, model, sequence length) and library
+versions, so files from different engines or releases can be compared with
+`compare`.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from config import Config
+
+logger = logging.getLogger("benchmark")
+
+RESULTS_VERSION = 1
+
+PERCENTILES = (0.50, 0.95, 0.99)
+EMBEDDING_PHASES = ("tokenize", "forward", "scoring")
+LATENCY_STAGES = EMBEDDING_PHASES + ("rules", "classify", "extract_entities", "spacy", "total")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """count, mean and p50/p95/p99/max of latency samples (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered), "mean_ms": sum(ordered) / len(ordered) * 1000}
+    for q in PERCENTILES:
+        summary[f"p{int(q * 100)}_ms"] = percentile(ordered, q) * 1000
+    summary["max_ms"] = ordered[-1] * 1000
+    return summary
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB on Linux
+
+
+def fixed_corpus(size: int = 0) -> List[str]:
+    """The unique example texts, cycled to `size` texts when size is larger."""
+    from corpus import load_texts
+
+    texts = load_texts()
+    if size > len(texts):
+        texts = [texts[i % len(texts)] for i in range(size)]
+    return texts
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_HERE, capture_output=True,
+                             text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment(classifier) -> Dict[str, Any]:
+    """Engine settings and library versions the numbers depend on."""
+    import numpy
+    import torch
+    import transformers
+    import entity_extractor
+
+    embedder = classifier.embedder
+    return {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "numpy": numpy.__version__,
+        "backend": classifier.backend,
+        "bundle_id": classifier.bundle_id,
+        "model_name": getattr(embedder, "model_name", None),
+        "max_seq_length": getattr(embedder, "max_length", Config.MAX_SEQ_LENGTH),
+        "long_doc_pooling": classifier.long_doc_pooling,
+        "spacy_loaded": entity_extractor.nlp is not None,
+    }
+
+
+def load_spacy():
+    import artifact_bundle
+    from entity_extractor import load_nlp
+
+    return load_nlp(artifact_bundle.spacy_model(Config.BUNDLE_DIR))
+
+
+def cold_start(backend: str) -> Dict[str, Any]:
+    """Startup phases of this (fresh) interpreter; `run` calls it in a subprocess."""
+    start = time.perf_counter()
+    from classifier import FraudClassifier
+    from entity_extractor import extract_entities
+
+    imported = time.perf_counter()
+    classifier = FraudClassifier(backend=backend)
+    loaded = time.perf_counter()
+    load_spacy()
+    spacy_loaded = time.perf_counter()
+    text = fixed_corpus()[0]
+    classifier.classify(text)
+    classified = time.perf_counter()
+    extract_entities(text)
+    extracted = time.perf_counter()
+    return {
+        "import_s": imported - start,
+        "model_load_s": loaded - imported,
+        "spacy_load_s": spacy_loaded - loaded,
+        "first_classify_s": classified - spacy_loaded,
+        "first_extract_entities_s": extracted - classified,
+        "total_s": extracted - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure_cold_start(backend: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "cold-start", "--backend", backend],
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - started  # includes interpreter startup
+    return result
+
+
+def measure_latency(classifier, texts: List[str], repeat: int, ner: bool = True) -> Dict[str, Dict[str, float]]:
+    """Per-stage latency summaries, classifying and extracting one text at a time."""
+    import metrics
+    from entity_extractor import extract_entities
+
+    for text in texts[:8]:  # warm-up: first forward passes allocate
+        classifier.classify(text)
+    stages: Dict[str, List[float]] = {"rules": [], "classify": [], "total": []}
+    with metrics.PHASE_SECONDS.capture() as phases:
+        for _ in range(repeat):
+            for text in texts:
+                before = {key: len(values) for key, values in phases.items()}
+                start = time.perf_counter()
+                classifier.classify(text)
+                classified = time.perf_counter()
+                extract_entities(text, ner=ner)
+                done = time.perf_counter()
+                embedding = sum(sum(phases.get((phase,), [])[before.get((phase,), 0):])
+                                for phase in EMBEDDING_PHASES)
+                stages["rules"].append(max(0.0, classified - start - embedding))
+                stages["classify"].append(classified - start)
+                stages["total"].append(done - start)
+    samples = {phase: phases.get((phase,), []) for phase in EMBEDDING_PHASES + ("extract_entities", "spacy")}
+    samples.update(stages)
+    return {stage: summarize(samples[stage]) for stage in LATENCY_STAGES}
+
+
+def measure_throughput(classifier, texts: List[str], batch_sizes: Sequence[int], thread_counts: Sequence[int],
+                       ner: bool = True) -> List[Dict[str, Any]]:
+    """texts/s of classify_batch + extract_entities_batch per (threads, batch size)."""
+    import torch
+    from entity_extractor import extract_entities_batch
+
+    if classifier.backend != "torch":
+        logger.warning(f"--threads sets torch intra-op threads, which the {classifier.backend} engine does not use")
+    saved = torch.get_num_threads()
+    results = []
+    try:
+        for threads in thread_counts:
+            torch.set_num_threads(threads)
+            for batch_size in batch_sizes:
+                classifier.classify_batch(texts[:batch_size])  # warm-up at this shape
+                start = time.perf_counter()
+                for i in range(0, len(texts), batch_size):
+                    batch = texts[i:i + batch_size]
+                    classifier.classify_batch(batch)
+                    extract_entities_batch(batch, ner=ner)
+                seconds = time.perf_counter() - start
+                results.append({"threads": threads, "batch_size": batch_size, "texts": len(texts),
+                                "seconds": seconds, "texts_per_second": len(texts) / seconds})
+                logger.info(f"threads={threads} batch={batch_size}: {len(texts) / seconds:.1f} texts/s")
+    finally:
+        torch.set_num_threads(saved)
+    return results
+
+
+def run(backend: str = Config.EMBEDDING_BACKEND, repeat: int = 3, batch_sizes: Sequence[int] = (1, 8, 32, 128),
+        thread_counts: Optional[Sequence[int]] = None, throughput_texts: int = 256, ner: bool = True,
+        cold: bool = True) -> Dict[str, Any]:
+    """Run every measurement and return the results document."""
+    import torch
+    from classifier import FraudClassifier
+    from serve import available_cores
+
+    if thread_counts is None:
+        cores = len(available_cores())
+        thread_counts = sorted({1, cores} | {n for n in (2, 4, 8) if n < cores})
+    results: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    if cold:
+        logger.info("Measuring cold start in a fresh interpreter")
+        results["cold_start"] = measure_cold_start(backend)
+    classifier = FraudClassifier(backend=backend)
+    load_spacy()
+    texts = fixed_corpus()
+    results["environment"] = environment(classifier)
+    results["corpus"] = {"texts": len(texts), "mean_chars": sum(map(len, texts)) / len(texts)}
+    logger.info(f"Measuring latency over {repeat} x {len(texts)} texts")
+    results["latency"] = measure_latency(classifier, texts, repeat, ner=ner)
+    results["latency_threads"] = torch.get_num_threads()
+    results["throughput"] = measure_throughput(classifier, fixed_corpus(throughput_texts), batch_sizes,
+                                               thread_counts, ner=ner)
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if not old or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Table of per-stage latency and throughput changes from base to new."""
+    lines = [f"{'latency':18s} {'base p50':>9s} {'new p50':>9s} {'base p95':>9s} {'new p95':>9s} "
+             f"{'base p99':>9s} {'new p99':>9s} {'p95':>8s}"]
+    for stage in LATENCY_STAGES:
+        old, cur = base["latency"].get(stage, {}), new["latency"].get(stage, {})
+        if not old.get("count") and not cur.get("count"):
+            continue
+        cells = [f"{s.get(k, 0.0):9.2f}" for k in ("p50_ms", "p95_ms", "p99_ms") for s in (old, cur)]
+        lines.append(f"{stage:18s} {' '.join(cells)} {_change(old.get('p95_ms'), cur.get('p95_ms')):>8s}")
+    lines.append("")
+    lines.append(f"{'throughput':18s} {'base/s':>9s} {'new/s':>9s} {'change':>8s}")
+    old_tp = {(r["threads"], r["batch_size"]): r["texts_per_second"] for r in base["throughput"]}
+    for r in new["throughput"]:
+        old = old_tp.get((r["threads"], r["batch_size"]))
+        label = f"t={r['threads']} b={r['batch_size']}"
+        lines.append(f"{label:18s} {old or 0.0:9.1f} {r['texts_per_second']:9.1f} "
+                     f"{_change(old, r['texts_per_second']):>8s}")
+    for key in ("cold_start", "peak_rss_mb"):
+        old, cur = base.get(key), new.get(key)
+        if isinstance(old, dict) and isinstance(cur, dict):
+            old, cur = old.get("total_s"), cur.get("total_s")
+            key += " total_s"
+        if old is not None and cur is not None:
+            lines.append(f"{key:18s} {old:9.2f} {cur:9.2f} {_change(old, cur):>8s}")
+    return lines
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_cmd = sub.add_parser("run", help="benchmark the classifier and write a JSON results file")
+    run_cmd.add_argument("--out", required=True, help="JSON results file to write")
+    run_cmd.add_argument("--backend", default=Config.EMBEDDING_BACKEND, choices=["torch", "onnx", "onnx-int8", "static"])
+    run_cmd.add_argument("--repeat", type=int, default=3, help="latency passes over the corpus")
+    run_cmd.add_argument("--batch-sizes", type=_int_list, default=[1, 8, 32, 128])
+    run_cmd.add_argument("--threads", type=_int_list, help="torch thread counts; default 1, 2, 4, 8 up to the cores")
+    run_cmd.add_argument("--throughput-texts", type=int, default=256, help="texts per throughput measurement")
+    run_cmd.add_argument("--no-ner", action="store_true", help="regex entities only (skip spaCy)")
+    run_cmd.add_argument("--no-cold-start", action="store_true", help="skip the fresh-interpreter startup run")
+    cold_cmd = sub.add_parser("cold-start", help="print startup timings of this interpreter as JSON")
+    cold_cmd.add_argument("--backend", default=Config.EMBEDDING_BACKEND, choices=["torch", "onnx", "onnx-int8", "static"])
+    compare_cmd = sub.add_parser("compare", help="compare two results files")
+    compare_cmd.add_argument("base")
+    compare_cmd.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "cold-start":
+        print(json.dumps(cold_start(args.backend)))
+    elif args.command == "compare":
+        with open(args.base, "r", encoding="utf-8") as f:
+            base_results = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new_results = json.load(f)
+        print("\n".join(compare(base_results, new_results)))
+    else:
+        results = run(args.backend, repeat=args.repeat, batch_sizes=args.batch_sizes, thread_counts=args.threads,
+                      throughput_texts=args.throughput_texts, ner=not args.no_ner, cold=not args.no_cold_start)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("\n".join(f"{stage:18s} p50 {s.get('p50_ms', 0.0):8.2f} ms  p95 {s.get('p95_ms', 0.0):8.2f} ms  "
+                        f"p99 {s.get('p99_ms', 0.0):8.2f} ms" for stage, s in results["latency"].items()))
+        print(f"✅ Benchmark results written to {args.out}")
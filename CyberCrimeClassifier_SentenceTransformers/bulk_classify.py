@@ -0,0 +1,276 @@
+"""
+bulk_classify.py
+
+Offline bulk classification of exported complaints (e.g. `mongoexport` of the
+`cases` collection) without going through the HTTP API.
+
+    python bulk_classify.py cases.jsonl --out classified.jsonl
+    python bulk_classify.py cases.csv --out classified.jsonl --workers 8 --text-field incidentDescription
+
+The input (JSONL, or CSV with a header row) is streamed in chunks of
+--chunk-size records; it is never loaded into memory as a whole. Each chunk is
+sorted by length and classified in batches of --batch-size texts (the embedder
+additionally splits every batch by token-length tier), entities come from
+extract_entities_batch(), and every record becomes one JSON line in the output
+with the same fields as a /classify response plus the record's `id` and `row`.
+
+Chunks run on a pool of forked worker processes that share the model loaded by
+the parent (see serve.py); results are written in input order. After every
+chunk the output is flushed to disk and a checkpoint (`<out>.checkpoint.json`)
+records the input and output byte offsets. Re-running the same command after a
+crash truncates the output to the last checkpoint and resumes from there;
+--restart starts over.
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+from config import Config
+from entity_extractor import ENTITY_FIELDS
+
+logger = logging.getLogger("bulk_classify")
+
+CHECKPOINT_VERSION = 1
+
+# (row number, record id, complaint text) of one input record
+Row = Tuple[int, Any, str]
+
+_service = None  # main module with a loaded classifier; inherited by forked workers
+
+
+def detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(path: str, fmt: str, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    Yield (record, byte offset just past the record) from a JSONL or CSV file,
+    starting at `offset` (0 or an offset previously yielded). Malformed JSON
+    lines are yielded as {"__error__": message}.
+    """
+    with open(path, "rb") as f:
+        header = None
+        if fmt == "csv":
+            header_line = f.readline().decode("utf-8-sig")
+            header = next(csv.reader([header_line]))
+        if offset:
+            f.seek(offset)
+
+        def lines() -> Iterator[str]:
+            for raw in iter(f.readline, b""):
+                yield raw.decode("utf-8").lstrip("\ufeff")
+
+        if fmt == "csv":
+            # csv.reader pulls only the lines of the current record, so f.tell() is exact
+            for values in csv.reader(lines()):
+                if values:
+                    yield dict(zip(header, values)), f.tell()
+            return
+        for line in lines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"__error__": f"invalid JSON: {e}"}
+            yield record, f.tell()
+
+
+def read_chunks(records: Iterator[Tuple[Dict[str, Any], int]], chunk_size: int, text_field: str, id_field: str,
+                first_row: int = 0) -> Iterator[Tuple[List[Row], List[Tuple[int, Any, str]], int]]:
+    """Group records into (rows to classify, invalid rows with their error, end offset) chunks."""
+    rows, invalid, row, end = [], [], first_row, None
+    for record, end in records:
+        record_id = record.get(id_field, row) if isinstance(record, dict) else row
+        text = record.get(text_field) if isinstance(record, dict) else None
+        if isinstance(record, dict) and "__error__" in record:
+            invalid.append((row, record_id, record["__error__"]))
+        elif not isinstance(text, str) or not text.strip():
+            invalid.append((row, record_id, f"missing or empty {text_field!r}"))
+        else:
+            rows.append((row, record_id, text))
+        row += 1
+        if len(rows) + len(invalid) >= chunk_size:
+            yield rows, invalid, end
+            rows, invalid = [], []
+    if rows or invalid:
+        yield rows, invalid, end
+
+
+def classify_chunk(rows: List[Row], batch_size: int, fields: Optional[List[str]] = None) -> Dict[int, str]:
+    """Classify one chunk; returns {row: output JSON line}. Runs in a worker process."""
+    from entity_extractor import extract_entities_batch, needs_ner
+
+    service = _service
+    order = sorted(range(len(rows)), key=lambda i: len(rows[i][2]))
+    lines = {}
+    for start in range(0, len(order), batch_size):
+        batch = [rows[i] for i in order[start:start + batch_size]]
+        texts = [text for _, _, text in batch]
+        classifications = service.classifier.classify_batch(texts)
+        entities = extract_entities_batch(texts, ner=needs_ner(fields))
+        for (row, record_id, _), classification, ents in zip(batch, classifications, entities):
+            resp = service.build_response(classification, ents, fields=fields)
+            lines[row] = json.dumps({"id": record_id, "row": row, **resp.model_dump()}, ensure_ascii=False) + "\n"
+    return lines
+
+
+def error_line(row: int, record_id: Any, error: str) -> str:
+    return json.dumps({"id": record_id, "row": row, "error": error}, ensure_ascii=False) + "\n"
+
+
+def _init_pool_worker(threads: int):
+    global _service
+    import serve
+
+    if _service is None:  # spawn start method: nothing was inherited
+        _service = serve.load_shared_state()
+    serve.init_worker(_service, threads)
+
+
+class Checkpoint:
+    """Progress of one input -> output run, stored next to the output file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {self.path}")
+        return state
+
+    def save(self, state: Dict[str, Any]):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, **state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def run(input_path: str, out_path: str, fmt: Optional[str] = None, text_field: str = "incidentDescription",
+        id_field: str = "caseId", workers: int = 1, threads: int = 0, chunk_size: int = 2048,
+        batch_size: int = 256, fields: Optional[List[str]] = None, restart: bool = False,
+        classify: Optional[Callable[[List[Row]], Dict[int, str]]] = None) -> Dict[str, Any]:
+    """
+    Classify every record of input_path into out_path, resuming from the
+    checkpoint if there is one. `classify` replaces the model (used by tests).
+    Returns the final checkpoint state.
+    """
+    global _service
+    fmt = fmt or detect_format(input_path)
+    checkpoint = Checkpoint(out_path + ".checkpoint.json")
+    state = None if restart else checkpoint.load()
+    if state is not None and state["input"] != os.path.abspath(input_path):
+        raise ValueError(f"{checkpoint.path} belongs to {state['input']}; use --restart to start over")
+    if state is None:
+        state = {"input": os.path.abspath(input_path), "input_offset": 0, "output_offset": 0,
+                 "rows": 0, "errors": 0, "done": False}
+    elif state["done"]:
+        logger.info(f"{out_path} is already complete ({state['rows']} rows)")
+        return state
+    else:
+        logger.info(f"Resuming at row {state['rows']} (input byte {state['input_offset']})")
+
+    pool = None
+    if classify is None:
+        from serve import available_cores, load_shared_state, plan_threads
+
+        cores = available_cores()
+        workers = workers if workers > 0 else len(cores)
+        threads = plan_threads(len(cores), workers, threads)
+        _service = load_shared_state()
+        if workers > 1:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+            pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_pool_worker,
+                                       initargs=(threads,))
+        else:
+            _init_pool_worker(threads)
+
+        def classify(rows: List[Row]) -> Dict[int, str]:
+            return classify_chunk(rows, batch_size, fields)
+
+    # discard anything written after the last checkpoint
+    out = open(out_path, "ab")
+    out.truncate(state["output_offset"])
+    out.seek(state["output_offset"])
+    chunks = read_chunks(read_records(input_path, fmt, state["input_offset"]), chunk_size,
+                         text_field, id_field, first_row=state["rows"])
+    pending: Deque[Tuple[Any, List[Row], List[Tuple[int, Any, str]], int]] = deque()
+    started, rows_at_start = time.monotonic(), state["rows"]
+
+    def submit() -> bool:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        rows, invalid, end = chunk
+        job = pool.submit(classify_chunk, rows, batch_size, fields) if pool is not None else None
+        pending.append((job, rows, invalid, end))
+        return True
+
+    try:
+        # keep a bounded number of chunks in flight so memory stays flat
+        while len(pending) < max(1, 2 * workers if pool is not None else 1) and submit():
+            pass
+        while pending:
+            job, rows, invalid, end = pending.popleft()
+            lines = job.result() if job is not None else classify(rows)
+            lines.update({row: error_line(row, record_id, error) for row, record_id, error in invalid})
+            out.write("".join(lines[row] for row in sorted(lines)).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            state.update(input_offset=end, output_offset=out.tell(), rows=state["rows"] + len(lines),
+                         errors=state["errors"] + len(invalid))
+            checkpoint.save(state)
+            elapsed = time.monotonic() - started
+            logger.info(f"{state['rows']} rows ({state['errors']} invalid), "
+                        f"{(state['rows'] - rows_at_start) / max(elapsed, 1e-9):.0f} rows/s")
+            submit()
+        state["done"] = True
+        checkpoint.save(state)
+    finally:
+        out.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return state
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file of complaints")
+    parser.add_argument("--out", required=True, help="JSONL file to write (appended to when resuming)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--text-field", default="incidentDescription")
+    parser.add_argument("--id-field", default="caseId")
+    parser.add_argument("--workers", type=int, default=Config.SERVE_WORKERS, help="0 = one per available core")
+    parser.add_argument("--threads", type=int, default=Config.TORCH_THREADS,
+                        help="torch intra-op threads per worker; 0 = cores // workers")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="records per checkpoint / worker task")
+    parser.add_argument("--batch-size", type=int, default=256, help="texts per classify_batch() call")
+    parser.add_argument("--entity-fields", help="comma-separated entity fields to keep (skips NER unless orgs/persons)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    selected = [f.strip() for f in args.entity_fields.split(",")] if args.entity_fields else None
+    unknown = sorted(set(selected or []) - set(ENTITY_FIELDS))
+    if unknown:
+        parser.error(f"unknown entity fields {unknown}; choose from {list(ENTITY_FIELDS)}")
+    final = run(args.input, args.out, fmt=args.format, text_field=args.text_field, id_field=args.id_field,
+                workers=args.workers, threads=args.threads, chunk_size=args.chunk_size,
+                batch_size=args.batch_size, fields=selected, restart=args.restart)
+    print(f"✅ {final['rows']} rows written to {args.out} ({final['errors']} invalid)")
@@ -5,9 +5,12 @@ Provides a lightweight DistilBERT-based embedding helper + keyword heuristics to
 classify complaint text into the requested primary and subcategories.
 
 Design:
-- Use DistilBERT to compute sentence embeddings (mean pooling).
+- Use DistilBERT (or a compact MiniLM encoder, CLASSIFIER_MODEL_NAME) to compute
+  sentence embeddings (mean pooling).
 - Build prototype embeddings for each subcategory from a few representative
   phrases and keywords.
+- Prototypes live in one row-normalized float32 matrix; each complaint is
+  embedded once and scored against every prototype with a single GEMV.
 - Classification picks the prototype with highest cosine similarity.
 - Also includes keyword heuristics for fast, high-precision mapping.
 
@@ -17,14 +20,30 @@ confidence is low, the API will return 'uncertain' with recommended actions.
 from __future__ import annotations
 
 from typing import Dict, Tuple, List
+import copy
+import functools
 import math
 import logging
+import os
 import re
+import threading
+import time
 
 import torch
-from transformers import DistilBertTokenizerFast, DistilBertModel
+import transformers
+from transformers import AutoModel, AutoTokenizer, PreTrainedModel
 import numpy as np
 
+import artifact_bundle
+import keyword_tables
+import metrics
+import prototype_bank
+import prototype_cache
+from config import Config
+from early_exit import parse_exit_margins
+from keyword_automaton import KeywordAutomaton, KeywordHits
+from tokenization import effective_max_length, pad_bucketed, parse_buckets, tokenize, window_ids
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -72,29 +91,159 @@ SOCIAL_ISSUES = ["Impersonation", "Fake Account", "Hack", "Obscene Content"]
 
 SOCIAL_SUBCATEGORIES = [f"{p} - {i}" for p in SOCIAL_PLATFORMS for i in SOCIAL_ISSUES]
 
+# Keys a keyword table file may use in these tables besides the built-in ones:
+# the labels the prototypes, the rule stages and suggest_action() know about
+TABLE_KEYS = {
+    "financial_keywords": FINANCIAL_SUBCATEGORIES,
+    "strong_signals": FINANCIAL_SUBCATEGORIES,
+    "platform_keywords": SOCIAL_PLATFORMS,
+    "platform_variations": SOCIAL_PLATFORMS,
+    "issue_keywords": SOCIAL_ISSUES,
+    "issue_variations": SOCIAL_ISSUES,
+}
+
+# Encoder backbones by short name (BERT-family models, mean pooled); any other
+# HuggingFace encoder id can be set in CLASSIFIER_MODEL_NAME as well.
+BACKBONES = {
+    "distilbert": "distilbert-base-uncased",
+    "minilm-l6": "sentence-transformers/all-MiniLM-L6-v2",
+    "minilm-l3": "sentence-transformers/paraphrase-MiniLM-L3-v2",
+}
+
+MODEL_NAME = BACKBONES.get(Config.MODEL_NAME, Config.MODEL_NAME)
+
+EMBEDDING_BACKENDS = ["torch", "onnx", "onnx-int8", "static"]
+
+LONG_DOC_POOLING = ["off", "mean", "max"]
+
+
+def tokenizer_version(tokenizer) -> str:
+    # transformers release + vocabulary size identify the tokenization scheme
+    return f"transformers-{transformers.__version__}/vocab-{tokenizer.vocab_size}"
+
+
+def model_cache_dir(base_dir: str, model_name: str) -> str:
+    """Per-backbone subdirectory for derived artifacts (ONNX graphs, static tables)."""
+    return os.path.join(base_dir, re.sub(r"[^A-Za-z0-9._-]+", "--", model_name))
+
 
 class SimpleDistilEmbedder:
-    def __init__(self, device: str | None = None):
+    """
+    Mean-pooled sentence embeddings from a BERT-family encoder on PyTorch:
+    DistilBERT by default, or a compact sentence-transformers model such as
+    MiniLM (whose own pooling is the same masked mean).
+    """
+    engine = "torch"
+
+    def __init__(self, device: str | None = None, max_length: int = Config.MAX_SEQ_LENGTH,
+                 length_buckets: str = Config.LENGTH_BUCKETS, model_name: str = MODEL_NAME,
+                 model: PreTrainedModel | None = None, tokenizer_source: str | None = None):
+        # model/tokenizer_source let a frozen bundle supply already-loaded weights
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        logger.info(f"Loading DistilBERT on device={self.device}")
-        self.tokenizer = DistilBertTokenizerFast.from_pretrained("distilbert-base-uncased")
-        self.model = DistilBertModel.from_pretrained("distilbert-base-uncased").to(self.device)
+        self.model_name = model_name
+        logger.info(f"Loading {self.model_name} on device={self.device}")
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_source or self.model_name, use_fast=True)
+        if model is None:
+            model = AutoModel.from_pretrained(self.model_name)
+        self.model = model.to(self.device)
         self.model.eval()
+        self.max_length = effective_max_length(self.tokenizer, max_length)
+        self.length_buckets = parse_buckets(length_buckets)
 
     def embed(self, texts: List[str]) -> np.ndarray:
         # returns (n, dim) numpy array
+        return self.embed_ids(tokenize(self.tokenizer, texts, self.max_length))
+
+    def embed_ids(self, ids: List[List[int]]) -> np.ndarray:
+        # embeds pre-tokenized sequences, one forward pass per length tier
+        out = np.zeros((len(ids), self.dim), dtype=np.float32)
         with torch.no_grad():
-            encoded = self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
-            input_ids = encoded["input_ids"].to(self.device)
-            attention_mask = encoded["attention_mask"].to(self.device)
-            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
-            last_hidden = outputs.last_hidden_state  # (batch, seq, dim)
-            mask = attention_mask.unsqueeze(-1).to(last_hidden.dtype)
-            summed = (last_hidden * mask).sum(1)
-            lengths = mask.sum(1).clamp(min=1)
-            mean_pooled = summed / lengths
-            arr = mean_pooled.cpu().numpy()
-            return arr
+            for indices, input_ids, attention_mask in pad_bucketed(ids, self.length_buckets,
+                                                                   self.tokenizer.pad_token_id or 0):
+                with metrics.PHASE_SECONDS.time("forward"):
+                    input_ids = torch.from_numpy(input_ids).to(self.device)
+                    attention_mask = torch.from_numpy(attention_mask).to(self.device)
+                    outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+                    last_hidden = outputs.last_hidden_state  # (batch, seq, dim)
+                    mask = attention_mask.unsqueeze(-1).to(last_hidden.dtype)
+                    summed = (last_hidden * mask).sum(1)
+                    lengths = mask.sum(1).clamp(min=1)
+                    mean_pooled = summed / lengths
+                    out[indices] = mean_pooled.cpu().numpy()
+        return out
+
+    @property
+    def dim(self) -> int:
+        return self.model.config.hidden_size
+
+    @property
+    def n_layers(self) -> int:
+        return self.model.config.num_hidden_layers
+
+    def _blocks(self, attention_mask: torch.Tensor):
+        """Transformer blocks and the attention mask they take (DistilBERT: 2-D; BERT/MiniLM: extended)."""
+        if hasattr(self.model, "transformer"):
+            return self.model.transformer.layer, attention_mask
+        return self.model.encoder.layer, self.model.get_extended_attention_mask(attention_mask, attention_mask.shape)
+
+    def embed_ids_layers(self, ids: List[List[int]], layers: List[int],
+                         should_exit=None) -> Dict[int, np.ndarray]:
+        """
+        Mean-pooled hidden states after each of `layers` (1-based; the last layer
+        always runs). should_exit(layer, rows, embs) gets the indices and pooled
+        states of the rows still running and returns a bool mask of the rows that
+        stop there; those skip the remaining layers and keep zeros in later entries.
+        """
+        layers = sorted({l for l in layers if 0 < l < self.n_layers} | {self.n_layers})
+        out = {l: np.zeros((len(ids), self.dim), dtype=np.float32) for l in layers}
+        with torch.no_grad():
+            for indices, input_ids, attention_mask in pad_bucketed(ids, self.length_buckets,
+                                                                   self.tokenizer.pad_token_id or 0):
+                rows = np.asarray(indices)
+                with metrics.PHASE_SECONDS.time("forward"):
+                    mask = torch.from_numpy(attention_mask).to(self.device)
+                    blocks, block_mask = self._blocks(mask)
+                    hidden = self.model.embeddings(torch.from_numpy(input_ids).to(self.device))
+                    for number, block in enumerate(blocks, start=1):
+                        hidden = block(hidden, block_mask)
+                        hidden = hidden[-1] if isinstance(hidden, tuple) else hidden
+                        if number not in out:
+                            continue
+                        weights = mask.unsqueeze(-1).to(hidden.dtype)
+                        pooled = ((hidden * weights).sum(1) / weights.sum(1).clamp(min=1)).cpu().numpy()
+                        out[number][rows] = pooled
+                        if should_exit is None or number == self.n_layers:
+                            continue
+                        keep = ~np.asarray(should_exit(number, rows, pooled), dtype=bool)
+                        if not keep.any():
+                            break
+                        if not keep.all():
+                            selected = torch.from_numpy(np.flatnonzero(keep)).to(self.device)
+                            hidden, mask, rows = hidden[selected], mask[selected], rows[keep]
+                            block_mask = block_mask[selected]
+        return out
+
+
+def create_embedder(backend: str = "torch", device: str | None = None):
+    """
+    Build the embedding engine for `backend` ("torch", "onnx", "onnx-int8" or "static").
+    All engines expose embed(texts) -> (n, dim), embed_ids(token_ids) -> (n, dim)
+    plus model_name/tokenizer/engine/max_length.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+    if backend.startswith("onnx"):
+        try:
+            from onnx_embedder import OnnxDistilEmbedder
+            return OnnxDistilEmbedder(MODEL_NAME, onnx_dir=model_cache_dir(Config.ONNX_DIR, MODEL_NAME),
+                                      int8=backend == "onnx-int8",
+                                      intra_op_threads=Config.ONNX_THREADS)
+        except ImportError as e:
+            logger.warning(f"ONNX backend unavailable ({e}). Falling back to torch.")
+    if backend == "static":
+        from static_embedder import load_static_embedder
+        return load_static_embedder(model_cache_dir(Config.STATIC_DIR, MODEL_NAME))
+    return SimpleDistilEmbedder(device=device)
 
 
 def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
@@ -105,11 +254,189 @@ def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b) / denom)
 
 
+class PrototypeScores:
+    """
+    Cosine similarities of one embedded complaint against every prototype row.
+
+    Produced by a single matrix-vector product in FraudClassifier.score_embedding;
+    every classification stage reads its confidences from here instead of
+    re-embedding the text or recomputing norms.
+    """
+
+    __slots__ = ("sims", "_index")
+
+    def __init__(self, sims: np.ndarray, index: Dict[str, int]):
+        self.sims = sims
+        self._index = index
+
+    def cosine(self, key: str) -> float:
+        row = self._index.get(key)
+        if row is None:
+            return 0.0
+        return float(self.sims[row])
+
+    def confidence(self, key: str) -> float:
+        # map cosine [-1, 1] -> [0, 1]; unknown prototypes score 0
+        row = self._index.get(key)
+        if row is None:
+            return 0.0
+        return float((self.sims[row] + 1) / 2)
+
+    def best(self, candidate_list: List[str]) -> Tuple[str, float]:
+        candidates = [c for c in candidate_list if c in self._index]
+        if not candidates:
+            return "Others", 0.0
+        candidate_sims = self.sims[[self._index[c] for c in candidates]]
+        top = int(np.argmax(candidate_sims))
+        return candidates[top], float((candidate_sims[top] + 1) / 2)
+
+
+# Keyword-only mode has no prototype similarities: every confidence lookup is 0,
+# so the rule stages fall back to their keyword-match confidence floors.
+KEYWORD_ONLY_SCORES = PrototypeScores(np.zeros(0, dtype=np.float32), {})
+
+
+def _on_snapshot(method):
+    """
+    Run an entry point on the classifier's table snapshot (see reload_tables):
+    the outermost call pins the snapshot current at that moment for this
+    thread, and nested entry-point calls reuse it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        pinned = getattr(self._calls, "snapshot", None)
+        if pinned is not None:
+            return method(pinned, *args, **kwargs)
+        self._calls.snapshot = snapshot = self._snapshot
+        try:
+            return method(snapshot, *args, **kwargs)
+        finally:
+            self._calls.snapshot = None
+    return wrapper
+
+
+# What the FraudClassifier callers hold keeps itself; everything else lives on
+# its current table snapshot
+_HOLDER_ATTRS = ("_snapshot", "_calls", "_reload_lock")
+
+
 class FraudClassifier:
-    def __init__(self, device: str | None = None):
-        self.embedder = SimpleDistilEmbedder(device=device)
-        # Build prototypes
+    """
+    Keyword stages plus prototype scoring. The object callers construct is a thin
+    holder: it keeps only _HOLDER_ATTRS and reads and writes every other
+    attribute on its current table snapshot, a complete FraudClassifier that
+    reload_tables() replaces as a whole. Snapshots hold their own attributes.
+    """
+
+    def __init__(self, device: str | None = None, prototype_cache_dir: str | None = Config.PROTOTYPE_CACHE_DIR,
+                 backend: str = Config.EMBEDDING_BACKEND, load_model: bool = True,
+                 long_doc_pooling: str = Config.LONG_DOC_POOLING, bundle_dir: str | None = Config.BUNDLE_DIR,
+                 exit_margins: str = Config.EARLY_EXIT_MARGINS,
+                 prototype_centroids: int = Config.PROTOTYPE_CENTROIDS,
+                 tables_file: str | None = Config.KEYWORD_TABLES_FILE):
+        if long_doc_pooling not in LONG_DOC_POOLING:
+            raise ValueError(f"Unknown long-document pooling '{long_doc_pooling}', expected one of {LONG_DOC_POOLING}")
+        self.long_doc_pooling = long_doc_pooling
+        self.device = device
+        self.backend = backend
+        self.prototype_cache_dir = prototype_cache_dir or None
+        self.bundle_dir = bundle_dir or None
+        self.bundle_id = None
+        self.embedder = None
+        self.prototype_centroids = prototype_centroids  # 0: one joined-phrase prototype per subcategory
+        self.exit_margins = parse_exit_margins(exit_margins)  # {layer: top-1 vs top-2 margin}
+        self.layer_proto_matrices: Dict[int, np.ndarray] = {}
+        self.layer_row_norms: Dict[int, np.ndarray] = {}  # row norms before normalization, for reloads
+        self.layer_proto_offsets = None
+        self.model_ready = False
+        self._calls = threading.local()  # per-thread request state: embedder calls, pinned snapshot
+        self._snapshot = self  # the current snapshot; see reload_tables()
+        self._reload_lock = threading.Lock()
+        self.tables_file = tables_file or None
+        self.tables_version = "builtin"
+        # Keyword tables and prototype phrases (cheap, no model needed)
         self._build_prototypes()
+        self._build_keyword_tables()
+        self._keep_base_tables()
+        if self.tables_file:
+            self.tables_version, tables = keyword_tables.load(self.tables_file, self.table_keys())
+            self._apply_tables(tables)
+        # Compile every rule-stage keyword table into one automaton
+        self._build_keyword_automaton()
+        # from here on this object only holds the snapshot
+        snapshot = self._copy_snapshot()
+        holder = self.__dict__
+        holder.clear()
+        holder.update({name: snapshot.__dict__[name] for name in _HOLDER_ATTRS}, _snapshot=snapshot)
+        if load_model:
+            self.load_model()
+
+    def __getattr__(self, name: str):
+        # only reached on the holder: snapshots carry all their attributes
+        snapshot = self.__dict__.get("_snapshot")
+        if snapshot is None or snapshot is self:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return getattr(snapshot, name)
+
+    def __setattr__(self, name: str, value):
+        snapshot = self.__dict__.get("_snapshot", self)
+        if snapshot is self or name in _HOLDER_ATTRS:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(snapshot, name, value)
+
+    def __delattr__(self, name: str):
+        snapshot = self.__dict__.get("_snapshot", self)
+        if snapshot is self or name in _HOLDER_ATTRS:
+            object.__delattr__(self, name)
+        else:
+            delattr(snapshot, name)
+
+    def _copy_snapshot(self) -> "FraudClassifier":
+        """Shallow copy of this snapshot that is a snapshot of its own (not a holder)."""
+        new = copy.copy(self)
+        new.__dict__["_snapshot"] = new
+        return new
+
+    def load_model(self):
+        """
+        Load the embedding model and the prototype matrix. Until this has run only
+        classify_keywords() is available; main.py calls it from a background thread.
+        """
+        if self.model_ready:
+            return
+        if self.bundle_dir:
+            self._load_bundle()
+        else:
+            self.embedder = create_embedder(self.backend, device=self.device)
+            self._embed_prototypes()
+        self._setup_early_exit()
+        self.model_ready = True
+        if self.bundle_dir and self.tables_file:
+            # a table file takes precedence over the tables frozen into the bundle
+            self.reload_tables()
+
+    def _load_bundle(self):
+        """Take tokenizer, mmap'd weights, prototypes and keyword tables from a frozen bundle."""
+        metadata = artifact_bundle.read_metadata(self.bundle_dir)
+        if self.backend != "torch":
+            logger.warning(f"Bundles hold torch weights; ignoring backend '{self.backend}'")
+        tables = artifact_bundle.read_keyword_tables(self.bundle_dir)
+        for attr in artifact_bundle.KEYWORD_TABLE_ATTRS:
+            if attr in tables:  # bundles predating a table keep the built-in one
+                setattr(self, attr, tables[attr])
+        self._keep_base_tables()  # a table file reloaded later replaces the bundle's tables
+        self.prototype_centroids = metadata.get("prototype_centroids", 0)
+        self._build_keyword_automaton()
+        model = artifact_bundle.load_mmap_model(os.path.join(self.bundle_dir, "model"))
+        self.embedder = SimpleDistilEmbedder(device=self.device, model_name=metadata["model_name"], model=model,
+                                             tokenizer_source=os.path.join(self.bundle_dir, "tokenizer"))
+        row_norms = metadata.get("prototype_row_norms")  # absent in older bundles
+        self._set_prototype_matrix(artifact_bundle.load_prototypes(self.bundle_dir, metadata),
+                                   metadata["prototype_keys"], None if row_norms is None else np.asarray(row_norms))
+        self.bundle_id = metadata["bundle_id"]
+        self.tables_version = f"bundle:{self.bundle_id}"
+        logger.info(f"Loaded classifier bundle {self.bundle_id} from {self.bundle_dir}")
 
     def _build_prototypes(self):
         # Comprehensive keyword phrases for all 23 financial subcategories
@@ -140,10 +467,8 @@ class FraudClassifier:
         }
 
         # social prototypes use platform + issue with enhanced keywords
-        self.social_keywords = {}
-        
         # Enhanced platform-specific keywords
-        platform_keywords = {
+        self.platform_keywords = {
             "Instagram": ["instagram", "insta", "ig account", "instagram profile", "insta account"],
             "Facebook": ["facebook", "fb", "fb account", "facebook profile", "fb profile"],
             "WhatsApp": ["whatsapp", "whats app", "wa", "whatsapp account", "whatsapp number"],
@@ -153,19 +478,23 @@ class FraudClassifier:
             "Gmail": ["gmail", "google mail", "email account", "email address"]
         }
         
-        issue_keywords = {
+        self.issue_keywords = {
             "Impersonation": ["impersonation", "fake profile", "fake account", "impersonate", "pretending"],
             "Hack": ["hack", "hacked", "hacking", "unauthorized access", "can't login"],
             "Obscene Content": ["obscene", "vulgar", "morphed photos", "inappropriate", "explicit content"],
             "Fake Account": ["fake account", "scam account", "fraud account", "clone account"]
         }
-        
+        self._derive_prototypes()
+
+    def _derive_prototypes(self):
+        """Social keyword lists, prototype texts and prototype phrases from the keyword tables."""
+        self.social_keywords = {}
         for p in SOCIAL_PLATFORMS:
             for i in SOCIAL_ISSUES:
                 key = f"{p} - {i}"
                 # Combine platform and issue specific keywords
-                p_kws = platform_keywords.get(p, [p.lower()])
-                i_kws = issue_keywords.get(i, [i.lower()])
+                p_kws = self.platform_keywords.get(p, [p.lower()])
+                i_kws = self.issue_keywords.get(i, [i.lower()])
                 combined = p_kws + i_kws + [f"{p.lower()} {i.lower()}", f"{i.lower()} {p.lower()}"]
                 self.social_keywords[key] = combined
 
@@ -182,27 +511,491 @@ class FraudClassifier:
 
         for sub, kws in self.social_keywords.items():
             prototypes[sub] = " . ".join(kws[:3])
+        self.prototype_texts = prototypes
+
+        # every keyword phrase per subcategory, clustered by the prototype bank
+        phrases = {sub: list(dict.fromkeys(kws)) for sub, kws in self.financial_keywords.items()}
+        for sub in FINANCIAL_SUBCATEGORIES:
+            phrases.setdefault(sub, [sub.lower()])
+        for sub, kws in self.social_keywords.items():
+            phrases[sub] = list(dict.fromkeys(kws))
+        self.prototype_phrases = phrases
+
+    def _phrases(self) -> Dict[str, List[str]]:
+        """Phrases behind the prototype rows of each subcategory, in prototype order."""
+        if self.prototype_centroids > 0:
+            return {k: self.prototype_phrases[k] for k in self.prototype_texts}
+        return {k: [text] for k, text in self.prototype_texts.items()}
+
+    def _embed_prototypes(self):
+        """
+        Fill the prototype matrix from the on-disk cache, or by embedding
+        prototype_texts (one row per subcategory) or, with prototype_centroids
+        set, every keyword phrase clustered into that many centroids each.
+        """
+        prototypes = self.prototype_texts
+        if self._load_cached_prototypes(prototypes):
+            return
 
-        # compute prototype embeddings
-        proto_texts = list(prototypes.values())
-        proto_keys = list(prototypes.keys())
-        proto_embs = self.embedder.embed(proto_texts)
-        self.prototypes = {k: v for k, v in zip(proto_keys, proto_embs)}
-        # also build aggregated primary prototypes (mean of its subcategories)
-        fin_keys = [k for k in self.prototypes if k in FINANCIAL_SUBCATEGORIES]
-        soc_keys = [k for k in self.prototypes if k in SOCIAL_SUBCATEGORIES]
-        if fin_keys:
-            fin_embs = np.stack([self.prototypes[k] for k in fin_keys])
-            self.primary_proto_fin = fin_embs.mean(0)
+        if self.prototype_centroids > 0:
+            rows, row_keys = prototype_bank.build(self._phrases(), self.embedder.embed, self.prototype_centroids)
+            logger.info(f"Clustered prototype phrases into {len(row_keys)} centroids "
+                        f"(at most {self.prototype_centroids} per subcategory)")
         else:
-            self.primary_proto_fin = np.zeros(proto_embs.shape[1])
-        if soc_keys:
-            soc_embs = np.stack([self.prototypes[k] for k in soc_keys])
-            self.primary_proto_soc = soc_embs.mean(0)
+            row_keys = list(prototypes.keys())
+            rows = self.embedder.embed(list(prototypes.values()))
+        self._build_prototype_matrix(rows, row_keys)
+        if self.prototype_cache_dir:
+            identity = self._prototype_identity(prototypes)
+            prototype_cache.save(self.prototype_cache_dir, prototype_cache.compute_key(identity),
+                                 self.proto_matrix, self.proto_row_keys, identity, self.proto_row_norms,
+                                 keep=Config.PROTOTYPE_CACHE_KEEP)
+
+    def _build_keyword_tables(self):
+        """Keyword lists used by the rule stages of classify()."""
+        # STAGE 1: explicit fraud-call phrases, call-focus phrases, completed-transaction words
+        self.fraud_call_signals = ["fraud call", "fake call", "scam call", "received a call",
+                                   "got a call", "someone called me", "call from unknown", "received call"]
+        self.call_focus_words = ["received call", "got call", "call from", "calling me", "called me", "received a call", "got a call"]
+        self.completed_transaction_words = ["taken away", "withdrawn", "lost money", "transferred", "paid", "debited", "charged"]
+
+        # STAGE 3 / STAGE 4 signal lists
+        self.social_signals = [p.lower() for p in SOCIAL_PLATFORMS] + ["profile", "account", "imperson", "fake profile", "hack", "obscene"]
+        self.financial_signals = ["upi", "rupee", "rs ", "₹", "loan", "credit card", "debit card", "wallet",
+                                  "paytm", "phonepe", "google pay", "bank", "account number", "transaction", "payment"]
+
+        # Category-specific strong signals (see _has_strong_financial_signal)
+        self.strong_signals = {
+            "UPI Fraud": ["upi", "phonepe", "paytm", "google pay", "gpay", "bhim", "@ybl", "@paytm", "@oksbi"],
+            "Debit Card Fraud": ["debit", "atm", "debit card", "atm card"],
+            "Credit Card Fraud": ["credit card", "cc", "cvv", "credit limit"],
+            "Sextortion Fraud": ["blackmail", "intimate", "nude", "video", "sextortion", "extortion"],
+            "Digital Arrest Fraud": ["arrest", "police", "warrant", "legal notice", "digital arrest", "cyber crime arrest"],
+            "AEPS Fraud": ["aadhar", "biometric", "fingerprint", "aeps", "aadhar enabled"],
+            "Loan App Fraud": ["loan", "personal loan", "instant loan", "loan app"],
+            "E-Wallet Fraud": ["wallet", "phonepe", "paytm", "google pay", "e-wallet"],
+            "E-Commerce Fraud": ["amazon", "flipkart", "myntra", "meesho", "didn't receive", "fake product"],
+            "OLX Fraud": ["olx", "classified", "second hand"],
+            "Investment/Trading/IPO Fraud": ["investment", "trading", "ipo", "stock", "crypto", "bitcoin"],
+            "Gaming App Fraud": ["gaming", "pubg", "betting", "fantasy"],
+            "Lottery Fraud": ["lottery", "lucky draw", "prize", "won"],
+        }
+
+        # Enhanced platform detection with variations (see _best_social_subcategory)
+        self.platform_variations = {
+            "Instagram": ["instagram", "insta", "ig account"],
+            "Facebook": ["facebook", "fb account", "fb profile"],
+            "WhatsApp": ["whatsapp", "whats app", "wa account"],
+            "Telegram": ["telegram", "tg account"],
+            "X": ["twitter", "x account", " x ", "tweet"],
+            "Snapchat": ["snapchat", "snap"],
+            "Gmail": ["gmail", "google mail", "email account"]
+        }
+
+        # Issue keyword variations
+        self.issue_variations = {
+            "Impersonation": ["impersonat", "fake profile", "fake account", "using my photo", "using my name", "pretending to be"],
+            "Hack": ["hack", "hacked", "can't login", "changed password", "lost access", "unauthorized access"],
+            "Obscene Content": ["obscene", "morphed", "nude", "intimate", "vulgar", "inappropriate content", "explicit"],
+            "Fake Account": ["fake account", "fake profile", "scam account", "fraud account"]
+        }
+
+        # Issue/platform inference when only one of the two was detected
+        self.issue_inference = {
+            "Hack": ["hack", "hacked", "can't login", "lost access"],
+            "Impersonation": ["fake", "imperson", "pretend"],
+            "Obscene Content": ["obscene", "morphed", "nude"],
+        }
+        self.platform_context = {
+            "email": ["email", "@gmail", "@"],
+            "message": ["message", "contact"],
+            "call": ["call", "calling", "phone", "called"],
+        }
+
+        # single words checked directly by the stages
+        self.stage_words = ["credit", "debit", "card", "upi", "@", "sextortion", "arrest"]
+
+    def _build_keyword_automaton(self):
+        """
+        Compile all keyword tables into one KeywordAutomaton. Group names are
+        "<table>:<key>"; classify() reads every keyword count from the resulting
+        KeywordHits vector instead of scanning each list separately.
+        """
+        groups: Dict[str, List[str]] = {}
+        for category, kws in self.financial_keywords.items():
+            groups[f"financial:{category}"] = kws
+        for category, kws in self.strong_signals.items():
+            groups[f"strong:{category}"] = kws
+        for platform, kws in self.platform_variations.items():
+            groups[f"platform:{platform}"] = kws
+        for issue, kws in self.issue_variations.items():
+            groups[f"issue:{issue}"] = kws
+        for issue, kws in self.issue_inference.items():
+            groups[f"infer:{issue}"] = kws
+        for context, kws in self.platform_context.items():
+            groups[f"context:{context}"] = kws
+        groups["signal:fraud_call"] = self.fraud_call_signals
+        groups["signal:call_focus"] = self.call_focus_words
+        groups["signal:completed_transaction"] = self.completed_transaction_words
+        groups["signal:social"] = self.social_signals
+        groups["signal:financial"] = self.financial_signals
+        for word in self.stage_words:
+            groups[f"word:{word}"] = [word]
+        self.keyword_automaton = KeywordAutomaton(groups)
+
+    @_on_snapshot
+    def scan_keywords(self, text: str) -> KeywordHits:
+        """Per-group keyword hit counts for text in a single pass."""
+        return self.keyword_automaton.scan(text.lower())
+
+    def _prototype_identity(self, prototypes: Dict[str, str]) -> Dict[str, object]:
+        """Everything that determines the prototype matrix; hashed into the cache key."""
+        identity = {
+            "format_version": prototype_cache.CACHE_FORMAT_VERSION,
+            "model_name": self.embedder.model_name,
+            "engine": self.embedder.engine,
+            "tokenizer_version": tokenizer_version(self.embedder.tokenizer),
+            "financial_keywords": self.financial_keywords,
+            "social_keywords": self.social_keywords,
+            "platform_keywords": self.platform_keywords,
+            "issue_keywords": self.issue_keywords,
+            "prototypes": prototypes,
+        }
+        if self.prototype_centroids > 0:
+            identity["prototype_centroids"] = self.prototype_centroids
+            identity["prototype_phrases"] = self._phrases()
+        # engines with a distilled table (static) embed prototypes differently per table
+        if getattr(self.embedder, "table_id", None):
+            identity["table_id"] = self.embedder.table_id
+        return identity
+
+    def _load_cached_prototypes(self, prototypes: Dict[str, str]) -> bool:
+        """Memory-map a cached prototype matrix if one matches the current tables."""
+        if not self.prototype_cache_dir:
+            return False
+        key = prototype_cache.compute_key(self._prototype_identity(prototypes))
+        cached = prototype_cache.load(self.prototype_cache_dir, key)
+        if cached is None:
+            return False
+        matrix, row_keys, row_norms = cached
+        if list(dict.fromkeys(row_keys)) != list(prototypes.keys()) + PRIMARY_CATEGORIES:
+            return False
+        self._set_prototype_matrix(matrix, row_keys, row_norms)
+        logger.info(f"Loaded {len(row_keys)} prototypes from cache in {self.prototype_cache_dir}")
+        return True
+
+    def _set_prototype_matrix(self, matrix: np.ndarray, row_keys: List[str], row_norms: np.ndarray | None = None):
+        """
+        Adopt an already row-normalized prototype matrix (cache or bundle).
+        row_keys names the prototype of every row; a prototype with several rows
+        (bank centroids, contiguous) scores as its best row. row_norms are the
+        norms of the rows before normalization (None when unknown), which
+        reload_tables() needs to rebuild the primary prototypes.
+        """
+        self.proto_matrix = matrix
+        self.proto_row_norms = row_norms
+        self.proto_row_keys = list(row_keys)
+        self.proto_keys = list(dict.fromkeys(row_keys))
+        self.proto_index = {k: i for i, k in enumerate(self.proto_keys)}
+        self.proto_offsets = prototype_bank.group_offsets(self.proto_row_keys)
+
+    def _build_prototype_matrix(self, rows: np.ndarray, row_keys: List[str]):
+        """
+        Stack the subcategory prototype rows plus the two primary prototypes (mean
+        of their subcategories) into one contiguous, row-normalized float32 matrix
+        so a single GEMV scores them all. Primary rows are keyed by their
+        PRIMARY_CATEGORIES name.
+        """
+        fin_keys = [k for k in dict.fromkeys(row_keys) if k in FINANCIAL_SUBCATEGORIES]
+        soc_keys = [k for k in dict.fromkeys(row_keys) if k in SOCIAL_SUBCATEGORIES]
+        primary = [prototype_bank.key_means(rows, row_keys, fin_keys),
+                   prototype_bank.key_means(rows, row_keys, soc_keys)]
+        matrix = np.ascontiguousarray(np.vstack([rows, primary]), dtype=np.float32)
+        self._set_prototype_matrix(prototype_bank.normalize_rows(matrix), list(row_keys) + PRIMARY_CATEGORIES,
+                                   np.linalg.norm(matrix, axis=1))
+
+    def _setup_early_exit(self, previous: "FraudClassifier | None" = None, changed=()):
+        """
+        Embed the prototypes at every early-exit layer (one forward pass) if early
+        exit is configured. With `previous` (a reload), only the subcategories in
+        `changed` are re-embedded; the others keep their rows.
+        """
+        if not self.exit_margins:
+            return
+        if not hasattr(self.embedder, "embed_ids_layers") or self.long_doc_pooling != "off":
+            logger.warning("Early exit needs the torch engine without long-document pooling; disabled")
+            self.exit_margins = {}
+            return
+        self.exit_margins = {l: m for l, m in self.exit_margins.items() if 0 < l < self.embedder.n_layers}
+        keys = [k for k in self.proto_keys if k not in PRIMARY_CATEGORIES]
+        phrases = self._phrases()
+        reuse = set() if previous is None else {k for k in keys if k not in changed and k in previous.proto_index}
+        todo = [k for k in keys if k not in reuse]
+        ids = tokenize(self.embedder.tokenizer, [p for k in todo for p in phrases[k]], self.embedder.max_length)
+        by_layer = self.embedder.embed_ids_layers(ids, list(self.exit_margins)) if ids else {}
+        if previous is None:
+            # stepping through the blocks must reproduce the regular forward pass
+            final = by_layer[self.embedder.n_layers][:4]
+            reference = self.embedder.embed_ids(ids[:4])
+            if not np.allclose(final, reference, rtol=1e-3, atol=1e-4):
+                logger.warning("Layer-by-layer encoding does not match the model's forward pass; early exit disabled")
+                self.exit_margins = {}
+                return
+        # with the prototype bank, each layer scores every phrase and max-pools per subcategory
+        row_keys = [k for k in keys for _ in phrases[k]]
+        fin = [k for k in keys if k in FINANCIAL_SUBCATEGORIES]
+        soc = [k for k in keys if k in SOCIAL_SUBCATEGORIES]
+        self.layer_proto_matrices, self.layer_row_norms = {}, {}
+        for layer in self.exit_margins:
+            fresh = by_layer[layer] if ids else None
+            blocks, offset = [], 0
+            for k in keys:
+                if k in reuse:
+                    idx = previous._layer_rows(k)
+                    blocks.append(previous.layer_proto_matrices[layer][idx] * previous.layer_row_norms[layer][idx, None])
+                else:
+                    blocks.append(fresh[offset:offset + len(phrases[k])])
+                    offset += len(phrases[k])
+            embs = np.concatenate(blocks)
+            primary = [prototype_bank.key_means(embs, row_keys, fin), prototype_bank.key_means(embs, row_keys, soc)]
+            rows = np.vstack([embs, primary])
+            self.layer_proto_matrices[layer] = np.ascontiguousarray(prototype_bank.normalize_rows(rows), dtype=np.float32)
+            self.layer_row_norms[layer] = np.linalg.norm(rows, axis=1)
+        self.layer_row_keys = row_keys + PRIMARY_CATEGORIES
+        self.layer_proto_offsets = prototype_bank.group_offsets(self.layer_row_keys)
+        self._sub_rows = np.array([self.proto_index[k] for k in keys])
+        if previous is None:
+            logger.info(f"Early exit after layers {sorted(self.exit_margins)} with margins {self.exit_margins}")
+
+    def _layer_rows(self, key: str) -> np.ndarray:
+        return np.flatnonzero(np.array(self.layer_row_keys) == key)
+
+    def _keep_base_tables(self):
+        """Remember the current source tables as the ones a table file is applied on top of."""
+        self._base_tables = copy.deepcopy({name: getattr(self, name) for name in keyword_tables.SOURCE_TABLES})
+
+    def table_keys(self) -> Dict[str, List[str]]:
+        """Keys a table file may use per keyed table (see keyword_tables.validate)."""
+        return {name: list(dict.fromkeys(TABLE_KEYS.get(name, []) + list(self._base_tables[name])))
+                for name in sorted(keyword_tables.MAPPING_TABLES)}
+
+    def _apply_tables(self, tables: Dict[str, object]):
+        """
+        Replace keyword tables (see keyword_tables.SOURCE_TABLES) and re-derive the
+        prototypes. Tables the file leaves out fall back to the base tables (built-in
+        or bundled), so a reload gives the same tables as a restart with that file.
+        """
+        base = copy.deepcopy(self._base_tables)
+        for name in keyword_tables.SOURCE_TABLES:
+            setattr(self, name, tables.get(name, base[name]))
+        self._derive_prototypes()
+
+    def _reembed_prototypes(self, previous: "FraudClassifier", changed: List[str]):
+        """Rebuild the prototype matrix, embedding only the subcategories in `changed`."""
+        phrases = self._phrases()
+        todo = {k: phrases[k] for k in changed}
+        if not todo:
+            rows, row_keys = np.zeros((0, previous.proto_matrix.shape[1]), dtype=np.float32), []
+        elif self.prototype_centroids > 0:
+            rows, row_keys = prototype_bank.build(todo, self.embedder.embed, self.prototype_centroids)
         else:
-            self.primary_proto_soc = np.zeros(proto_embs.shape[1])
+            row_keys = list(todo)
+            rows = self.embedder.embed([texts[0] for texts in todo.values()])
+        fresh = np.asarray(rows, dtype=np.float32)
+        old_keys = np.array(previous.proto_row_keys)
+        new_keys = np.array(row_keys)
+        blocks, keys = [], []
+        for k in phrases:
+            if k in todo:
+                block = fresh[new_keys == k]
+            else:  # the unnormalized rows, so the primary means match a fresh build
+                mask = old_keys == k
+                block = previous.proto_matrix[mask] * previous.proto_row_norms[mask, None]
+            blocks.append(block)
+            keys += [k] * len(block)
+        self._build_prototype_matrix(np.concatenate(blocks), keys)
+
+    def reload_tables(self, path: str | None = None) -> Dict[str, object]:
+        """
+        Load a keyword table file (keyword_tables.py) and swap it in while serving.
 
-    def classify(self, text: str) -> Tuple[str, str, float, float]:
+        A shallow copy of the current snapshot gets the base tables overlaid with the
+        file (never the previous file's leftovers), a new keyword automaton and a
+        new prototype matrix in which only the subcategories whose phrases changed
+        are re-embedded. Publishing the copy is one reference swap on the holder:
+        classify() and the other entry points run on the snapshot current when
+        they were called, so requests in flight finish on the old tables, and every
+        attribute read through the holder (proto_matrix, financial_keywords, ...)
+        sees the new tables.
+        """
+        path = path or self.tables_file
+        if not path:
+            raise ValueError("No keyword table file configured (CLASSIFIER_KEYWORD_TABLES)")
+        version, tables = keyword_tables.load(path, self.table_keys())
+        with self._reload_lock:
+            if not self.model_ready:
+                raise RuntimeError("Models are still loading; reload once the classifier is ready")
+            start = time.perf_counter()
+            previous = self._snapshot
+            previous_version = previous.tables_version
+            new = previous._copy_snapshot()
+            new._apply_tables(tables)
+            new._build_keyword_automaton()
+            old_phrases = previous._phrases()
+            changed = [k for k, texts in new._phrases().items() if old_phrases.get(k) != texts]
+            if changed or list(old_phrases) != list(new._phrases()):
+                if not new._load_cached_prototypes(new.prototype_texts):
+                    if previous.proto_row_norms is None:
+                        # older cache or bundle without row norms: re-embed every prototype
+                        changed = list(new._phrases())
+                    new._reembed_prototypes(previous, changed)
+                    if new.prototype_cache_dir:
+                        identity = new._prototype_identity(new.prototype_texts)
+                        prototype_cache.save(new.prototype_cache_dir, prototype_cache.compute_key(identity),
+                                             new.proto_matrix, new.proto_row_keys, identity, new.proto_row_norms,
+                                             keep=Config.PROTOTYPE_CACHE_KEEP)
+                new._setup_early_exit(previous, changed)
+            new.tables_file, new.tables_version = path, version
+            self._snapshot = new
+        summary = {
+            "version": version,
+            "previous_version": previous_version,
+            "changed_tables": keyword_tables.diff(keyword_tables.export(previous, previous_version),
+                                                  keyword_tables.export(new, version)),
+            "reembedded": changed,
+            "seconds": time.perf_counter() - start,
+        }
+        metrics.TABLE_RELOADS.inc()
+        logger.info(f"Keyword tables {previous_version} -> {version}: re-embedded {len(changed)} "
+                    f"prototypes in {summary['seconds']:.2f}s")
+        return summary
+
+    def _score_early_exit(self, texts: List[str]) -> List[PrototypeScores]:
+        """
+        Encode layer by layer; after each early-exit layer score the pooled state
+        against that layer's prototypes and stop the complaints whose top-1 vs
+        top-2 subcategory margin reaches the layer's calibrated margin.
+        """
+        self._calls.embedder = getattr(self._calls, "embedder", 0) + 1
+        metrics.EMBEDDED_TEXTS.inc(amount=len(texts))
+        ids = tokenize(self.embedder.tokenizer, texts, self.embedder.max_length)
+        scores: List[PrototypeScores | None] = [None] * len(texts)
+
+        def should_exit(layer: int, rows: np.ndarray, embs: np.ndarray) -> np.ndarray:
+            with metrics.PHASE_SECONDS.time("scoring"):
+                sims = self.layer_sims(layer, embs)
+                top2 = np.partition(sims[:, self._sub_rows], -2, axis=1)[:, -2:]
+                done = top2[:, 1] - top2[:, 0] >= self.exit_margins[layer]
+            for row, row_sims in zip(rows[done], sims[done]):
+                scores[row] = PrototypeScores(row_sims, self.proto_index)
+                metrics.EXIT_LAYER.observe(layer)
+            return done
+
+        final = self.embedder.embed_ids_layers(ids, list(self.exit_margins), should_exit)[self.embedder.n_layers]
+        for row, score in enumerate(scores):
+            if score is None:
+                scores[row] = self.score_embedding(final[row])
+                metrics.EXIT_LAYER.observe(self.embedder.n_layers)
+        return scores
+
+    def layer_sims(self, layer: int, embs: np.ndarray) -> np.ndarray:
+        """(n, prototypes) cosines of layer-`layer` pooled states against that layer's prototypes."""
+        sims = prototype_bank.normalize_rows(embs) @ self.layer_proto_matrices[layer].T
+        return prototype_bank.max_pool(sims, self.layer_proto_offsets)
+
+    @_on_snapshot
+    def score_embedding(self, emb: np.ndarray) -> PrototypeScores:
+        """Score one (dim,) embedding against all prototypes with one matrix-vector product."""
+        with metrics.PHASE_SECONDS.time("scoring"):
+            emb = np.asarray(emb, dtype=np.float32)
+            norm = float(np.linalg.norm(emb))
+            if norm == 0:
+                sims = np.zeros(len(self.proto_keys), dtype=np.float32)
+            else:
+                sims = prototype_bank.max_pool(self.proto_matrix @ (emb / norm), self.proto_offsets)
+            return PrototypeScores(sims, self.proto_index)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        # embedder entry point for request texts, counted per classifying thread
+        self._calls.embedder = getattr(self._calls, "embedder", 0) + 1
+        metrics.EMBEDDED_TEXTS.inc(amount=len(texts))
+        return self.embedder.embed(texts)
+
+    def _score_windows(self, texts: List[str]) -> List[PrototypeScores]:
+        """
+        Long-document scoring: every window of every text is embedded in one
+        embed_ids call, then pooled per text by length-weighted mean of the window
+        embeddings ("mean") or by each prototype's best window similarity ("max").
+        """
+        windows = window_ids(self.embedder.tokenizer, texts, self.embedder.max_length,
+                             Config.LONG_DOC_STRIDE, Config.LONG_DOC_MAX_WINDOWS)
+        flat = [w for ws in windows for w in ws]
+        self._calls.embedder = getattr(self._calls, "embedder", 0) + 1
+        metrics.EMBEDDED_TEXTS.inc(amount=len(texts))
+        embs = self.embedder.embed_ids(flat)
+        scores, start = [], 0
+        for ws in windows:
+            window_embs = embs[start:start + len(ws)]
+            start += len(ws)
+            if len(ws) == 1:
+                scores.append(self.score_embedding(window_embs[0]))
+            elif self.long_doc_pooling == "mean":
+                weights = np.array([len(w) for w in ws], dtype=np.float32)
+                scores.append(self.score_embedding(weights @ window_embs / weights.sum()))
+            else:
+                with metrics.PHASE_SECONDS.time("scoring"):
+                    norms = np.linalg.norm(window_embs, axis=1, keepdims=True)
+                    norms[norms == 0] = 1.0
+                    sims = (window_embs / norms) @ self.proto_matrix.T  # (windows, prototype rows)
+                    sims = prototype_bank.max_pool(sims, self.proto_offsets)
+                    scores.append(PrototypeScores(sims.max(0), self.proto_index))
+        return scores
+
+    @_on_snapshot
+    def score_texts(self, texts: List[str]) -> List[PrototypeScores]:
+        """Embed texts in one call and score each against all prototypes."""
+        if self.long_doc_pooling != "off":
+            return self._score_windows(list(texts))
+        if self.exit_margins:
+            return self._score_early_exit(list(texts))
+        return [self.score_embedding(emb) for emb in self._embed(list(texts))]
+
+    @_on_snapshot
+    def score_text(self, text: str) -> PrototypeScores:
+        """Embed text exactly once and score it against all prototypes."""
+        return self.score_texts([text])[0]
+
+    @_on_snapshot
+    def classify_batch(self, texts: List[str]) -> List[Tuple[str, str, float, float]]:
+        """Classify several texts with one padded forward pass for all of them."""
+        if not texts:
+            return []
+        self._calls.embedder = 0
+        all_scores = self.score_texts(texts)
+        calls = self._calls.embedder
+        results = []
+        for text, scores in zip(texts, all_scores):
+            metrics.EMBEDDER_CALLS_PER_REQUEST.observe(calls)
+            results.append(self.classify(text, scores=scores))
+        return results
+
+    @_on_snapshot
+    def classify_keywords(self, text: str) -> Tuple[str, str, float, float]:
+        """
+        Degraded classification from the keyword stages only, usable before
+        load_model() has finished. Complaints that would need the embedding
+        fallback (stage 5) come back with zero confidence.
+        """
+        t = text.lower()
+        stage, result = self._run_stages(t, self.keyword_automaton.scan(t), KEYWORD_ONLY_SCORES)
+        metrics.STAGE_DECISIONS.inc(metrics.STAGE_NAMES[stage])
+        metrics.DEGRADED_CLASSIFICATIONS.inc()
+        if stage == 5:
+            return result[0], "Others", 0.0, 0.0
+        return result
+
+    @_on_snapshot
+    def classify(self, text: str, scores: PrototypeScores | None = None) -> Tuple[str, str, float, float]:
         """
         Returns primary_category, subcategory, primary_confidence, subcategory_confidence
         
@@ -211,9 +1004,23 @@ class FraudClassifier:
         2. Fast keyword matching for high-precision cases
         3. Embedding-based similarity for ambiguous cases
         4. Confidence-aware fallback to "Others" or "uncertain"
+
+        The text is embedded once up front and every stage reads its confidences
+        from the resulting PrototypeScores; callers that already embedded the text
+        (e.g. in a batch) can pass ``scores`` to skip the forward pass.
         """
         t = text.lower()
-        
+        hits = self.keyword_automaton.scan(t)
+        if scores is None:
+            self._calls.embedder = 0
+            scores = self.score_text(text)
+            metrics.EMBEDDER_CALLS_PER_REQUEST.observe(self._calls.embedder)
+        stage, result = self._run_stages(t, hits, scores)
+        metrics.STAGE_DECISIONS.inc(metrics.STAGE_NAMES[stage])
+        return result
+
+    def _run_stages(self, t: str, hits: KeywordHits, scores: PrototypeScores) -> Tuple[int, Tuple[str, str, float, float]]:
+        """Decision stages of classify(); returns (stage number, classification)."""
         # STAGE 0: Detect strong financial fraud signals FIRST (highest priority)
         # These are definitive financial fraud indicators that should override other signals
         strong_financial_indicators = {
@@ -233,67 +1040,58 @@ class FraudClassifier:
         if strong_financial_indicators["has_amount"] and financial_score >= 3:
             # Determine specific financial subcategory
             if strong_financial_indicators["has_card"]:
-                if "credit" in t and "card" in t:
-                    emb = self.embedder.embed([text])[0]
-                    primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                if hits.any("word:credit") and hits.any("word:card"):
+                    primary_conf = scores.confidence("Financial Fraud")
                     primary_conf = max(primary_conf, 0.85)  # High confidence for clear card fraud
-                    sub_conf = max(self._score_subcategory_by_embedding(emb, "Credit Card Fraud"), 0.80)
-                    return "Financial Fraud", "Credit Card Fraud", float(primary_conf), float(sub_conf)
-                elif "debit" in t and "card" in t:
-                    emb = self.embedder.embed([text])[0]
-                    primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                    sub_conf = max(scores.confidence("Credit Card Fraud"), 0.80)
+                    return 0, ("Financial Fraud", "Credit Card Fraud", float(primary_conf), float(sub_conf))
+                elif hits.any("word:debit") and hits.any("word:card"):
+                    primary_conf = scores.confidence("Financial Fraud")
                     primary_conf = max(primary_conf, 0.85)
-                    sub_conf = max(self._score_subcategory_by_embedding(emb, "Debit Card Fraud"), 0.80)
-                    return "Financial Fraud", "Debit Card Fraud", float(primary_conf), float(sub_conf)
+                    sub_conf = max(scores.confidence("Debit Card Fraud"), 0.80)
+                    return 0, ("Financial Fraud", "Debit Card Fraud", float(primary_conf), float(sub_conf))
                 else:
                     # Generic card fraud
-                    emb = self.embedder.embed([text])[0]
-                    primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                    primary_conf = scores.confidence("Financial Fraud")
                     primary_conf = max(primary_conf, 0.82)
                     # Determine if credit or debit based on keywords
-                    if "credit" in t:
-                        sub_conf = max(self._score_subcategory_by_embedding(emb, "Credit Card Fraud"), 0.78)
-                        return "Financial Fraud", "Credit Card Fraud", float(primary_conf), float(sub_conf)
+                    if hits.any("word:credit"):
+                        sub_conf = max(scores.confidence("Credit Card Fraud"), 0.78)
+                        return 0, ("Financial Fraud", "Credit Card Fraud", float(primary_conf), float(sub_conf))
                     else:
-                        sub_conf = max(self._score_subcategory_by_embedding(emb, "Debit Card Fraud"), 0.78)
-                        return "Financial Fraud", "Debit Card Fraud", float(primary_conf), float(sub_conf)
+                        sub_conf = max(scores.confidence("Debit Card Fraud"), 0.78)
+                        return 0, ("Financial Fraud", "Debit Card Fraud", float(primary_conf), float(sub_conf))
             
             elif strong_financial_indicators["has_upi"]:
-                emb = self.embedder.embed([text])[0]
-                primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                primary_conf = scores.confidence("Financial Fraud")
                 primary_conf = max(primary_conf, 0.83)
                 # Determine if UPI or E-Wallet based on keywords
                 # PhonePe, Paytm, GPay can be both UPI and E-Wallet, but if UPI mentioned explicitly, use UPI
-                if "upi" in t or "@" in text:
-                    sub_conf = max(self._score_subcategory_by_embedding(emb, "UPI Fraud"), 0.78)
-                    return "Financial Fraud", "UPI Fraud", float(primary_conf), float(sub_conf)
+                if hits.any("word:upi") or hits.any("word:@"):
+                    sub_conf = max(scores.confidence("UPI Fraud"), 0.78)
+                    return 0, ("Financial Fraud", "UPI Fraud", float(primary_conf), float(sub_conf))
                 else:
                     # Could be E-Wallet or UPI, choose based on embedding
-                    upi_score = self._score_subcategory_by_embedding(emb, "UPI Fraud")
-                    wallet_score = self._score_subcategory_by_embedding(emb, "E-Wallet Fraud")
+                    upi_score = scores.confidence("UPI Fraud")
+                    wallet_score = scores.confidence("E-Wallet Fraud")
                     if upi_score > wallet_score:
-                        return "Financial Fraud", "UPI Fraud", float(primary_conf), float(upi_score)
+                        return 0, ("Financial Fraud", "UPI Fraud", float(primary_conf), float(upi_score))
                     else:
-                        return "Financial Fraud", "E-Wallet Fraud", float(primary_conf), float(wallet_score)
+                        return 0, ("Financial Fraud", "E-Wallet Fraud", float(primary_conf), float(wallet_score))
             
             elif strong_financial_indicators["has_bank"] or strong_financial_indicators["has_account"]:
                 # Bank account related fraud
-                emb = self.embedder.embed([text])[0]
-                primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                primary_conf = scores.confidence("Financial Fraud")
                 primary_conf = max(primary_conf, 0.80)
                 # Could be UPI or other banking fraud
-                best_sub, sub_conf = self._best_subcategory_by_embedding(emb, 
-                    ["UPI Fraud", "Debit Card Fraud", "Credit Card Fraud", "E-Wallet Fraud", "Others"])
+                best_sub, sub_conf = scores.best(["UPI Fraud", "Debit Card Fraud", "Credit Card Fraud", "E-Wallet Fraud", "Others"])
                 sub_conf = max(sub_conf, 0.75)
-                return "Financial Fraud", best_sub, float(primary_conf), float(sub_conf)
+                return 0, ("Financial Fraud", best_sub, float(primary_conf), float(sub_conf))
         
         # STAGE 1: Check for fraud call ONLY if no strong financial indicators
         # Fraud call should only be detected when it's clearly about receiving fraudulent calls
         # NOT when someone mentions "the caller" in context of a financial fraud
-        fraud_call_signals = ["fraud call", "fake call", "scam call", "received a call", 
-                              "got a call", "someone called me", "call from unknown", "received call"]
-        
-        fraud_call_count = sum(1 for sig in fraud_call_signals if sig in t)
+        fraud_call_count = hits.count("signal:fraud_call")
         
         # Only classify as fraud call if:
         # 1. Explicit fraud call mention AND
@@ -301,22 +1099,20 @@ class FraudClassifier:
         # 3. Focus is on the call itself, not the fraud aftermath
         if fraud_call_count >= 1 and financial_score < 3:
             # Additional check: make sure it's about the call itself, not just mentioning a caller
-            call_focus_words = ["received call", "got call", "call from", "calling me", "called me", "received a call", "got a call"]
             # Check if there's NO actual financial transaction completed
-            no_transaction = not any(word in t for word in ["taken away", "withdrawn", "lost money", "transferred", "paid", "debited", "charged"])
+            no_transaction = not hits.any("signal:completed_transaction")
             
-            if any(word in t for word in call_focus_words) and no_transaction:
-                emb = self.embedder.embed([text])[0]
-                primary_conf = (cosine_sim(emb, self.primary_proto_soc) + 1) / 2
+            if hits.any("signal:call_focus") and no_transaction:
+                primary_conf = scores.confidence("Social Media Fraud")
                 primary_conf = max(primary_conf, 0.75)
                 sub_conf = 0.85
-                return "Social Media Fraud", "Fraud Call - Impersonation", float(primary_conf), float(sub_conf)
+                return 1, ("Social Media Fraud", "Fraud Call - Impersonation", float(primary_conf), float(sub_conf))
         
         # STAGE 2: Strong keyword-based classification for financial fraud
         # Check for each financial category's keywords
         financial_matches = []
-        for category, keywords in self.financial_keywords.items():
-            match_count = sum(1 for kw in keywords if kw in t)
+        for category in self.financial_keywords:
+            match_count = hits.count(f"financial:{category}")
             if match_count > 0:
                 # Give extra weight to specific categories with strong signals
                 weight_multiplier = 1.0
@@ -324,9 +1120,9 @@ class FraudClassifier:
                     weight_multiplier = 2.0
                 elif category == "UPI Fraud" and strong_financial_indicators["has_upi"]:
                     weight_multiplier = 2.0
-                elif category == "Sextortion Fraud" and "sextortion" in t:
+                elif category == "Sextortion Fraud" and hits.any("word:sextortion"):
                     weight_multiplier = 2.5
-                elif category == "Digital Arrest Fraud" and "arrest" in t:
+                elif category == "Digital Arrest Fraud" and hits.any("word:arrest"):
                     weight_multiplier = 2.0
                 
                 weighted_score = match_count * weight_multiplier
@@ -339,124 +1135,68 @@ class FraudClassifier:
             best_fin_score = financial_matches[0][1]
             
             # If strong match (2+ keywords or category-specific signals), use it
-            if best_fin_score >= 2 or self._has_strong_financial_signal(t, best_fin_category):
-                emb = self.embedder.embed([text])[0]
-                primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+            if best_fin_score >= 2 or self._has_strong_financial_signal(hits, best_fin_category):
+                primary_conf = scores.confidence("Financial Fraud")
                 primary_conf = max(primary_conf, 0.75)  # boost confidence for keyword matches
-                sub_conf = self._score_subcategory_by_embedding(emb, best_fin_category)
+                sub_conf = scores.confidence(best_fin_category)
                 sub_conf = max(sub_conf, 0.70)
-                return "Financial Fraud", best_fin_category, float(primary_conf), float(sub_conf)
+                return 2, ("Financial Fraud", best_fin_category, float(primary_conf), float(sub_conf))
         
         # STAGE 3: Social media classification
-        social_signals = [p.lower() for p in SOCIAL_PLATFORMS] + ["profile", "account", "imperson", "fake profile", "hack", "obscene"]
-        
         # If explicit platform exists and words like profile/impersonation -> Social Media Fraud
         # But ONLY if financial score is low
-        social_keywords_found = sum(1 for kw in social_signals if kw in t)
+        social_keywords_found = hits.count("signal:social")
         if social_keywords_found >= 2 and financial_score < 3:
             # find best social subcategory by keyword
-            sub = self._best_social_subcategory(t)
+            sub = self._best_social_subcategory(hits)
             primary = "Social Media Fraud"
             # compute confidences
-            emb = self.embedder.embed([text])[0]
-            primary_conf = (cosine_sim(emb, self.primary_proto_soc) + 1) / 2
+            primary_conf = scores.confidence("Social Media Fraud")
             primary_conf = max(primary_conf, 0.70)  # boost for keyword match
-            sub_conf = self._score_subcategory_by_embedding(emb, sub)
+            sub_conf = scores.confidence(sub)
             sub_conf = max(sub_conf, 0.65)
-            return primary, sub, float(primary_conf), float(sub_conf)
+            return 3, (primary, sub, float(primary_conf), float(sub_conf))
         
         # STAGE 4: If monetary keywords exist but weak match -> likely financial
-        financial_signals = ["upi", "rupee", "rs ", "₹", "loan", "credit card", "debit card", "wallet", 
-                             "paytm", "phonepe", "google pay", "bank", "account number", "transaction", "payment"]
-        financial_signal_count = sum(1 for kw in financial_signals if kw in t)
+        financial_signal_count = hits.count("signal:financial")
         
         if financial_signal_count >= 1 or financial_matches:
-            emb = self.embedder.embed([text])[0]
             # decide best financial subcategory
             if financial_matches:
                 best_sub = financial_matches[0][0]
-                sub_conf = self._score_subcategory_by_embedding(emb, best_sub)
+                sub_conf = scores.confidence(best_sub)
             else:
-                best_sub, sub_conf = self._best_subcategory_by_embedding(emb, FINANCIAL_SUBCATEGORIES)
-            primary_conf = (cosine_sim(emb, self.primary_proto_fin) + 1) / 2
+                best_sub, sub_conf = scores.best(FINANCIAL_SUBCATEGORIES)
+            primary_conf = scores.confidence("Financial Fraud")
             primary = "Financial Fraud"
-            return primary, best_sub, float(primary_conf), float(sub_conf)
+            return 4, (primary, best_sub, float(primary_conf), float(sub_conf))
         
         # STAGE 5: Fallback to embedding similarity across all prototypes
-        emb = self.embedder.embed([text])[0]
         # compare to primary prototypes
-        sim_fin = cosine_sim(emb, self.primary_proto_fin)
-        sim_soc = cosine_sim(emb, self.primary_proto_soc)
+        sim_fin = scores.cosine("Financial Fraud")
+        sim_soc = scores.cosine("Social Media Fraud")
         
         if sim_fin >= sim_soc:
             primary = "Financial Fraud"
             primary_conf = (sim_fin + 1) / 2
-            best_sub, sub_conf = self._best_subcategory_by_embedding(emb, FINANCIAL_SUBCATEGORIES)
+            best_sub, sub_conf = scores.best(FINANCIAL_SUBCATEGORIES)
         else:
             primary = "Social Media Fraud"
             primary_conf = (sim_soc + 1) / 2
-            best_sub, sub_conf = self._best_subcategory_by_embedding(emb, SOCIAL_SUBCATEGORIES)
+            best_sub, sub_conf = scores.best(SOCIAL_SUBCATEGORIES)
         
-        return primary, best_sub, float(primary_conf), float(sub_conf)
+        return 5, (primary, best_sub, float(primary_conf), float(sub_conf))
     
-    def _has_strong_financial_signal(self, text: str, category: str) -> bool:
+    def _has_strong_financial_signal(self, hits: KeywordHits, category: str) -> bool:
         """Check for category-specific strong signals"""
-        strong_signals = {
-            "UPI Fraud": ["upi", "phonepe", "paytm", "google pay", "gpay", "bhim", "@ybl", "@paytm", "@oksbi"],
-            "Debit Card Fraud": ["debit", "atm", "debit card", "atm card"],
-            "Credit Card Fraud": ["credit card", "cc", "cvv", "credit limit"],
-            "Sextortion Fraud": ["blackmail", "intimate", "nude", "video", "sextortion", "extortion"],
-            "Digital Arrest Fraud": ["arrest", "police", "warrant", "legal notice", "digital arrest", "cyber crime arrest"],
-            "AEPS Fraud": ["aadhar", "biometric", "fingerprint", "aeps", "aadhar enabled"],
-            "Loan App Fraud": ["loan", "personal loan", "instant loan", "loan app"],
-            "E-Wallet Fraud": ["wallet", "phonepe", "paytm", "google pay", "e-wallet"],
-            "E-Commerce Fraud": ["amazon", "flipkart", "myntra", "meesho", "didn't receive", "fake product"],
-            "OLX Fraud": ["olx", "classified", "second hand"],
-            "Investment/Trading/IPO Fraud": ["investment", "trading", "ipo", "stock", "crypto", "bitcoin"],
-            "Gaming App Fraud": ["gaming", "pubg", "betting", "fantasy"],
-            "Lottery Fraud": ["lottery", "lucky draw", "prize", "won"],
-        }
-        signals = strong_signals.get(category, [])
-        match_count = sum(1 for sig in signals if sig in text)
         # Need at least 1 strong signal match
-        return match_count >= 1
+        return hits.count(f"strong:{category}") >= 1
 
-    def _best_social_subcategory(self, text: str) -> str:
+    def _best_social_subcategory(self, hits: KeywordHits) -> str:
         """Find best social media subcategory with improved platform detection"""
-        text_lower = text.lower()
-        
-        # Enhanced platform detection with variations
-        platform_variations = {
-            "Instagram": ["instagram", "insta", "ig account"],
-            "Facebook": ["facebook", "fb account", "fb profile"],
-            "WhatsApp": ["whatsapp", "whats app", "wa account"],
-            "Telegram": ["telegram", "tg account"],
-            "X": ["twitter", "x account", " x ", "tweet"],
-            "Snapchat": ["snapchat", "snap"],
-            "Gmail": ["gmail", "google mail", "email account"]
-        }
-        
-        # Issue keyword variations
-        issue_variations = {
-            "Impersonation": ["impersonat", "fake profile", "fake account", "using my photo", "using my name", "pretending to be"],
-            "Hack": ["hack", "hacked", "can't login", "changed password", "lost access", "unauthorized access"],
-            "Obscene Content": ["obscene", "morphed", "nude", "intimate", "vulgar", "inappropriate content", "explicit"],
-            "Fake Account": ["fake account", "fake profile", "scam account", "fraud account"]
-        }
-        
-        # Find matching platform
-        detected_platform = None
-        for platform, variations in platform_variations.items():
-            if any(var in text_lower for var in variations):
-                detected_platform = platform
-                break
-        
-        # Find matching issue
-        detected_issue = None
-        for issue, variations in issue_variations.items():
-            if any(var in text_lower for var in variations):
-                detected_issue = issue
-                break
+        # Find matching platform / issue (first in table order)
+        detected_platform = next((p for p in self.platform_variations if hits.any(f"platform:{p}")), None)
+        detected_issue = next((i for i in self.issue_variations if hits.any(f"issue:{i}")), None)
         
         # If both detected, return combination
         if detected_platform and detected_issue:
@@ -465,11 +1205,11 @@ class FraudClassifier:
         # If only platform detected, try to infer issue from context
         if detected_platform:
             # Default issue inference based on keywords
-            if any(word in text_lower for word in ["hack", "hacked", "can't login", "lost access"]):
+            if hits.any("infer:Hack"):
                 return f"{detected_platform} - Hack"
-            elif any(word in text_lower for word in ["fake", "imperson", "pretend"]):
+            elif hits.any("infer:Impersonation"):
                 return f"{detected_platform} - Impersonation"
-            elif any(word in text_lower for word in ["obscene", "morphed", "nude"]):
+            elif hits.any("infer:Obscene Content"):
                 return f"{detected_platform} - Obscene Content"
             else:
                 return f"{detected_platform} - Fake Account"
@@ -477,42 +1217,20 @@ class FraudClassifier:
         # If only issue detected, try to infer platform
         if detected_issue:
             # Try to find any social media related word
-            if "email" in text_lower or "@gmail" in text_lower or "@" in text_lower:
+            if hits.any("context:email"):
                 return f"Gmail - {detected_issue}"
-            elif "message" in text_lower or "contact" in text_lower:
+            elif hits.any("context:message"):
                 return f"WhatsApp - {detected_issue}"
             else:
                 return f"Facebook - {detected_issue}"  # Default platform
         
         # Ultimate fallback - check for fraud call
-        if any(word in text_lower for word in ["call", "calling", "phone", "called"]):
+        if hits.any("context:call"):
             return "Fraud Call - Impersonation"
         
         # Default fallback
         return "Facebook - Impersonation"
 
-    def _best_subcategory_by_embedding(self, emb: np.ndarray, candidate_list: List[str]) -> Tuple[str, float]:
-        best = None
-        best_score = -1.0
-        for c in candidate_list:
-            proto = self.prototypes.get(c)
-            if proto is None:
-                continue
-            s = cosine_sim(emb, proto)
-            if s > best_score:
-                best_score = s
-                best = c
-        # normalize
-        conf = (best_score + 1) / 2 if best_score is not None else 0.0
-        return best or "Others", float(conf)
-
-    def _score_subcategory_by_embedding(self, emb: np.ndarray, sub: str) -> float:
-        proto = self.prototypes.get(sub)
-        if proto is None:
-            return 0.0
-        return float((cosine_sim(emb, proto) + 1) / 2)
-
-
 if __name__ == "__main__":
     # quick local test
     cls = FraudClassifier()
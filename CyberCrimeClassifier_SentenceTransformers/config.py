@@ -0,0 +1,127 @@
+"""
+config.py
+
+Runtime settings for the classifier service. Every value can be overridden with
+an environment variable of the same name prefixed with CLASSIFIER_.
+"""
+import os
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Config:
+    """Classifier service configuration"""
+
+    # Micro-batching for POST /classify: requests arriving within the window are
+    # embedded together in one padded forward pass (up to BATCH_MAX_SIZE texts).
+    BATCH_MAX_SIZE = int(os.getenv("CLASSIFIER_BATCH_MAX_SIZE", 16))
+    BATCH_WINDOW_MS = float(os.getenv("CLASSIFIER_BATCH_WINDOW_MS", 5))
+    # All model work (/classify and /classify/batch chunks) goes through the
+    # batcher; beyond BATCH_QUEUE_SIZE waiting texts it answers 429 (0: unbounded).
+    BATCH_QUEUE_SIZE = int(os.getenv("CLASSIFIER_BATCH_QUEUE_SIZE", 128))
+
+    # POST /classify/batch: complaints are sorted by length and classified in
+    # chunks of this many texts per forward pass.
+    BULK_BATCH_SIZE = int(os.getenv("CLASSIFIER_BULK_BATCH_SIZE", 32))
+
+    # Prototype embeddings are cached here (keyed by model, tokenizer and keyword
+    # tables) so restarts skip re-embedding. Set to an empty string to disable.
+    PROTOTYPE_CACHE_DIR = os.getenv("CLASSIFIER_PROTOTYPE_CACHE_DIR", os.path.join(_HERE, ".cache", "prototypes"))
+    # Entries kept in the directory (most recently used first); processes sharing
+    # it with other backbones, engines or tables each keep theirs.
+    PROTOTYPE_CACHE_KEEP = int(os.getenv("CLASSIFIER_PROTOTYPE_CACHE_KEEP", 8))
+
+    # Frozen classifier bundle written by `python artifact_bundle.py build`. When
+    # set, tokenizer, weights (mmap'd), prototypes, keyword tables and spaCy are
+    # loaded from this directory instead of HuggingFace and the prototype cache.
+    BUNDLE_DIR = os.getenv("CLASSIFIER_BUNDLE_DIR", "")
+
+    # Encoder backbone: a HuggingFace model id or a short name from
+    # classifier.BACKBONES ("distilbert", "minilm-l6", "minilm-l3"). ONNX graphs
+    # and static tables are kept per backbone under ONNX_DIR / STATIC_DIR.
+    MODEL_NAME = os.getenv("CLASSIFIER_MODEL_NAME", "distilbert")
+
+    # Embedding engine: "torch" (PyTorch DistilBERT), "onnx" (ONNX Runtime fp32),
+    # "onnx-int8" (dynamically quantized) or "static" (per-token table distilled
+    # from DistilBERT, no forward pass). ONNX models are exported on first use
+    # into ONNX_DIR; the static table must be distilled into STATIC_DIR beforehand
+    # (`python static_embedder.py distill`); ONNX_THREADS=0
+    # lets ONNX Runtime pick the thread count.
+    EMBEDDING_BACKEND = os.getenv("CLASSIFIER_EMBEDDING_BACKEND", "torch")
+    ONNX_DIR = os.getenv("CLASSIFIER_ONNX_DIR", os.path.join(_HERE, ".cache", "onnx"))
+    ONNX_THREADS = int(os.getenv("CLASSIFIER_ONNX_THREADS", 0))
+    STATIC_DIR = os.getenv("CLASSIFIER_STATIC_DIR", os.path.join(_HERE, ".cache", "static"))
+
+    # Tokenization: complaints are truncated to MAX_SEQ_LENGTH tokens (0: the
+    # model's own limit, 512 for DistilBERT; 256 is faster but cuts long
+    # complaints), and each embed call is split into forward passes per
+    # sequence-length tier so short texts are not padded to long ones. Empty
+    # LENGTH_BUCKETS disables tiering.
+    MAX_SEQ_LENGTH = int(os.getenv("CLASSIFIER_MAX_SEQ_LENGTH", 0))
+    LENGTH_BUCKETS = os.getenv("CLASSIFIER_LENGTH_BUCKETS", "32,64,128,256")
+
+    # Long-document mode (opt-in): instead of truncating at MAX_SEQ_LENGTH, split
+    # complaints into windows overlapping by LONG_DOC_STRIDE tokens, embed them in
+    # one batch and pool with "mean" (length-weighted embedding mean) or "max"
+    # (max similarity per prototype). LONG_DOC_MAX_WINDOWS bounds windows per text.
+    LONG_DOC_POOLING = os.getenv("CLASSIFIER_LONG_DOC_POOLING", "off")
+    LONG_DOC_STRIDE = int(os.getenv("CLASSIFIER_LONG_DOC_STRIDE", 64))
+    LONG_DOC_MAX_WINDOWS = int(os.getenv("CLASSIFIER_LONG_DOC_MAX_WINDOWS", 8))
+
+    # Prototype bank: with PROTOTYPE_CENTROIDS=k > 0 every keyword phrase of a
+    # subcategory is embedded and clustered into at most k centroids, and the
+    # subcategory scores as its best centroid. 0 keeps one prototype per
+    # subcategory (its first three keywords joined).
+    PROTOTYPE_CENTROIDS = int(os.getenv("CLASSIFIER_PROTOTYPE_CENTROIDS", 0))
+
+    # Keyword tables from a versioned JSON file (see keyword_tables.py) instead of
+    # the built-in ones. POST /admin/tables/reload swaps in an edited file while
+    # serving; with KEYWORD_TABLES_POLL_SECONDS > 0 the file is also watched.
+    KEYWORD_TABLES_FILE = os.getenv("CLASSIFIER_KEYWORD_TABLES", "")
+    KEYWORD_TABLES_POLL_SECONDS = float(os.getenv("CLASSIFIER_KEYWORD_TABLES_POLL_SECONDS", 0))
+
+    # The /admin routes (cache flush, table reload and version) need this token in
+    # an X-Admin-Token header; empty leaves them disabled (403).
+    ADMIN_TOKEN = os.getenv("CLASSIFIER_ADMIN_TOKEN", "")
+
+    # Early exit (torch engine): after each layer listed in EARLY_EXIT_MARGINS
+    # ("layer:margin,..."), the mean-pooled hidden state is scored against
+    # prototypes embedded at that layer, and complaints whose top-1 vs top-2
+    # subcategory cosine margin reaches the margin skip the remaining layers.
+    # Calibrate with `python early_exit.py calibrate`; empty disables early exit.
+    EARLY_EXIT_MARGINS = os.getenv("CLASSIFIER_EARLY_EXIT_MARGINS", "")
+
+    # Entity extraction only looks at the first ENTITY_MAX_CHARS characters of a
+    # complaint, bounding regex and NER cost for pasted logs or chat exports.
+    ENTITY_MAX_CHARS = int(os.getenv("CLASSIFIER_ENTITY_MAX_CHARS", 10000))
+
+    # spaCy NER in extract_entities_batch(): texts per nlp.pipe batch and worker
+    # processes (n_process > 1 forks spaCy workers for large bulk jobs).
+    SPACY_BATCH_SIZE = int(os.getenv("CLASSIFIER_SPACY_BATCH_SIZE", 64))
+    SPACY_N_PROCESS = int(os.getenv("CLASSIFIER_SPACY_N_PROCESS", 1))
+
+    # /classify response cache keyed by normalized complaint text. Entries expire
+    # after RESULT_CACHE_TTL_SECONDS; RESULT_CACHE_SIZE=0 disables the cache.
+    RESULT_CACHE_SIZE = int(os.getenv("CLASSIFIER_RESULT_CACHE_SIZE", 10000))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("CLASSIFIER_RESULT_CACHE_TTL_SECONDS", 3600))
+
+    # Bounded inference executor for /classify. At most INFERENCE_WORKERS requests
+    # run model work at once and INFERENCE_QUEUE_SIZE more may wait; beyond that
+    # requests get 429. Requests predicted to wait longer than INFERENCE_DEADLINE_MS
+    # get 503 (0 disables the deadline). Both carry a Retry-After header.
+    INFERENCE_WORKERS = int(os.getenv("CLASSIFIER_INFERENCE_WORKERS", 16))
+    INFERENCE_QUEUE_SIZE = int(os.getenv("CLASSIFIER_INFERENCE_QUEUE_SIZE", 64))
+    INFERENCE_DEADLINE_MS = float(os.getenv("CLASSIFIER_INFERENCE_DEADLINE_MS", 25000))
+
+    # serve.py (pre-fork multi-worker server): SERVE_WORKERS=0 starts one worker
+    # per available core; TORCH_THREADS=0 gives each worker cores // workers
+    # intra-op threads so workers x threads never oversubscribes the host.
+    SERVE_HOST = os.getenv("CLASSIFIER_SERVE_HOST", "127.0.0.1")
+    SERVE_PORT = int(os.getenv("CLASSIFIER_SERVE_PORT", 8000))
+    SERVE_WORKERS = int(os.getenv("CLASSIFIER_SERVE_WORKERS", 0))
+    TORCH_THREADS = int(os.getenv("CLASSIFIER_TORCH_THREADS", 0))
+
+    # Models load in the background after startup. While DistilBERT is loading,
+    # /classify answers from the keyword stages only (marked "degraded": true);
+    # set to 0 to answer 503 with Retry-After instead.
+    SERVE_DEGRADED = os.getenv("CLASSIFIER_SERVE_DEGRADED", "1") not in ("0", "false", "False")
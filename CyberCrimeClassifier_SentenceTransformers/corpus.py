@@ -0,0 +1,82 @@
+"""
+corpus.py
+
+Labelled example complaints collected from the repo's test scripts.
+
+The test scripts (test_examples.py, test_classification_improvements.py, ...)
+talk to a running server and some of them sleep or prompt at import time, so the
+examples are read with `ast` instead of importing the files. Every dict literal
+with a "text" or "complaint" string becomes one example; label keys are
+normalised to expected_primary / expected_sub / expected_sub_contains /
+expected_priority.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+import ast
+import os
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+SOURCE_FILES = [
+    "test_examples.py",
+    "test_specific.py",
+    "test_classification_improvements.py",
+    "test_priority_classification.py",
+    "test_enhanced_suggestions.py",
+]
+
+_TEXT_KEYS = ("text", "complaint", "complaint_text")
+_LABEL_KEYS = {
+    "expected_primary": "expected_primary",
+    "expected_category": "expected_primary",
+    "expected_sub": "expected_sub",
+    "expected_subcategory": "expected_sub",
+    "expected_sub_contains": "expected_sub_contains",
+    "expected_priority": "expected_priority",
+}
+
+
+def _literal_dicts(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    found = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Dict):
+            continue
+        entry = {}
+        for k, v in zip(node.keys, node.values):
+            if isinstance(k, ast.Constant) and isinstance(v, ast.Constant) and isinstance(v.value, str):
+                entry[k.value] = v.value
+        if any(key in entry for key in _TEXT_KEYS):
+            found.append(entry)
+    return found
+
+
+def load_examples(base_dir: str = _HERE) -> List[Dict[str, Any]]:
+    """All labelled examples in source order; the same text may appear in several files."""
+    examples = []
+    for name in SOURCE_FILES:
+        path = os.path.join(base_dir, name)
+        if not os.path.exists(path):
+            continue
+        for entry in _literal_dicts(path):
+            text = next(entry[k] for k in _TEXT_KEYS if k in entry)
+            example = {"text": text, "source": name}
+            for key, norm in _LABEL_KEYS.items():
+                if key in entry:
+                    example[norm] = entry[key]
+            examples.append(example)
+    return examples
+
+
+def load_texts(base_dir: str = _HERE) -> List[str]:
+    """Unique example texts, in first-seen order."""
+    return list(dict.fromkeys(e["text"] for e in load_examples(base_dir)))
+
+
+if __name__ == "__main__":
+    examples = load_examples()
+    print(f"{len(examples)} examples, {len(load_texts())} unique texts")
+    for name in SOURCE_FILES:
+        print(f"  {name}: {sum(1 for e in examples if e['source'] == name)}")
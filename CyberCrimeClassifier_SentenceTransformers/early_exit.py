@@ -0,0 +1,192 @@
+"""
+early_exit.py
+
+Calibration and reporting for early-exit encoding (CLASSIFIER_EARLY_EXIT_MARGINS).
+
+With early exit on, FraudClassifier runs DistilBERT one transformer layer at a
+time. After each configured layer it mean-pools the hidden states, scores them
+against prototypes embedded at that same layer, and stops a complaint whose
+top-1 subcategory beats the top-2 by at least the layer's margin; the rule
+stages then read their confidences from those layer scores.
+
+    python early_exit.py calibrate [--target 0.99] [--texts complaints.txt]
+    python early_exit.py report [--margins 2:0.12,4:0.08]
+
+`calibrate` encodes the example corpus (plus --texts, one complaint per line)
+through every layer and, per layer, picks the smallest margin at which the
+complaints exiting there get the same top subcategory prototype and the same
+final classification as the full model for at least --target of them. It prints the CLASSIFIER_EARLY_EXIT_MARGINS
+value and the expected exit-layer distribution.
+
+`report` classifies the corpus with the given margins and prints the exit-layer
+distribution, the agreement with the full model, the share of layers run and
+the embedding latency of both.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+import argparse
+import logging
+import math
+import sys
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def parse_exit_margins(spec: str) -> Dict[int, float]:
+    """'2:0.12,4:0.08' -> {2: 0.12, 4: 0.08}; empty -> {} (early exit off)."""
+    margins = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        layer, _, margin = part.partition(":")
+        if not margin:
+            raise ValueError(f"Early-exit margin '{part}' is not of the form layer:margin")
+        margins[int(layer)] = float(margin)
+    return dict(sorted(margins.items()))
+
+
+def format_exit_margins(margins: Dict[int, float]) -> str:
+    return ",".join(f"{layer}:{margin:.4f}" for layer, margin in sorted(margins.items()) if math.isfinite(margin))
+
+
+def calibrate_layer(margins: Sequence[float], agrees: Sequence[bool], target: float) -> float:
+    """
+    Smallest threshold t such that, of the complaints with margin >= t, at least
+    `target` agree with the full model; inf when no threshold qualifies.
+    """
+    order = sorted(range(len(margins)), key=lambda i: -margins[i])
+    best, correct = math.inf, 0
+    for n, i in enumerate(order, start=1):
+        correct += bool(agrees[i])
+        at_boundary = n == len(order) or margins[order[n]] < margins[i]  # ties exit together
+        if at_boundary and correct / n >= target:
+            best = margins[i]
+    return best
+
+
+def _load_texts(path: Optional[str]) -> List[str]:
+    from corpus import load_texts
+
+    texts = load_texts()
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            texts += [line.strip() for line in f if line.strip()]
+    return texts
+
+
+def calibrate(target: float, texts: List[str]) -> Dict[int, float]:
+    import numpy as np
+    from classifier import FraudClassifier, PrototypeScores
+    from tokenization import tokenize
+
+    classifier = FraudClassifier(backend="torch", exit_margins="")
+    n_layers = classifier.embedder.n_layers
+    # layer prototypes for every intermediate layer; an infinite margin never exits
+    classifier.exit_margins = {layer: math.inf for layer in range(1, n_layers)}
+    classifier._setup_early_exit()
+    if not classifier.exit_margins:
+        raise SystemExit("❌ Early exit is not available for this engine")
+    embedder = classifier.embedder
+    ids = tokenize(embedder.tokenizer, texts, embedder.max_length)
+    by_layer = embedder.embed_ids_layers(ids, list(classifier.exit_margins))
+    full_scores = [classifier.score_embedding(e) for e in by_layer[n_layers]]
+    full = [classifier.classify(t, scores=s)[:2] for t, s in zip(texts, full_scores)]
+    full_best = [s.sims[classifier._sub_rows].argmax() for s in full_scores]
+
+    margins: Dict[int, float] = {}
+    layer_margins, layer_agrees = {}, {}
+    for layer in classifier.exit_margins:
+        sims = classifier.layer_sims(layer, by_layer[layer])
+        top2 = np.sort(sims[:, classifier._sub_rows], axis=1)[:, -2:]
+        layer_margins[layer] = list(top2[:, 1] - top2[:, 0])
+        best = sims[:, classifier._sub_rows].argmax(1)
+        layer_agrees[layer] = [
+            b == fb and classifier.classify(t, scores=PrototypeScores(s, classifier.proto_index))[:2] == f
+            for t, s, f, b, fb in zip(texts, sims, full, best, full_best)
+        ]
+        margins[layer] = calibrate_layer(layer_margins[layer], layer_agrees[layer], target)
+
+    # expected behaviour with these margins: every complaint leaves at its first qualifying layer
+    exits, agree = {layer: 0 for layer in list(margins) + [n_layers]}, 0
+    for i in range(len(texts)):
+        layer = next((l for l in margins if layer_margins[l][i] >= margins[l]), n_layers)
+        exits[layer] += 1
+        agree += layer == n_layers or layer_agrees[layer][i]
+    print("=" * 80)
+    print(f"EARLY-EXIT CALIBRATION: {len(texts)} texts, target agreement {target:.1%}")
+    print("=" * 80)
+    for layer in margins:
+        shown = "never" if math.isinf(margins[layer]) else f"{margins[layer]:.4f}"
+        print(f"Layer {layer}/{n_layers}: margin {shown}")
+    _print_distribution(exits, n_layers, len(texts))
+    print(f"Expected agreement with the full model: {agree}/{len(texts)} ({agree / len(texts):.1%})")
+    print(f"\nCLASSIFIER_EARLY_EXIT_MARGINS={format_exit_margins(margins)}")
+    return margins
+
+
+def _print_distribution(exits: Dict[int, int], n_layers: int, total: int):
+    print("Exit layer distribution:")
+    for layer, count in sorted(exits.items()):
+        print(f"  layer {layer}: {count:5d} ({count / total:6.1%}) {'#' * round(40 * count / total)}")
+    layers_run = sum(layer * count for layer, count in exits.items())
+    print(f"Layers run: {layers_run / (n_layers * total):.1%} of the full model")
+
+
+def report(spec: str, texts: List[str]) -> bool:
+    import metrics
+    from classifier import FraudClassifier
+
+    classifier = FraudClassifier(backend="torch", exit_margins=spec)
+    if not classifier.exit_margins:
+        print("❌ Early exit is off: set --margins or CLASSIFIER_EARLY_EXIT_MARGINS (see `calibrate`)")
+        return False
+    n_layers = classifier.embedder.n_layers
+    margins, classifier.exit_margins = classifier.exit_margins, {}
+    start = time.perf_counter()
+    full = [classifier.classify(text)[:2] for text in texts]
+    full_seconds = time.perf_counter() - start
+    classifier.exit_margins = margins
+    with metrics.EXIT_LAYER.capture() as captured:
+        start = time.perf_counter()
+        early = [classifier.classify(text)[:2] for text in texts]
+        early_seconds = time.perf_counter() - start
+    layers = captured.get((), [])
+    exits = {layer: 0 for layer in list(margins) + [n_layers]}
+    for layer in layers:
+        exits[int(layer)] += 1
+    agree = sum(a == b for a, b in zip(full, early))
+
+    print("=" * 80)
+    print(f"EARLY-EXIT REPORT: margins {format_exit_margins(margins)} ({len(texts)} texts)")
+    print("=" * 80)
+    _print_distribution(exits, n_layers, len(texts))
+    print(f"Agreement with the full model: {agree}/{len(texts)} ({agree / len(texts):.1%})")
+    print(f"classify() per text: full {full_seconds / len(texts) * 1e3:.2f} ms, "
+          f"early exit {early_seconds / len(texts) * 1e3:.2f} ms")
+    for text, a, b in zip(texts, full, early):
+        if a != b:
+            print(f"  ✗ {text[:70]}...")
+            print(f"      full: {a}  early exit: {b}")
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_cal = sub.add_parser("calibrate", help="pick per-layer margins for a target agreement")
+    p_cal.add_argument("--target", type=float, default=0.99, help="agreement with the full model required per layer")
+    p_cal.add_argument("--texts", help="extra complaints, one per line")
+    p_rep = sub.add_parser("report", help="exit-layer distribution and agreement for given margins")
+    p_rep.add_argument("--margins", default=Config.EARLY_EXIT_MARGINS, help="layer:margin,... (default: config)")
+    p_rep.add_argument("--texts", help="extra complaints, one per line")
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        calibrate(args.target, _load_texts(args.texts))
+    else:
+        sys.exit(0 if report(args.margins, _load_texts(args.texts)) else 1)
@@ -10,86 +10,122 @@ Extracts:
 - URLs
 - platform mentions
 
+Regex entities come from one combined scanner (ENTITY_RE) that makes a single
+left-to-right pass; input is capped at Config.ENTITY_MAX_CHARS characters.
+spaCy is loaded with only the components NER needs (the tagger, parser,
+lemmatizer etc. are excluded) and is skipped entirely for callers that only
+asked for regex entities. extract_entities_batch() runs NER through nlp.pipe.
 """
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, Iterable, List, Optional, Any, Sequence, Union
 import logging
 
+from config import Config
+from metrics import PHASE_SECONDS
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# SpaCy is optional - if not available, use regex-only mode
-try:
-    import spacy
-    def ensure_spacy_model(model_name: str = "en_core_web_sm"):
+# SpaCy is optional - if not available, use regex-only mode.
+# The model is loaded by load_nlp() (main.py does so in the background); until
+# then extract_entities() runs regex-only.
+nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+# Components of the en_core_web_* pipelines that doc.ents does not depend on
+NON_NER_COMPONENTS = ["tagger", "morphologizer", "parser", "senter", "attribute_ruler", "lemmatizer"]
+
+
+def _load_ner_pipeline(spacy, model_name: str):
+    """spacy.load() without the components NER does not use."""
+    pipeline = spacy.load(model_name, exclude=NON_NER_COMPONENTS)
+    # the small model's NER carries its own tok2vec; the shared one only fed the
+    # excluded tagger/parser and can go too
+    if "tok2vec" in pipeline.pipe_names and not pipeline.get_pipe("tok2vec").listening_components:
+        pipeline.remove_pipe("tok2vec")
+    logger.info(f"SpaCy pipeline {model_name}: {pipeline.pipe_names}")
+    return pipeline
+
+
+def load_nlp(model_name: str = "en_core_web_sm"):
+    """Load the spaCy NER pipeline once; returns it, or None in regex-only mode."""
+    global nlp, _nlp_loaded
+    with _nlp_lock:
+        if _nlp_loaded:
+            return nlp
         try:
-            return spacy.load(model_name)
-        except Exception:
-            logger.warning(f"SpaCy model {model_name} not available. Using regex-only mode.")
-            return None
-    nlp = ensure_spacy_model()
-except ImportError:
-    logger.warning("SpaCy not installed. Using regex-only entity extraction.")
-    nlp = None
-
-# regex patterns
-AMOUNT_RE = re.compile(r"(₹|Rs\.?\s?|INR\s?)[\s]*\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", flags=re.IGNORECASE)
-PHONE_RE = re.compile(r"(?:\+91|91|0)?[-\s]?(?:\d{10}|\d{5}[-\s]?\d{5}|\d{3}[-\s]?\d{3}[-\s]?\d{4})")
-UPI_RE = re.compile(r"[\w\.\-]{2,256}@[a-zA-Z]{2,64}")
-URL_RE = re.compile(r"https?://\S+|www\.\S+", flags=re.IGNORECASE)
-# Account number: typically 9-18 digits
-ACCOUNT_RE = re.compile(r"\b(?:account|acc|a/c)[\s\#\:\-]*(\d{9,18})\b", flags=re.IGNORECASE)
-# Transaction ID / Reference number: alphanumeric, often 10-20 chars
-TXN_RE = re.compile(r"(?:transaction|txn|ref|reference|utr)[\s\#\:\-]*([A-Z0-9]{10,20})\b", flags=re.IGNORECASE)
-# Date patterns: DD/MM/YYYY, DD-MM-YYYY, YYYY-MM-DD
-DATE_RE = re.compile(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b")
+            import spacy
+            try:
+                nlp = _load_ner_pipeline(spacy, model_name)
+            except Exception:
+                logger.warning(f"SpaCy model {model_name} not available. Using regex-only mode.")
+        except ImportError:
+            logger.warning("SpaCy not installed. Using regex-only entity extraction.")
+        _nlp_loaded = True
+        return nlp
+
+# Single-pass entity scanner: one alternation with a named group per entity
+# type, scanned once left to right. Every character belongs to at most one
+# entity: account/transaction numbers, URLs and UPI IDs are not also reported as
+# phone numbers. Patterns are written so that no position is rescanned more than
+# a bounded number of times (UPI IDs only start at the beginning of a
+# [\w.-] run), keeping the scan linear on long digit runs and '@'-dense text.
+ENTITY_RE = re.compile(
+    # cheap gate: skip positions inside a word that cannot start any entity
+    r"(?=(?<![\w.\-])|[^a-z]|[hwatrui])(?:"
+    r"(?P<url>https?://\S+|www\.\S+)"
+    # Account number: typically 9-18 digits
+    r"|\b(?:account|acc|a/c)[\s\#\:\-]*(?P<account>\d{9,18})\b"
+    # Transaction ID / Reference number: alphanumeric, often 10-20 chars
+    r"|(?:transaction|txn|ref|reference|utr)[\s\#\:\-]*(?P<txn>[A-Z0-9]{10,20})\b"
+    r"|(?P<upi>(?<![\w.\-])[\w.\-]{2,256}@[a-zA-Z]{2,64})"
+    r"|(?P<amount>(?:₹|Rs\.?\s?|INR\s?)\s*\d{1,3}[,\d]*(?:\.\d+)?)"
+    # Date patterns: DD/MM/YYYY, DD-MM-YYYY, YYYY-MM-DD
+    r"|\b(?P<date>\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b"
+    # digits followed by "@handle" are the local part of a UPI ID, not a phone number
+    r"|(?P<phone>(?=[+\d]|[-\s]\d)(?:\+91|91|0)?[-\s]?(?:\d{10}|\d{5}[-\s]?\d{5}|\d{3}[-\s]?\d{3}[-\s]?\d{4})"
+    r"(?![\w.\-]{0,256}@[a-zA-Z]{2})))",
+    flags=re.IGNORECASE,
+)
+ENTITY_TYPES = ("url", "account", "txn", "upi", "amount", "date", "phone")
+
 # Bank names (common Indian banks)
 BANKS = ["sbi", "hdfc", "icici", "axis", "pnb", "bob", "canara", "union bank", "kotak", "yes bank", "idbi", "indian bank"]
 
 PLATFORMS = ["instagram", "facebook", "x", "twitter", "whatsapp", "telegram", "gmail", "paytm", "phonepe", "google pay", "amazon", "flipkart", "olx"]
 
+# Entity fields a request can select; NER only runs if one of NER_FIELDS is selected
+REGEX_FIELDS = ("amount", "phone_numbers", "upi_id", "urls", "platform", "account_numbers",
+                "transaction_ids", "dates", "bank_names")
+NER_FIELDS = ("orgs", "persons")
+ENTITY_FIELDS = REGEX_FIELDS + NER_FIELDS
 
-def extract_entities(text: str) -> Dict[str, Any]:
-    t = text or ""
-    
-    # Extract amounts
-    amount_matches = [m.group(0) for m in AMOUNT_RE.finditer(t)]
-    
-    # Extract phone numbers
-    phones = [m.group(0) for m in PHONE_RE.finditer(t)]
-    
-    # Extract UPI IDs
-    upis = [m.group(0) for m in UPI_RE.finditer(t)]
-    
-    # Extract URLs
-    urls = [m.group(0) for m in URL_RE.finditer(t)]
-    
-    # Extract account numbers
-    accounts = [m.group(1) for m in ACCOUNT_RE.finditer(t)]
-    
-    # Extract transaction IDs
-    txn_ids = [m.group(1) for m in TXN_RE.finditer(t)]
-    
-    # Extract dates
-    dates = [m.group(0) for m in DATE_RE.finditer(t)]
+
+def needs_ner(fields: Optional[Iterable[str]]) -> bool:
+    """Whether a field selection (None = every field) includes spaCy entities."""
+    return fields is None or any(f in NER_FIELDS for f in fields)
+
+
+def scan(text: str) -> Dict[str, List[str]]:
+    """Every entity match of the text in one pass, as {entity type: matched strings in order}."""
+    found = {kind: [] for kind in ENTITY_TYPES}
+    for m in ENTITY_RE.finditer(text):
+        kind = m.lastgroup
+        found[kind].append(m.group(kind))
+    return found
+
+
+def _regex_entities(t: str) -> Dict[str, Any]:
+    found = scan(t)
     
     # Extract bank names
     low = t.lower()
     bank_names = [bank for bank in BANKS if bank in low]
     
-    # spacy NER for extras (organizations, persons) - only if spaCy is available
-    orgs = []
-    persons = []
-    if nlp is not None:
-        try:
-            doc = nlp(t)
-            orgs = [ent.text for ent in doc.ents if ent.label_ in ("ORG", "PRODUCT")]
-            persons = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
-        except Exception as e:
-            logger.warning(f"SpaCy NER failed: {e}")
-    
     # Detect platform
     platform = None
     for p in PLATFORMS:
@@ -98,20 +134,81 @@ def extract_entities(text: str) -> Dict[str, Any]:
             break
     
     return {
-        "amount": amount_matches[0] if amount_matches else None,
-        "phone_numbers": list(set(phones)) if phones else [],
-        "upi_id": upis[0] if upis else None,
-        "urls": urls,
+        "amount": found["amount"][0] if found["amount"] else None,
+        "phone_numbers": list(dict.fromkeys(found["phone"])),
+        "upi_id": found["upi"][0] if found["upi"] else None,
+        "urls": found["url"],
         "platform": platform,
-        "account_numbers": list(set(accounts)) if accounts else [],
-        "transaction_ids": list(set(txn_ids)) if txn_ids else [],
-        "dates": dates,
+        "account_numbers": list(dict.fromkeys(found["account"])),
+        "transaction_ids": list(dict.fromkeys(found["txn"])),
+        "dates": found["date"],
         "bank_names": bank_names,
-        "orgs": orgs,
-        "persons": persons,
     }
 
 
+def _ner_entities(doc) -> Dict[str, List[str]]:
+    return {
+        "orgs": [ent.text for ent in doc.ents if ent.label_ in ("ORG", "PRODUCT")],
+        "persons": [ent.text for ent in doc.ents if ent.label_ == "PERSON"],
+    }
+
+
+def extract_entities(text: str, ner: bool = True) -> Dict[str, Any]:
+    with PHASE_SECONDS.time("extract_entities"):
+        t = (text or "")[:Config.ENTITY_MAX_CHARS]
+        result = _regex_entities(t)
+        
+        # spacy NER for extras (organizations, persons) - only if spaCy is available
+        # and the caller asked for them
+        ner_result = {"orgs": [], "persons": []}
+        if ner and nlp is not None:
+            try:
+                with PHASE_SECONDS.time("spacy"):
+                    doc = nlp(t)
+                ner_result = _ner_entities(doc)
+            except Exception as e:
+                logger.warning(f"SpaCy NER failed: {e}")
+        
+        result.update(ner_result)
+        return result
+
+
+def extract_entities_batch(texts: List[str], batch_size: Optional[int] = None, n_process: Optional[int] = None,
+                           ner: Union[bool, Sequence[bool]] = True) -> List[Dict[str, Any]]:
+    """
+    Bulk version of extract_entities: regex passes per text, and a single
+    nlp.pipe stream for spaCy NER over the texts that need it. `ner` is one flag
+    for all texts or one per text. batch_size/n_process default to
+    Config.SPACY_BATCH_SIZE / Config.SPACY_N_PROCESS. Results are in input order.
+    """
+    ts = [(text or "")[:Config.ENTITY_MAX_CHARS] for text in texts]
+    results = [_regex_entities(t) for t in ts]
+    for result in results:
+        result.update({"orgs": [], "persons": []})
+    
+    flags = [ner] * len(ts) if isinstance(ner, bool) else list(ner)
+    todo = [i for i, flag in enumerate(flags) if flag]
+    if nlp is not None and todo:
+        try:
+            with PHASE_SECONDS.time("spacy"):
+                docs = nlp.pipe((ts[i] for i in todo),
+                                batch_size=batch_size or Config.SPACY_BATCH_SIZE,
+                                n_process=n_process or Config.SPACY_N_PROCESS)
+                for i, doc in zip(todo, docs):
+                    results[i].update(_ner_entities(doc))
+        except Exception as e:
+            logger.warning(f"SpaCy NER failed: {e}")
+    return results
+
+
+def select_fields(entities: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Keep only the selected entity fields (None keeps everything)."""
+    if fields is None:
+        return entities
+    wanted = set(fields)
+    return {k: v for k, v in entities.items() if k in wanted}
+
 if __name__ == "__main__":
+    load_nlp()
     s = "I lost ₹5,000 via UPI to test@okaxis. Contact +91-9876543210. The phishing site was http://scam.example.com"
     print(extract_entities(s))
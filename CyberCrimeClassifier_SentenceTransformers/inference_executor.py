@@ -0,0 +1,151 @@
+"""
+inference_executor.py
+
+Size-bounded executor for /classify model work with admission control.
+
+Work runs on a dedicated thread pool of `workers` threads with at most
+`queue_size` further jobs waiting. A submission is rejected immediately when
+  - the admission queue is full (Overloaded, reason="queue_full"), or
+  - the predicted queue wait (jobs ahead / workers * mean compute time) would
+    already exceed `deadline_ms` (Overloaded, reason="deadline").
+A job that nevertheless waited longer than the deadline is dropped when it
+reaches a worker instead of spending compute on a caller that has given up.
+Queue wait and compute time are measured separately for every job.
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, NamedTuple
+import math
+import threading
+import time
+
+_WINDOW = 1000  # recent jobs kept for latency percentiles
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"inference executor overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TimedResult(NamedTuple):
+    value: Any
+    queue_wait: float  # seconds between admission and start on a worker
+    compute: float  # seconds spent running the job
+
+
+def summarize(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int = 16, queue_size: int = 64, deadline_ms: float = 0.0):
+        self.workers = max(1, int(workers))
+        self.queue_size = max(0, int(queue_size))
+        self.capacity = self.workers + self.queue_size
+        self.deadline = max(0.0, float(deadline_ms)) / 1000.0  # 0 disables deadline checks
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0  # admitted and not yet finished
+        self._running = 0
+        self._mean_compute: float | None = None  # EWMA of compute time (seconds)
+        self._completed = 0
+        self._failed = 0
+        self._rejected_full = 0
+        self._rejected_deadline = 0
+        self._expired = 0
+        self._queue_waits: Deque[float] = deque(maxlen=_WINDOW)
+        self._computes: Deque[float] = deque(maxlen=_WINDOW)
+
+    def _retry_after(self) -> int:
+        # time to drain what is already admitted, at least one second
+        per_job = self._mean_compute or 0.1
+        return max(1, math.ceil(self._pending / self.workers * per_job))
+
+    def submit(self, fn: Callable[[], Any]) -> Future:
+        """Admit fn or raise Overloaded; the Future resolves to a TimedResult."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected_full += 1
+                raise Overloaded("queue_full", self._retry_after())
+            ahead = max(0, self._pending - self.workers + 1)
+            if self.deadline and self._mean_compute is not None:
+                predicted_wait = ahead / self.workers * self._mean_compute
+                if predicted_wait > self.deadline:
+                    self._rejected_deadline += 1
+                    raise Overloaded("deadline", self._retry_after())
+            self._pending += 1
+
+        admitted = time.monotonic()
+
+        def run() -> TimedResult:
+            started = time.monotonic()
+            queue_wait = started - admitted
+            with self._lock:
+                self._running += 1
+            try:
+                if self.deadline and queue_wait > self.deadline:
+                    with self._lock:
+                        self._expired += 1
+                    raise Overloaded("deadline", self._retry_after())
+                value = fn()
+                compute = time.monotonic() - started
+                with self._lock:
+                    self._completed += 1
+                    self._queue_waits.append(queue_wait)
+                    self._computes.append(compute)
+                    self._mean_compute = compute if self._mean_compute is None else 0.8 * self._mean_compute + 0.2 * compute
+                return TimedResult(value, queue_wait, compute)
+            except Overloaded:
+                raise
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+
+        try:
+            return self._pool.submit(run)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "deadline_ms": self.deadline * 1000,
+                "running": self._running,
+                "queued": max(0, self._pending - self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected_queue_full": self._rejected_full,
+                "rejected_deadline": self._rejected_deadline,
+                "expired_in_queue": self._expired,
+                "queue_wait": summarize(self._queue_waits),
+                "compute": summarize(self._computes),
+            }
@@ -0,0 +1,144 @@
+"""
+keyword_automaton.py
+
+Multi-pattern keyword matcher for the classifier's rule stages.
+
+All keyword tables are compiled once into a single Aho-Corasick automaton. One
+linear pass over the lowercased complaint finds every pattern occurrence; the
+set of matched patterns is then turned into a per-group hit-count vector with a
+single (groups x patterns) membership-matrix product. A group's count equals
+`sum(1 for kw in keywords if kw in text)` for the original keyword list, so the
+rule stages keep their exact semantics while their cost stops growing with the
+number of keywords.
+
+If the optional `pyahocorasick` C extension is installed it is used for the
+scan; otherwise a pure-Python automaton is built.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# pyahocorasick is optional - fall back to the pure-Python automaton
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class _PyAutomaton:
+    """Plain Aho-Corasick automaton; outputs are pattern ids."""
+
+    def __init__(self, patterns: List[str]):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Set[int]] = [set()]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add(pid)
+
+        # root children fail to the root; deeper states are linked breadth-first
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # merge outputs along the failure chain at build time
+                out[nxt] |= out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(sorted(o)) for o in out]
+
+    def matches(self, text: str) -> Set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class _CAutomaton:
+    """pyahocorasick-backed automaton with the same interface."""
+
+    def __init__(self, patterns: List[str]):
+        self._automaton = ahocorasick.Automaton()
+        for pid, pattern in enumerate(patterns):
+            self._automaton.add_word(pattern, pid)
+        self._automaton.make_automaton()
+
+    def matches(self, text: str) -> Set[int]:
+        return {pid for _, pid in self._automaton.iter(text)}
+
+
+class KeywordHits:
+    """Per-group hit counts for one text."""
+
+    __slots__ = ("counts", "_index")
+
+    def __init__(self, counts: np.ndarray, index: Dict[str, int]):
+        self.counts = counts
+        self._index = index
+
+    def count(self, group: str) -> int:
+        row = self._index.get(group)
+        return int(self.counts[row]) if row is not None else 0
+
+    def any(self, group: str) -> bool:
+        return self.count(group) > 0
+
+    def first(self, groups: Iterable[str]) -> Optional[str]:
+        """First group (in the given order) with at least one hit."""
+        for group in groups:
+            if self.count(group) > 0:
+                return group
+        return None
+
+
+class KeywordAutomaton:
+    def __init__(self, groups: Dict[str, List[str]]):
+        self.group_names = list(groups.keys())
+        self.group_index = {g: i for i, g in enumerate(self.group_names)}
+        self.patterns = list(dict.fromkeys(kw for kws in groups.values() for kw in kws))
+        pattern_index = {p: i for i, p in enumerate(self.patterns)}
+
+        # membership[g, p] = how often pattern p appears in group g's list
+        membership = np.zeros((len(self.group_names), len(self.patterns)), dtype=np.int32)
+        for g, kws in enumerate(groups.values()):
+            for kw in kws:
+                membership[g, pattern_index[kw]] += 1
+        self._membership = membership
+
+        self._automaton = _CAutomaton(self.patterns) if ahocorasick is not None else _PyAutomaton(self.patterns)
+        logger.info(f"Compiled {len(self.patterns)} keywords in {len(self.group_names)} groups into one automaton")
+
+    def scan(self, text: str) -> KeywordHits:
+        """One pass over `text` (expected lowercase) -> per-group hit counts."""
+        matched = self._automaton.matches(text)
+        if matched:
+            counts = self._membership[:, sorted(matched)].sum(axis=1)
+        else:
+            counts = np.zeros(len(self.group_names), dtype=np.int32)
+        return KeywordHits(counts, self.group_index)
@@ -0,0 +1,179 @@
+"""
+keyword_tables.py
+
+Versioned keyword/prototype data file for hot reloads (CLASSIFIER_KEYWORD_TABLES).
+
+The file is JSON: a "version" string plus any of the SOURCE_TABLES below, each
+replacing the built-in table of the same name in classifier.py. Subcategory
+prototypes (social_keywords, prototype_texts, prototype_phrases) are derived from
+financial_keywords, platform_keywords and issue_keywords and are not listed.
+Keyed tables may only use keys the classifier knows (FraudClassifier.table_keys):
+a new subcategory needs code changes (subcategory lists, stages, suggested
+actions), not just keywords.
+
+    python keyword_tables.py export --out tables.json --version 2024-06-01
+    python keyword_tables.py diff tables.json new_tables.json
+
+`export` writes the built-in tables as a starting point. The classifier loads
+the file at startup; POST /admin/tables/reload or the file watcher
+(CLASSIFIER_KEYWORD_TABLES_POLL_SECONDS) swap in an edited version while
+serving (see FraudClassifier.reload_tables).
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# FraudClassifier attributes a table file may set
+SOURCE_TABLES = [
+    "financial_keywords", "platform_keywords", "issue_keywords",
+    "fraud_call_signals", "call_focus_words", "completed_transaction_words", "social_signals",
+    "financial_signals", "strong_signals", "platform_variations", "issue_variations",
+    "issue_inference", "platform_context", "stage_words",
+]
+
+# lists of keywords per key; the remaining source tables are plain keyword lists
+MAPPING_TABLES = {"financial_keywords", "platform_keywords", "issue_keywords", "strong_signals",
+                  "platform_variations", "issue_variations", "issue_inference", "platform_context"}
+
+
+def _check_keywords(name: str, value: Any):
+    if not isinstance(value, list) or not all(isinstance(k, str) and k for k in value):
+        raise ValueError(f"'{name}' must be a list of non-empty strings")
+
+
+def validate(data: Dict[str, Any], known_keys: Optional[Dict[str, List[str]]] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    (version, tables) of a parsed table file; ValueError describes the first problem.
+    known_keys limits the keys of the keyed tables it names.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Keyword table file must hold a JSON object")
+    version = data.get("version")
+    if not isinstance(version, str) or not version:
+        raise ValueError("Keyword table file needs a non-empty string 'version'")
+    unknown = sorted(set(data) - set(SOURCE_TABLES) - {"version"})
+    if unknown:
+        raise ValueError(f"Unknown keyword tables {unknown}; expected some of {SOURCE_TABLES}")
+    tables = {name: data[name] for name in SOURCE_TABLES if name in data}
+    for name, value in tables.items():
+        if name in MAPPING_TABLES:
+            if not isinstance(value, dict) or not value:
+                raise ValueError(f"'{name}' must be a non-empty object of keyword lists")
+            for key, keywords in value.items():
+                _check_keywords(f"{name}.{key}", keywords)
+            unknown = sorted(set(value) - set((known_keys or {}).get(name, value)))
+            if unknown:
+                raise ValueError(f"Unknown keys {unknown} in '{name}'; expected some of {known_keys[name]}")
+        else:
+            _check_keywords(name, value)
+    return version, tables
+
+
+def load(path: str, known_keys: Optional[Dict[str, List[str]]] = None) -> Tuple[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return validate(json.load(f), known_keys)
+
+
+def export(classifier, version: str) -> Dict[str, Any]:
+    """A table file holding the classifier's current tables (copies: editing it leaves them alone)."""
+    return copy.deepcopy({"version": version, **{name: getattr(classifier, name) for name in SOURCE_TABLES}})
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Per table, the keys (or "*" for a plain list) whose keywords differ."""
+    changes = {}
+    for name in SOURCE_TABLES:
+        before, after = old.get(name), new.get(name)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            changes[name] = sorted(k for k in set(before) | set(after) if before.get(k) != after.get(k))
+        else:
+            changes[name] = ["*"]
+    return changes
+
+
+class TableWatcher:
+    """
+    Polls a table file and calls on_change(path) when its modification time or
+    size changes. A failing on_change (bad file, models still loading) is logged
+    and retried at the next poll.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[str], Any], interval: float = 5.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = self._stamp()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stamp(self) -> Optional[Tuple[float, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="table-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self) -> bool:
+        """Reload if the file changed since the last successful reload; True when it did."""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._seen:
+            return False
+        try:
+            self.on_change(self.path)
+        except Exception as e:
+            logger.warning(f"Reloading keyword tables from {self.path} failed: {e}")
+            return False
+        self._seen = stamp
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="write the built-in tables as a table file")
+    p_export.add_argument("--out", required=True)
+    p_export.add_argument("--version", required=True, help="version string recorded in the file")
+    p_diff = sub.add_parser("diff", help="show which tables and keys differ between two table files")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    args = parser.parse_args()
+
+    from classifier import FraudClassifier
+
+    builtin = FraudClassifier(load_model=False, tables_file="")
+    if args.command == "export":
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(export(builtin, args.version), f, ensure_ascii=False, indent=1)
+        print(f"✅ Keyword tables {args.version} written to {args.out}")
+    else:
+        known_keys = builtin.table_keys()
+        (old_version, old_tables), (new_version, new_tables) = load(args.old, known_keys), load(args.new, known_keys)
+        changes = diff(old_tables, new_tables)
+        print(f"{old_version} -> {new_version}: {len(changes)} table(s) changed")
+        for name, keys in changes.items():
+            print(f"  {name}: {', '.join(keys)}")
+        sys.exit(0)
@@ -2,16 +2,67 @@
 main.py
 
 FastAPI app exposing POST /classify. Uses classifier and entity_extractor modules.
+Concurrent /classify calls are coalesced by a MicroBatcher so they share one
+DistilBERT forward pass; GET /batcher/stats reports queue depth and batch sizes.
+POST /classify/batch streams results for bulk jobs as newline-delimited JSON.
+Responses are cached by normalized complaint text (see result_cache.py), so
+resends and client retries skip the model entirely; identical requests that
+arrive while the first one is still running share its computation (single-flight).
+/classify requests and /classify/batch chunks run on a bounded InferenceExecutor
+and their forward passes on the bounded micro-batcher; when either is saturated
+the endpoints shed load with 429/503 and a Retry-After header.
+GET /metrics exposes per-stage decision counts and phase latencies (see metrics.py)
+in the Prometheus text format.
+spaCy, DistilBERT and the prototypes load on a background thread so the server
+accepts connections immediately; until then /classify serves keyword-only results
+marked "degraded". GET /healthz and GET /readyz report loading progress.
+Requests may list `entity_fields` to get only those entities back; unless
+"orgs" or "persons" is listed, spaCy NER is skipped for them.
+Keyword tables can come from a versioned file (CLASSIFIER_KEYWORD_TABLES);
+POST /admin/tables/reload, or the file watcher, swaps an edited file in while
+serving, and GET /admin/tables reports the live version. The /admin routes need
+the CLASSIFIER_ADMIN_TOKEN in an X-Admin-Token header and are off without one.
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import functools
+import hmac
+import time
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from schema import ComplaintRequest, ClassificationResponse, ExtractedEntities, ConfidenceScores
+from schema import ComplaintRequest, ClassificationResponse, BatchClassificationResponse, ExtractedEntities, ConfidenceScores
 from classifier import FraudClassifier
-from entity_extractor import extract_entities
+from entity_extractor import extract_entities, extract_entities_batch, load_nlp, needs_ner, select_fields
+from batcher import MicroBatcher
+from config import Config
+from result_cache import ResultCache, cache_key
+from single_flight import SingleFlight
+from inference_executor import InferenceExecutor, Overloaded
+from model_loader import ModelLoader
+from keyword_tables import TableWatcher
+import artifact_bundle
+import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loader.start()
+    batcher.start()
+    if watcher is not None:
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    executor.shutdown(wait=False)
+    batcher.stop()
 
-app = FastAPI(title="WhatsApp Fraud Classifier (Prototype)")
+
+app = FastAPI(title="WhatsApp Fraud Classifier (Prototype)", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +71,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# initialize heavy components once
-classifier = FraudClassifier()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Guard for the /admin routes: the request must carry Config.ADMIN_TOKEN in
+    X-Admin-Token. The CORS policy allows every origin, so without this any web
+    page could flush the cache or reload tables through a visitor's browser.
+    """
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled; set CLASSIFIER_ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), Config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+
+# keyword tables are built now; the heavy models load in the background (see lifespan).
+# spaCy goes first so that classifier.model_ready implies complete (cacheable) entities.
+classifier = FraudClassifier(load_model=False)
+loader = ModelLoader([
+    ("spacy", lambda: load_nlp(artifact_bundle.spacy_model(Config.BUNDLE_DIR))),
+    ("classifier", classifier.load_model),
+])
+batcher = MicroBatcher(classifier, max_batch_size=Config.BATCH_MAX_SIZE, window_ms=Config.BATCH_WINDOW_MS,
+                       max_queue=Config.BATCH_QUEUE_SIZE)
+result_cache = ResultCache(max_size=Config.RESULT_CACHE_SIZE, ttl_seconds=Config.RESULT_CACHE_TTL_SECONDS)
+inflight = SingleFlight()
+executor = InferenceExecutor(workers=Config.INFERENCE_WORKERS, queue_size=Config.INFERENCE_QUEUE_SIZE,
+                             deadline_ms=Config.INFERENCE_DEADLINE_MS)
+
+
+def reload_tables(path: Optional[str] = None) -> dict:
+    """
+    Swap in the keyword table file and drop cached answers computed with the old
+    tables. Requests still running on the old tables store their answers under
+    the old version, which result_cache.get() no longer matches.
+    """
+    summary = classifier.reload_tables(path)
+    summary["flushed"] = result_cache.clear()
+    return summary
+
+
+watcher = None
+if Config.KEYWORD_TABLES_FILE and Config.KEYWORD_TABLES_POLL_SECONDS > 0:
+    watcher = TableWatcher(Config.KEYWORD_TABLES_FILE, reload_tables, interval=Config.KEYWORD_TABLES_POLL_SECONDS)
 
 
 def suggest_action(primary: str, sub: str, entities: dict, primary_conf: float) -> str:
@@ -221,27 +312,27 @@ def calculate_priority(primary: str, sub: str, entities: dict) -> str:
     return priority
 
 
-@app.post("/classify", response_model=ClassificationResponse)
-def classify_endpoint(req: ComplaintRequest):
-    text = req.complaint_text
-    if not text or not text.strip():
-        raise HTTPException(status_code=400, detail="complaint_text must be a non-empty string")
-
-    primary, sub, primary_conf, sub_conf = classifier.classify(text)
+def build_response(classification, ents: dict, degraded: bool = False,
+                   fields: Optional[List[str]] = None) -> ClassificationResponse:
+    """
+    Turn a classify() tuple plus extracted entities into the API response model.
+    Priority and suggested action use every entity; only `fields` are returned.
+    """
+    primary, sub, primary_conf, sub_conf = classification
 
     # handle low confidence gracefully
     if primary_conf < 0.5:
         primary = "uncertain"
         sub = "uncertain"
 
-    ents = extract_entities(text)
+    shown = select_fields(ents, fields)
     extracted = ExtractedEntities(
-        amount=ents.get("amount"),
-        phone_numbers=ents.get("phone_numbers"),
-        upi_id=ents.get("upi_id"),
-        urls=ents.get("urls"),
-        platform=ents.get("platform"),
-        other={k: v for k, v in ents.items() if k not in ("amount", "phone_numbers", "upi_id", "urls", "platform")},
+        amount=shown.get("amount"),
+        phone_numbers=shown.get("phone_numbers"),
+        upi_id=shown.get("upi_id"),
+        urls=shown.get("urls"),
+        platform=shown.get("platform"),
+        other={k: v for k, v in shown.items() if k not in ("amount", "phone_numbers", "upi_id", "urls", "platform")},
     )
 
     # Calculate priority
@@ -249,17 +340,255 @@ def classify_endpoint(req: ComplaintRequest):
 
     suggested = suggest_action(primary, sub, ents, primary_conf)
 
-    resp = ClassificationResponse(
+    return ClassificationResponse(
         primary_category=primary,
         subcategory=sub,
         extracted_entities=extracted,
         confidence_scores=ConfidenceScores(primary_category=primary_conf, subcategory=sub_conf),
         priority=priority,
         suggested_action=suggested,
+        degraded=degraded,
     )
+
+
+def request_key(req: ComplaintRequest) -> str:
+    """Cache/single-flight key: the normalized text plus the entity field selection."""
+    key = cache_key(req.complaint_text)
+    if req.entity_fields is None:
+        return key
+    return key + ":" + ",".join(sorted(set(req.entity_fields)))
+
+
+def _not_ready() -> HTTPException:
+    return HTTPException(status_code=503, detail="Models are still loading", headers={"Retry-After": "5"})
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    status = 429 if e.reason == "queue_full" else 503
+    return HTTPException(status_code=status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _start_inference(key: str, compute):
+    """
+    Return the single-flight Future for `key`, submitting `compute` to the
+    inference executor if no identical request is already running. The Future
+    resolves to a TimedResult; admission failures raise Overloaded right away.
+    """
+    fut, leader = inflight.begin(key)
+    if not leader:
+        return fut
+    try:
+        job = executor.submit(compute)
+    except Overloaded as e:
+        inflight.finish(key, fut, error=e)
+        raise
+
+    def done(job_fut):
+        error = job_fut.exception()
+        if error is not None:
+            inflight.finish(key, fut, error=error)
+        else:
+            inflight.finish(key, fut, result=job_fut.result())
+
+    job.add_done_callback(done)
+    return fut
+
+
+@app.post("/classify", response_model=ClassificationResponse)
+async def classify_endpoint(req: ComplaintRequest, response: Response):
+    text = req.complaint_text
+    if not text or not text.strip():
+        raise HTTPException(status_code=400, detail="complaint_text must be a non-empty string")
+
+    fields = req.entity_fields
+    key = request_key(req)
+    # read before classifying: a reload mid-request can only make the tag older than the tables used
+    version = classifier.tables_version
+    cached = result_cache.get(key, version)
+    if cached is not None:
+        return cached
+
+    degraded = not classifier.model_ready
+    if degraded and not Config.SERVE_DEGRADED:
+        raise _not_ready()
+
+    # both return (response, seconds waited for the micro-batcher)
+    def compute_degraded():
+        # keyword stages only; not cached so the full answer replaces it once loaded
+        ents = extract_entities(text, ner=needs_ner(fields))
+        return build_response(classifier.classify_keywords(text), ents, degraded=True, fields=fields), 0.0
+
+    def compute():
+        # the batcher runs the model and may itself reject the text (Overloaded)
+        batch = batcher.submit([text]).result()
+        ents = extract_entities(text, ner=needs_ner(fields))
+        resp = build_response(batch.value[0], ents, fields=fields)
+        result_cache.put(key, resp, version)
+        return resp, batch.queue_wait
+
+    # both run on the bounded executor; a retry of a complaint that is still
+    # being classified joins the first call
+    try:
+        future = executor.submit(compute_degraded) if degraded else _start_inference(key, compute)
+        timed = await asyncio.wrap_future(future)
+    except Overloaded as e:
+        raise _overloaded(e)
+
+    resp, batch_wait = timed.value
+    if degraded:
+        response.headers["X-Degraded"] = "1"
+    response.headers["X-Queue-Wait-Ms"] = f"{timed.queue_wait * 1000:.1f}"
+    response.headers["X-Batch-Wait-Ms"] = f"{batch_wait * 1000:.1f}"
+    response.headers["X-Compute-Ms"] = f"{(timed.compute - batch_wait) * 1000:.1f}"
     return resp
 
 
+@app.post("/classify/batch")
+def classify_batch_endpoint(reqs: List[ComplaintRequest]):
+    """
+    Classify many complaints in one call. Texts are sorted by length and run
+    through the model in chunks of Config.BULK_BATCH_SIZE to keep padding low;
+    each result is streamed as one NDJSON line (with its input `index`) as soon
+    as its chunk finishes, so the full result set is never held in memory.
+    Chunks run as jobs on the same inference executor and micro-batcher as
+    /classify: if the first chunk is not admitted the call fails with 429/503
+    and Retry-After, and once streaming has begun later chunks wait for room.
+    """
+    texts = [r.complaint_text for r in reqs]
+    empty = [i for i, t in enumerate(texts) if not t or not t.strip()]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"complaint_text must be a non-empty string (items {empty[:20]})")
+    if not classifier.model_ready:
+        raise _not_ready()
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    chunk_size = max(1, Config.BULK_BATCH_SIZE)
+    chunks = [order[start:start + chunk_size] for start in range(0, len(order), chunk_size)]
+
+    def line(i: int, resp: ClassificationResponse) -> str:
+        return BatchClassificationResponse.model_construct(index=i, **dict(resp)).model_dump_json() + "\n"
+
+    def lookup(indices: List[int]):
+        """(cached (index, response) pairs, indices to classify, tables version) of a chunk."""
+        version = classifier.tables_version
+        cached = [(i, result_cache.get(request_key(reqs[i]), version)) for i in indices]
+        return [(i, resp) for i, resp in cached if resp is not None], [i for i, resp in cached if resp is None], version
+
+    def classify_chunk(misses: List[int], version: str) -> List[ClassificationResponse]:
+        chunk = [texts[i] for i in misses]
+        classifications = batcher.submit(chunk).result().value
+        entities = extract_entities_batch(chunk, ner=[needs_ner(reqs[i].entity_fields) for i in misses])
+        resps = []
+        for i, classification, ents in zip(misses, classifications, entities):
+            resp = build_response(classification, ents, fields=reqs[i].entity_fields)
+            result_cache.put(request_key(reqs[i]), resp, version)
+            resps.append(resp)
+        return resps
+
+    def results(misses: List[int], version: str, job=None) -> List[ClassificationResponse]:
+        # the status line has been sent: wait out overload instead of failing the stream
+        while True:
+            try:
+                if job is None:
+                    job = executor.submit(functools.partial(classify_chunk, misses, version))
+                return job.result().value
+            except Overloaded as e:
+                job = None
+                time.sleep(e.retry_after)
+
+    first = lookup(chunks[0]) if chunks else ([], [], None)
+    try:
+        first_job = executor.submit(functools.partial(classify_chunk, first[1], first[2])) if first[1] else None
+    except Overloaded as e:
+        raise _overloaded(e)
+
+    def stream():
+        for n, indices in enumerate(chunks):
+            hits, misses, version = first if n == 0 else lookup(indices)
+            for i, resp in hits:
+                yield line(i, resp)
+            if misses:
+                for i, resp in zip(misses, results(misses, version, first_job if n == 0 else None)):
+                    yield line(i, resp)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is serving; fails only if model loading failed."""
+    status = loader.status()
+    if status["status"] == "failed":
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once every model has loaded, 503 while loading (degraded mode)."""
+    status = loader.status()
+    if status["status"] != "ready":
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "5"})
+    return status
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus scrape target: stage hit counts, phase latency histograms, embedder calls."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/batcher/stats")
+def batcher_stats():
+    """Queue depth, batch sizes, rejections and wait vs forward latency of the micro-batcher."""
+    return batcher.stats()
+
+
+@app.get("/executor/stats")
+def executor_stats():
+    """Admission/rejection counters and queue-wait vs compute latency of /classify."""
+    return executor.stats()
+
+
+@app.get("/singleflight/stats")
+def singleflight_stats():
+    """How many /classify calls were attached to an identical in-flight request."""
+    return inflight.stats()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Size, hit/miss counters and evictions of the /classify result cache."""
+    return result_cache.stats()
+
+
+@app.post("/admin/cache/flush", dependencies=[Depends(require_admin)])
+def flush_cache():
+    """Drop every cached classification (e.g. after changing keyword tables)."""
+    return {"flushed": result_cache.clear()}
+
+
+@app.get("/admin/tables", dependencies=[Depends(require_admin)])
+def tables_info():
+    """Version and source file of the keyword tables in use."""
+    return {"version": classifier.tables_version, "file": classifier.tables_file}
+
+
+@app.post("/admin/tables/reload", dependencies=[Depends(require_admin)])
+def tables_reload():
+    """
+    Re-read the keyword table file and swap it in: only changed prototypes are
+    re-embedded, requests in flight finish on the old tables, and the result
+    cache is flushed.
+    """
+    try:
+        return reload_tables()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,223 @@
+"""
+metrics.py
+
+In-process Prometheus metrics for the classifier service.
+
+A deliberately small implementation of the Prometheus text exposition format
+(counters and histograms with labels) so instrumentation needs no extra
+dependency. Recording is a lock plus a few additions; rendering happens only
+when /metrics is scraped.
+
+Recorded:
+- classifier_stage_decisions_total{stage}     which classify() stage returned
+- classifier_phase_seconds{phase}             tokenize / forward / scoring /
+                                              extract_entities / spacy latency
+- classifier_embedder_calls_per_request       embedder forward passes per text
+- classifier_embedded_texts_total             texts sent through the embedder
+- classifier_degraded_classifications_total   keyword-only answers while loading
+- classifier_tokens_total{kind}               real vs padding tokens fed to the model
+- classifier_forward_seq_length               padded sequence length per forward pass
+- classifier_truncated_texts_total            texts cut at the max_length token cap
+- classifier_windows_per_text                 long-document windows per complaint
+- classifier_window_budget_exhausted_total    complaints with more windows than allowed
+- classifier_exit_layer                       encoder layer each complaint left at (early exit)
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+import math
+import threading
+import time
+
+# latency buckets in seconds, from sub-millisecond keyword work to slow forward passes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            labels = _format_labels(list(zip(self.labelnames, labelvalues)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._captures: List[Dict[Tuple[str, ...], List[float]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            for samples in self._captures:
+                samples.setdefault(labelvalues, []).append(value)
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[labelvalues] = series
+            series[0][i] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    @contextmanager
+    def capture(self):
+        """
+        Also keep every raw observation made inside the block, as
+        {label values: [values]}, for exact percentiles (benchmark.py).
+        """
+        samples: Dict[Tuple[str, ...], List[float]] = {}
+        with self._lock:
+            self._captures.append(samples)
+        try:
+            yield samples
+        finally:
+            with self._lock:
+                self._captures.remove(samples)
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        for labelvalues, (counts, total) in items:
+            pairs = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(pairs)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_NAMES = [
+    "0_strong_financial",
+    "1_fraud_call",
+    "2_keyword_match",
+    "3_social",
+    "4_monetary_fallback",
+    "5_embedding_fallback",
+]
+
+STAGE_DECISIONS = Counter(
+    "classifier_stage_decisions_total",
+    "Classifications decided by each stage of FraudClassifier.classify",
+    ["stage"],
+)
+PHASE_SECONDS = Histogram(
+    "classifier_phase_seconds",
+    "Latency of classification phases (tokenize, forward, scoring, extract_entities, spacy)",
+    ["phase"],
+)
+EMBEDDER_CALLS_PER_REQUEST = Histogram(
+    "classifier_embedder_calls_per_request",
+    "Embedder forward passes made to classify one text",
+    buckets=(0, 1, 2, 3, 5),
+)
+EMBEDDED_TEXTS = Counter(
+    "classifier_embedded_texts_total",
+    "Texts sent through the embedding model",
+)
+DEGRADED_CLASSIFICATIONS = Counter(
+    "classifier_degraded_classifications_total",
+    "Keyword-only classifications served while the embedding model was loading",
+)
+TOKENS = Counter(
+    "classifier_tokens_total",
+    "Tokens fed to the embedding model; padding/(real+padding) is the padding waste",
+    ["kind"],
+)
+FORWARD_SEQ_LENGTH = Histogram(
+    "classifier_forward_seq_length",
+    "Padded sequence length of each embedding forward pass",
+    buckets=(16, 32, 64, 128, 256, 512),
+)
+TRUNCATED_TEXTS = Counter(
+    "classifier_truncated_texts_total",
+    "Texts truncated at the configured max_length token cap",
+)
+WINDOWS_PER_TEXT = Histogram(
+    "classifier_windows_per_text",
+    "Token windows embedded per complaint in long-document mode",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+WINDOW_BUDGET_EXHAUSTED = Counter(
+    "classifier_window_budget_exhausted_total",
+    "Complaints that needed more windows than the per-request window budget",
+)
+EXIT_LAYER = Histogram(
+    "classifier_exit_layer",
+    "Encoder layer after which each complaint was scored (early exit; the last layer if none)",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 12),
+)
+TABLE_RELOADS = Counter(
+    "classifier_keyword_table_reloads_total",
+    "Keyword table files swapped in while serving",
+)
+
+REGISTRY = [STAGE_DECISIONS, PHASE_SECONDS, EMBEDDER_CALLS_PER_REQUEST, EMBEDDED_TEXTS, DEGRADED_CLASSIFICATIONS,
+            TOKENS, FORWARD_SEQ_LENGTH, TRUNCATED_TEXTS, WINDOWS_PER_TEXT, WINDOW_BUDGET_EXHAUSTED, EXIT_LAYER,
+            TABLE_RELOADS]
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,97 @@
+"""
+model_loader.py
+
+Background loading of the heavy models so the API can accept connections
+immediately after startup.
+
+A ModelLoader runs a list of named load steps (e.g. DistilBERT + prototypes,
+then spaCy) one after another on a daemon thread and records the state and
+duration of each. main.py serves keyword-only (degraded) classifications until
+the loader reports ready, and /healthz and /readyz expose its status.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLoader:
+    def __init__(self, steps: Sequence[Tuple[str, Callable[[], Any]]]):
+        self._steps = list(steps)
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {
+            name: {"state": PENDING, "seconds": None, "error": None} for name, _ in self._steps
+        }
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._started_at: Optional[float] = None
+
+    def start(self):
+        """Begin loading on a daemon thread; returns immediately. Idempotent."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for name, load in self._steps:
+            self._set(name, state=LOADING)
+            start = time.monotonic()
+            try:
+                load()
+            except Exception as e:
+                logger.exception(f"Loading {name} failed")
+                self._set(name, state=FAILED, seconds=time.monotonic() - start, error=str(e))
+                return
+            elapsed = time.monotonic() - start
+            logger.info(f"Loaded {name} in {elapsed:.1f}s")
+            self._set(name, state=READY, seconds=elapsed)
+        self._ready.set()
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._state[name].update(fields)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def failed(self) -> bool:
+        with self._lock:
+            return any(step["state"] == FAILED for step in self._state.values())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every step has loaded (False on timeout or failure)."""
+        return self._ready.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            steps: List[Dict[str, Any]] = [{"name": name, **self._state[name]} for name, _ in self._steps]
+            started_at = self._started_at
+        done = sum(1 for step in steps if step["state"] == READY)
+        if self.ready:
+            overall = READY
+        elif any(step["state"] == FAILED for step in steps):
+            overall = FAILED
+        elif started_at is None:
+            overall = PENDING
+        else:
+            overall = LOADING
+        return {
+            "status": overall,
+            "progress": f"{done}/{len(steps)}",
+            "elapsed_seconds": (time.monotonic() - started_at) if started_at is not None else 0.0,
+            "steps": steps,
+        }
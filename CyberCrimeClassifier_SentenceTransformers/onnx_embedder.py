@@ -0,0 +1,278 @@
+"""
+onnx_embedder.py
+
+ONNX Runtime backend for the classifier's sentence embeddings.
+
+The DistilBERT encoder plus the same masked mean pooling used by
+SimpleDistilEmbedder is exported as a single ONNX graph, optionally
+dynamically quantized to int8 weights, and served through ONNX Runtime on CPU.
+OnnxDistilEmbedder exposes the same `embed(texts) -> (n, dim)` interface, so
+FraudClassifier can select it with CLASSIFIER_EMBEDDING_BACKEND=onnx|onnx-int8.
+
+Usage:
+    python onnx_embedder.py export [--int8]
+    python onnx_embedder.py check [--int8] [--min-cosine 0.99]
+
+`check` embeds every example text from the repo's test scripts with both the
+torch and the ONNX backend, reports the cosine drift between them, and compares
+the final classifications.
+
+`manifest.json` next to the graphs records the model and the torch/transformers
+versions the fp32 graph was exported with and its sha256, and the fp32 sha256
+and onnxruntime version each int8 graph was quantized from. A graph whose
+manifest entry does not match is exported or quantized again.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+import torch
+import transformers
+from transformers import AutoModel, AutoTokenizer, PreTrainedModel
+
+import metrics
+from config import Config
+from tokenization import effective_max_length, pad_bucketed, parse_buckets, tokenize
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# onnxruntime is optional - only needed when the ONNX backend is selected
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+FP32_FILE = "encoder.onnx"
+INT8_FILE = "encoder.int8.onnx"
+MANIFEST_FILE = "manifest.json"
+OPSET_VERSION = 14
+
+
+class MeanPooledEncoder(torch.nn.Module):
+    """Encoder followed by attention-masked mean pooling, as one exportable module."""
+
+    def __init__(self, model: PreTrainedModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        last_hidden = self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        mask = attention_mask.unsqueeze(-1).to(last_hidden.dtype)
+        return (last_hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+
+
+def onnx_path(onnx_dir: str, int8: bool) -> str:
+    return os.path.join(onnx_dir, INT8_FILE if int8 else FP32_FILE)
+
+
+def _sha256(path: str) -> str | None:
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(onnx_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(onnx_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(onnx_dir: str, manifest: Dict[str, Any]):
+    fd, tmp = tempfile.mkstemp(dir=onnx_dir, suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(onnx_dir, MANIFEST_FILE))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _stale(entry: Dict[str, Any] | None, expected: Dict[str, Any]) -> List[str]:
+    """Fields of a manifest entry that differ from the expected ones."""
+    entry = entry or {}
+    return [name for name, value in expected.items() if entry.get(name) != value]
+
+
+def export_onnx(model_name: str, onnx_dir: str, int8: bool = False) -> str:
+    """
+    Export (and optionally quantize) the mean-pooled encoder unless the manifest
+    shows the existing graph was built from this model and these library versions;
+    returns the model path.
+    """
+    os.makedirs(onnx_dir, exist_ok=True)
+    fp32_path = onnx_path(onnx_dir, int8=False)
+    manifest = read_manifest(onnx_dir)
+    fp32_sha = _sha256(fp32_path)
+    expected = {"model_name": model_name, "torch": torch.__version__, "transformers": transformers.__version__,
+                "opset": OPSET_VERSION, "sha256": fp32_sha}
+    stale = ["file"] if fp32_sha is None else _stale(manifest.get("fp32"), expected)
+
+    if stale:
+        logger.info(f"Exporting {model_name} to ONNX at {fp32_path} (stale: {', '.join(stale)})")
+        tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample text", "a second, slightly longer export sample"],
+                           padding=True, return_tensors="pt")
+        kwargs = {}
+        # newer torch releases default to the dynamo exporter; the TorchScript one
+        # handles the dynamic batch/sequence axes of this graph reliably
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            kwargs["dynamo"] = False
+        with torch.no_grad():
+            torch.onnx.export(
+                MeanPooledEncoder(model),
+                (sample["input_ids"], sample["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["embedding"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "embedding": {0: "batch"},
+                },
+                opset_version=OPSET_VERSION,
+                **kwargs,
+            )
+        # keep the tokenizer next to the graph so serving needs no HF download
+        tokenizer.save_pretrained(onnx_dir)
+        # the int8 entry names the graph it was quantized from, so it goes stale with it
+        manifest = {"fp32": dict(expected, sha256=_sha256(fp32_path)), "int8": manifest.get("int8")}
+        _write_manifest(onnx_dir, manifest)
+
+    if not int8:
+        return fp32_path
+
+    int8_path = onnx_path(onnx_dir, int8=True)
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    expected = {"source_sha256": manifest["fp32"]["sha256"], "onnxruntime": ort.__version__,
+                "sha256": _sha256(int8_path)}
+    stale = ["file"] if expected["sha256"] is None else _stale(manifest.get("int8"), expected)
+    if stale:
+        logger.info(f"Quantizing {fp32_path} to int8 at {int8_path} (stale: {', '.join(stale)})")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        manifest["int8"] = dict(expected, sha256=_sha256(int8_path))
+        _write_manifest(onnx_dir, manifest)
+    return int8_path
+
+
+class OnnxDistilEmbedder:
+    def __init__(self, model_name: str, onnx_dir: str, int8: bool = False, intra_op_threads: int = 0,
+                 max_length: int = Config.MAX_SEQ_LENGTH, length_buckets: str = Config.LENGTH_BUCKETS):
+        if ort is None:
+            raise ImportError("onnxruntime is not installed")
+        self.model_name = model_name
+        self.engine = "onnx-int8" if int8 else "onnx"
+        path = export_onnx(model_name, onnx_dir, int8=int8)  # no-op unless missing or stale
+        tokenizer_source = onnx_dir if os.path.exists(os.path.join(onnx_dir, "tokenizer.json")) else model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_source, use_fast=True)
+        self.max_length = effective_max_length(self.tokenizer, max_length)
+        self.length_buckets = parse_buckets(length_buckets)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        logger.info(f"Loading ONNX encoder {path}")
+        self._path, self._options = path, options
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def after_fork(self):
+        # ONNX Runtime thread pools do not survive fork(); serve.py calls this in each worker
+        self.session = ort.InferenceSession(self._path, self._options, providers=["CPUExecutionProvider"])
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        # returns (n, dim) numpy array
+        return self.embed_ids(tokenize(self.tokenizer, texts, self.max_length))
+
+    def embed_ids(self, ids: List[List[int]]) -> np.ndarray:
+        # embeds pre-tokenized sequences, one session run per length tier
+        out = None
+        for indices, input_ids, attention_mask in pad_bucketed(ids, self.length_buckets,
+                                                               self.tokenizer.pad_token_id or 0):
+            with metrics.PHASE_SECONDS.time("forward"):
+                arr = self.session.run(["embedding"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+            if out is None:
+                out = np.zeros((len(ids), arr.shape[1]), dtype=np.float32)
+            out[indices] = arr
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+def _row_cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    denom = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    denom[denom == 0] = 1.0
+    return (a * b).sum(1) / denom
+
+
+def check_equivalence(backend: str, min_cosine: float) -> bool:
+    """Compare torch vs ONNX embeddings and classifications on the example corpus."""
+    from classifier import FraudClassifier
+    from corpus import load_texts
+
+    texts = load_texts()
+    reference = FraudClassifier(backend="torch")
+    candidate = FraudClassifier(backend=backend)
+    if candidate.embedder.engine != backend:
+        print(f"❌ Backend '{backend}' could not be loaded")
+        return False
+
+    ref_embs = reference.embedder.embed(texts)
+    cand_embs = candidate.embedder.embed(texts)
+    cosines = _row_cosines(ref_embs, cand_embs)
+
+    mismatches = []
+    for text, ref_emb, cand_emb in zip(texts, ref_embs, cand_embs):
+        ref = reference.classify(text, scores=reference.score_embedding(ref_emb))
+        cand = candidate.classify(text, scores=candidate.score_embedding(cand_emb))
+        if ref[:2] != cand[:2]:
+            mismatches.append((text, ref[:2], cand[:2]))
+
+    print("=" * 80)
+    print(f"EMBEDDING EQUIVALENCE: torch vs {backend} ({len(texts)} texts)")
+    print("=" * 80)
+    print(f"Cosine similarity  min={cosines.min():.5f}  mean={cosines.mean():.5f}  max={cosines.max():.5f}")
+    print(f"Cosine drift (1-cos) max={1 - cosines.min():.5f}  mean={1 - cosines.mean():.5f}")
+    print(f"Classification agreement: {len(texts) - len(mismatches)}/{len(texts)}")
+    for text, ref, cand in mismatches:
+        print(f"  ✗ {text[:70]}...")
+        print(f"      torch: {ref}  {backend}: {cand}")
+
+    ok = cosines.min() >= min_cosine and not mismatches
+    print(f"\n{'✅ PASS' if ok else '❌ FAIL'} (min cosine threshold {min_cosine})")
+    return ok
+
+
+if __name__ == "__main__":
+    from classifier import MODEL_NAME, model_cache_dir
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Export and verify the ONNX embedding backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="export the encoder to ONNX")
+    p_export.add_argument("--int8", action="store_true", help="also write a dynamically quantized int8 model")
+    p_check = sub.add_parser("check", help="report cosine drift and classification agreement vs torch")
+    p_check.add_argument("--int8", action="store_true", help="check the int8 model instead of fp32")
+    p_check.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(export_onnx(MODEL_NAME, model_cache_dir(Config.ONNX_DIR, MODEL_NAME), int8=args.int8))
+    else:
+        sys.exit(0 if check_equivalence("onnx-int8" if args.int8 else "onnx", args.min_cosine) else 1)
@@ -0,0 +1,97 @@
+"""
+prototype_bank.py
+
+Multi-centroid prototype bank (CLASSIFIER_PROTOTYPE_CENTROIDS=k).
+
+Instead of one prototype per subcategory embedded from its first three keywords
+joined with " . ", every keyword phrase of every subcategory is embedded once
+(phrases shared between subcategories only once) and each subcategory's phrase
+vectors are clustered into at most k centroids with spherical k-means.
+
+The centroids of all subcategories are stacked into one contiguous,
+row-normalized matrix whose rows are grouped by subcategory; `row_keys` names
+the subcategory of every row. Scoring stays a single matrix-vector product over
+that matrix, followed by `max_pool`: one np.maximum.reduceat over the groups
+gives each subcategory the similarity of its closest centroid.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 25) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster rows by cosine similarity; returns (row-normalized centroids, labels).
+    Deterministic: centroids start from the first row and then the row farthest
+    from every centroid chosen so far.
+    """
+    points = normalize_rows(np.asarray(vectors, dtype=np.float64))
+    k = max(1, min(k, len(points)))
+    chosen = [0]
+    closest = points @ points[0]
+    for _ in range(1, k):
+        chosen.append(int(np.argmin(closest)))
+        closest = np.maximum(closest, points @ points[chosen[-1]])
+    centroids = points[chosen]
+    labels = np.zeros(len(points), dtype=np.int64)
+    for iteration in range(iterations):
+        new_labels = (points @ centroids.T).argmax(1)
+        if iteration and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = points[labels == c]
+            if len(members):  # an emptied cluster keeps its previous centroid
+                centroids[c] = members.sum(0)
+        centroids = normalize_rows(centroids)
+    return centroids.astype(np.float32), labels
+
+
+def build(phrases: Dict[str, List[str]], embed: Callable[[List[str]], np.ndarray],
+          k: int) -> Tuple[np.ndarray, List[str]]:
+    """
+    Embed every distinct phrase once and cluster each key's phrases into at most
+    k centroids; returns (centroid matrix grouped by key, row keys).
+    """
+    unique = list(dict.fromkeys(p for key_phrases in phrases.values() for p in key_phrases))
+    embs = embed(unique)
+    row_of = {p: i for i, p in enumerate(unique)}
+    rows, row_keys = [], []
+    for key, key_phrases in phrases.items():
+        centroids, _ = spherical_kmeans(embs[[row_of[p] for p in key_phrases]], k)
+        rows.append(centroids)
+        row_keys += [key] * len(centroids)
+    return np.concatenate(rows), row_keys
+
+
+def group_offsets(row_keys: List[str]) -> Optional[np.ndarray]:
+    """Start row of each key's group; None when every key has exactly one row."""
+    starts = [i for i, key in enumerate(row_keys) if i == 0 or key != row_keys[i - 1]]
+    if len(starts) != len(set(row_keys)):
+        raise ValueError("Prototype rows of a key must be contiguous")
+    if len(starts) == len(row_keys):
+        return None
+    return np.array(starts, dtype=np.int64)
+
+
+def max_pool(sims: np.ndarray, offsets: Optional[np.ndarray]) -> np.ndarray:
+    """Per-key maximum over each group of rows along the last axis (no-op without groups)."""
+    if offsets is None:
+        return sims
+    return np.maximum.reduceat(sims, offsets, axis=-1)
+
+
+def key_means(matrix: np.ndarray, row_keys: List[str], keys: List[str]) -> np.ndarray:
+    """Mean over `keys` of each key's mean row (each key weighs the same whatever its row count)."""
+    per_key = [matrix[[i for i, rk in enumerate(row_keys) if rk == key]].mean(0) for key in keys]
+    if not per_key:
+        return np.zeros(matrix.shape[1], dtype=matrix.dtype)
+    return np.mean(per_key, axis=0)
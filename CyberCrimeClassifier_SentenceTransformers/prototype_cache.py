@@ -0,0 +1,119 @@
+"""
+prototype_cache.py
+
+On-disk cache for the classifier's prototype matrix.
+
+The row-normalized float32 prototype matrix is written as `prototypes_<key>.npy`
+next to a `prototypes_<key>.json` manifest, which also records every row's norm
+before normalization (keyword table reloads rebuild the primary prototypes from
+the unnormalized rows). The key is a SHA-256 over everything
+that determines the matrix: embedding model name, tokenizer/transformers version,
+the keyword tables and the prototype phrases themselves. When the key matches, the
+matrix is loaded memory-mapped (no DistilBERT forward pass); when anything
+changes the key changes and the classifier rebuilds and rewrites the cache.
+
+Several processes may share one cache directory with different backbones,
+engines, centroid counts or keyword tables, so saving an entry only evicts
+beyond the `keep` most recently used ones (a cache hit touches its manifest).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 2  # 2: manifest records row norms
+
+
+def compute_key(identity: Dict[str, Any]) -> str:
+    """Stable hash of a JSON-serialisable identity dict."""
+    payload = json.dumps(identity, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _paths(cache_dir: str, key: str) -> Tuple[str, str]:
+    stem = os.path.join(cache_dir, f"prototypes_{key[:16]}")
+    return stem + ".npy", stem + ".json"
+
+
+def load(cache_dir: str, key: str) -> Optional[Tuple[np.ndarray, List[str], Optional[np.ndarray]]]:
+    """Return (memory-mapped matrix, row keys, row norms) if a valid cache entry exists."""
+    npy_path, manifest_path = _paths(cache_dir, key)
+    if not (os.path.exists(npy_path) and os.path.exists(manifest_path)):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION or manifest.get("key") != key:
+            return None
+        matrix = np.load(npy_path, mmap_mode="r")
+        if list(matrix.shape) != manifest.get("shape") or str(matrix.dtype) != manifest.get("dtype"):
+            logger.warning(f"Prototype cache {npy_path} does not match its manifest; rebuilding")
+            return None
+        norms = manifest.get("row_norms")
+        try:
+            os.utime(manifest_path)  # most recently used; see _evict
+        except OSError:
+            pass
+        return matrix, list(manifest["keys"]), None if norms is None else np.asarray(norms, dtype=np.float32)
+    except Exception as e:
+        logger.warning(f"Could not read prototype cache {npy_path}: {e}")
+        return None
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _evict(cache_dir: str, keep: int):
+    """Remove all but the `keep` most recently used entries."""
+    manifests = sorted(glob.glob(os.path.join(cache_dir, "prototypes_*.json")), key=_mtime, reverse=True)
+    for manifest_path in manifests[max(1, keep):]:
+        for path in (manifest_path[:-len(".json")] + ".npy", manifest_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def save(cache_dir: str, key: str, matrix: np.ndarray, keys: List[str], identity: Dict[str, Any],
+         row_norms: Optional[np.ndarray] = None, keep: int = 8):
+    """Atomically write matrix + manifest and evict all but the `keep` most recently used entries."""
+    npy_path, manifest_path = _paths(cache_dir, key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "key": key,
+            "keys": list(keys),
+            "shape": list(matrix.shape),
+            "dtype": str(matrix.dtype),
+            "row_norms": None if row_norms is None else [float(n) for n in row_norms],
+            "model_name": identity.get("model_name"),
+            "tokenizer_version": identity.get("tokenizer_version"),
+        }
+        fd, tmp_npy = tempfile.mkstemp(dir=cache_dir, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix))
+        fd, tmp_manifest = tempfile.mkstemp(dir=cache_dir, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_npy, npy_path)
+        os.replace(tmp_manifest, manifest_path)
+    except Exception as e:
+        logger.warning(f"Could not write prototype cache to {cache_dir}: {e}")
+        return
+
+    _evict(cache_dir, keep)
+    logger.info(f"Saved prototype cache {npy_path}")
@@ -0,0 +1,262 @@
+"""
+regression.py
+
+In-process accuracy + latency regression harness over the labelled examples of
+the test scripts (see corpus.py).
+
+    python regression.py --engines torch,keyword-only --out report.json
+    python regression.py --engines torch,onnx-int8 --baseline report.json
+
+Every engine configuration is loaded once and classifies every example one at
+a time. Engines:
+
+    torch          the CLASSIFIER_MODEL_NAME encoder on PyTorch (ignores CLASSIFIER_BUNDLE_DIR)
+    bundle         the frozen bundle in CLASSIFIER_BUNDLE_DIR
+    onnx           ONNX Runtime fp32
+    onnx-int8      ONNX Runtime with int8 weights
+    static         per-token table distilled from DistilBERT (static_embedder.py)
+    prototype-bank torch with 4 keyword-phrase centroids per subcategory (prototype_bank.py)
+    keyword-only   classify_keywords(), the degraded mode served while loading
+
+For each engine the report holds primary / subcategory / priority accuracy,
+accuracy per expected subcategory and per expected priority, and the classify()
+latency of every example (median of --repeat runs) with p50/p95/p99.
+
+With --baseline (a report written earlier with --out), the run fails (exit 1)
+when an engine's accuracy drops by more than --max-accuracy-drop or its p95
+latency grows by more than --max-p95-increase (and by more than
+--p95-slack-ms); --min-accuracy and --max-p95-ms are absolute limits that
+apply with or without a baseline.
+"""
+from __future__ import annotations
+
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import sys
+import time
+
+from benchmark import environment, summarize
+from config import Config
+
+logger = logging.getLogger("regression")
+
+REPORT_VERSION = 1
+
+# engine name -> FraudClassifier keyword arguments; None = keyword-only mode
+ENGINES: Dict[str, Optional[Dict[str, Any]]] = {
+    "torch": {"backend": "torch", "bundle_dir": None},
+    "bundle": {"backend": "torch"},
+    "onnx": {"backend": "onnx", "bundle_dir": None},
+    "onnx-int8": {"backend": "onnx-int8", "bundle_dir": None},
+    "static": {"backend": "static", "bundle_dir": None},
+    "prototype-bank": {"backend": "torch", "bundle_dir": None, "prototype_centroids": 4},
+    "keyword-only": None,
+}
+
+ACCURACY_KEYS = ("primary", "subcategory", "priority")
+
+Classify = Callable[[str], Tuple[str, str, float, float]]
+
+
+def load_engine(name: str) -> Tuple[Classify, Dict[str, Any]]:
+    """classify function and environment of one engine configuration."""
+    from classifier import FraudClassifier
+
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', expected one of {list(ENGINES)}")
+    kwargs = ENGINES[name]
+    if kwargs is None:
+        return FraudClassifier(load_model=False).classify_keywords, {"backend": "keyword-only"}
+    if name == "bundle" and not Config.BUNDLE_DIR:
+        raise ValueError("engine 'bundle' needs CLASSIFIER_BUNDLE_DIR")
+    classifier = FraudClassifier(**kwargs)
+    if classifier.embedder.engine != kwargs["backend"]:
+        raise ValueError(f"backend '{kwargs['backend']}' could not be loaded")
+    return classifier.classify, environment(classifier)
+
+
+def expected_sub(example: Dict[str, Any]) -> Optional[str]:
+    return example.get("expected_sub") or example.get("expected_sub_contains")
+
+
+def check(example: Dict[str, Any], primary: str, sub: str, priority: str) -> Dict[str, bool]:
+    """Which of the example's labels the prediction gets right (only labels it has)."""
+    correct = {}
+    if "expected_primary" in example:
+        correct["primary"] = primary == example["expected_primary"]
+    if "expected_sub" in example:
+        correct["subcategory"] = sub == example["expected_sub"]
+    elif "expected_sub_contains" in example:
+        correct["subcategory"] = example["expected_sub_contains"].lower() in sub.lower()
+    if "expected_priority" in example:
+        correct["priority"] = priority == example["expected_priority"]
+    return correct
+
+
+def _accuracy(flags: List[bool]) -> Dict[str, Any]:
+    return {"correct": sum(flags), "total": len(flags), "accuracy": sum(flags) / len(flags) if flags else None}
+
+
+def evaluate(classify: Classify, examples: List[Dict[str, Any]], repeat: int = 3) -> Dict[str, Any]:
+    """Classify every example and score it against its labels."""
+    from entity_extractor import extract_entities
+    from main import calculate_priority
+
+    for example in examples[:5]:  # warm-up
+        classify(example["text"])
+    rows = []
+    for example in examples:
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            primary, sub, _, _ = classify(example["text"])
+            timings.append(time.perf_counter() - start)
+        priority = calculate_priority(primary, sub, extract_entities(example["text"], ner=False))
+        rows.append({
+            "text": example["text"], "source": example["source"],
+            "expected": {k: v for k, v in example.items() if k.startswith("expected_")},
+            "primary": primary, "subcategory": sub, "priority": priority,
+            "correct": check(example, primary, sub, priority),
+            "latency_ms": median(timings) * 1000,
+        })
+
+    def grouped(label: str, key: str) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, List[bool]] = {}
+        for row, example in zip(rows, examples):
+            value = expected_sub(example) if label == "subcategory" else example.get(key)
+            if value is not None and label in row["correct"]:
+                groups.setdefault(value, []).append(row["correct"][label])
+        return {value: _accuracy(flags) for value, flags in sorted(groups.items())}
+
+    return {
+        "accuracy": {key: _accuracy([r["correct"][key] for r in rows if key in r["correct"]])
+                     for key in ACCURACY_KEYS},
+        "per_subcategory": grouped("subcategory", "expected_sub"),
+        "per_priority": grouped("priority", "expected_priority"),
+        "latency": summarize([r["latency_ms"] / 1000 for r in rows]),
+        "examples": rows,
+    }
+
+
+def regressions(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, max_accuracy_drop: float = 0.0,
+                max_p95_increase: float = 0.25, min_accuracy: float = 0.0, max_p95_ms: float = 0.0,
+                p95_slack_ms: float = 0.5) -> List[str]:
+    """
+    Threshold violations of a report, optionally relative to a baseline report.
+    p95 growth below p95_slack_ms is ignored: sub-millisecond engines
+    (keyword-only) would otherwise fail on timer noise.
+    """
+    problems = []
+    base_engines = (baseline or {}).get("engines", {})
+    for name, result in report["engines"].items():
+        if "error" in result:
+            problems.append(f"{name}: {result['error']}")
+            continue
+        base = base_engines.get(name)
+        for key in ACCURACY_KEYS:
+            acc = result["accuracy"][key]["accuracy"]
+            if acc is None:
+                continue
+            if acc < min_accuracy:
+                problems.append(f"{name}: {key} accuracy {acc:.3f} is below {min_accuracy:.3f}")
+            base_acc = base["accuracy"][key]["accuracy"] if base and "accuracy" in base else None
+            if base_acc is not None and acc < base_acc - max_accuracy_drop:
+                problems.append(f"{name}: {key} accuracy fell from {base_acc:.3f} to {acc:.3f}")
+        p95 = result["latency"].get("p95_ms")
+        if p95 is None:
+            continue
+        if max_p95_ms and p95 > max_p95_ms:
+            problems.append(f"{name}: p95 latency {p95:.2f} ms is above {max_p95_ms:.2f} ms")
+        base_p95 = base["latency"].get("p95_ms") if base and "latency" in base else None
+        if base_p95 and p95 > base_p95 * (1 + max_p95_increase) and p95 - base_p95 > p95_slack_ms:
+            problems.append(f"{name}: p95 latency grew from {base_p95:.2f} ms to {p95:.2f} ms "
+                            f"(+{(p95 / base_p95 - 1) * 100:.0f}%, allowed +{max_p95_increase * 100:.0f}%)")
+    return problems
+
+
+def newly_failing(result: Dict[str, Any], base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Examples the baseline got right that this result gets wrong."""
+    before = {(r["source"], r["text"]): r["correct"] for r in base.get("examples", [])}
+    return [r for r in result.get("examples", [])
+            if any(ok and not r["correct"].get(k, True) for k, ok in before.get((r["source"], r["text"]), {}).items())]
+
+
+def run(engines: List[str], repeat: int = 3) -> Dict[str, Any]:
+    from corpus import load_examples
+
+    examples = load_examples()
+    report: Dict[str, Any] = {
+        "version": REPORT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "examples": len(examples),
+        "engines": {},
+    }
+    for name in engines:
+        logger.info(f"Evaluating engine '{name}' on {len(examples)} examples")
+        try:
+            classify, env = load_engine(name)
+        except Exception as e:
+            logger.error(f"Engine '{name}' unavailable: {e}")
+            report["engines"][name] = {"error": f"engine unavailable: {e}"}
+            continue
+        report["engines"][name] = {"environment": env, **evaluate(classify, examples, repeat)}
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    lines = [f"{'engine':14s} {'primary':>9s} {'sub':>9s} {'priority':>9s} {'p50 ms':>8s} {'p95 ms':>8s} "
+             f"{'p99 ms':>8s}"]
+    for name, result in report["engines"].items():
+        if "error" in result:
+            lines.append(f"{name:14s} {result['error']}")
+            continue
+        acc = [result["accuracy"][k] for k in ACCURACY_KEYS]
+        cells = " ".join(f"{a['correct']:>4d}/{a['total']:<4d}" for a in acc)
+        lat = result["latency"]
+        lines.append(f"{name:14s} {cells} {lat['p50_ms']:8.2f} {lat['p95_ms']:8.2f} {lat['p99_ms']:8.2f}")
+    return lines
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="torch,keyword-only", help=f"comma-separated, from {list(ENGINES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="classify() runs per example for its latency")
+    parser.add_argument("--out", help="write the JSON report here (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0, help="allowed accuracy drop vs baseline")
+    parser.add_argument("--max-p95-increase", type=float, default=0.25,
+                        help="allowed relative p95 latency growth vs baseline (0.25 = +25%%)")
+    parser.add_argument("--p95-slack-ms", type=float, default=0.5,
+                        help="p95 growth always tolerated, whatever the relative increase")
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="absolute accuracy floor (0 = off)")
+    parser.add_argument("--max-p95-ms", type=float, default=0.0, help="absolute p95 latency ceiling (0 = off)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.engines.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines {unknown}; choose from {list(ENGINES)}")
+    baseline_report = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_report = json.load(f)
+    final = run(names, repeat=args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(final, f, indent=2, ensure_ascii=False)
+    print("\n".join(format_report(final)))
+    for engine, engine_result in final["engines"].items():
+        base_result = (baseline_report or {}).get("engines", {}).get(engine)
+        for row in newly_failing(engine_result, base_result or {}):
+            print(f"  ✗ {engine}: {row['text'][:70]}... -> {row['primary']} / {row['subcategory']} / {row['priority']}")
+    failures = regressions(final, baseline_report, args.max_accuracy_drop, args.max_p95_increase,
+                           args.min_accuracy, args.max_p95_ms, args.p95_slack_ms)
+    for problem in failures:
+        print(f"❌ {problem}")
+    if failures:
+        sys.exit(1)
+    print("✅ No accuracy or latency regressions")
@@ -1,9 +1,21 @@
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from entity_extractor import ENTITY_FIELDS
 
 
 class ComplaintRequest(BaseModel):
     complaint_text: str
+    # entity fields to return (default: all); spaCy NER is skipped unless "orgs" or "persons" is listed
+    entity_fields: Optional[list[str]] = None
+
+    @field_validator("entity_fields")
+    @classmethod
+    def _known_fields(cls, fields):
+        unknown = sorted(set(fields or []) - set(ENTITY_FIELDS))
+        if unknown:
+            raise ValueError(f"unknown entity fields {unknown}; choose from {list(ENTITY_FIELDS)}")
+        return fields
 
 
 class ExtractedEntities(BaseModel):
@@ -27,3 +39,8 @@ class ClassificationResponse(BaseModel):
     confidence_scores: ConfidenceScores
     priority: str  # "HIGH", "MEDIUM", or "LOW"
     suggested_action: str
+    degraded: bool = False  # keyword-only result served while the model was still loading
+
+
+class BatchClassificationResponse(ClassificationResponse):
+    index: int  # position of the complaint in the submitted batch
@@ -0,0 +1,185 @@
+"""
+serve.py
+
+Pre-fork multi-worker server for the classifier (Linux/macOS).
+
+`uvicorn --workers N` starts N independent interpreters, each loading its own
+DistilBERT, tokenizer, spaCy pipeline and prototype matrix. Here the master
+process loads all of them once, binds the listening socket, freezes the heap
+and then forks N workers that serve the same socket. The workers share the
+model pages copy-on-write, so memory grows by per-worker state (caches,
+activations) rather than by a full model per worker.
+
+Every worker gets a fixed number of torch intra-op threads so that
+workers x threads never exceeds the cores available to the process; with
+--pin-cpus each worker is additionally bound to its own slice of cores.
+
+Usage:
+    python serve.py --port 8000 --workers 4            # threads = cores // workers
+    python serve.py --workers 8 --threads 1 --pin-cpus
+
+The master restarts workers that exit unexpectedly and forwards SIGTERM/SIGINT.
+Caches and /metrics are per worker.
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from config import Config
+
+logger = logging.getLogger("serve")
+logging.basicConfig(level=logging.INFO)
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_threads(cores: int, workers: int, threads: int) -> int:
+    """Intra-op threads per worker; auto (0) splits the cores evenly."""
+    if threads <= 0:
+        threads = max(1, cores // workers)
+    if workers * threads > cores:
+        logger.warning(f"{workers} workers x {threads} threads oversubscribes {cores} cores")
+    return threads
+
+
+def load_shared_state():
+    """Import the app and load every heavy artifact in the master, before forking."""
+    import torch
+
+    # Keep torch single-threaded in the master: an OpenMP pool created before
+    # fork() is not usable in the children. Workers raise their own thread count.
+    torch.set_num_threads(1)
+    torch.set_num_interop_threads(1)
+
+    import main as service
+    import artifact_bundle
+    from entity_extractor import load_nlp
+
+    start = time.monotonic()
+    service.classifier.load_model()
+    load_nlp(artifact_bundle.spacy_model(Config.BUNDLE_DIR))
+    logger.info(f"Master loaded models in {time.monotonic() - start:.1f}s")
+    return service
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def init_worker(service, threads: int, cpus: List[int] | None = None):
+    """Per-process setup in a forked worker: CPU affinity, torch threads, embedder sessions."""
+    import torch
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+    after_fork = getattr(service.classifier.embedder, "after_fork", None)
+    if after_fork is not None:
+        after_fork()
+
+
+def run_worker(service, sock: socket.socket, index: int, threads: int, cpus: List[int] | None):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    init_worker(service, threads, cpus)
+    logger.info(f"Worker {index} (pid {os.getpid()}) serving with {threads} thread(s)"
+                + (f" on cpus {cpus}" if cpus else ""))
+    server = uvicorn.Server(uvicorn.Config(service.app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, threads: int, pin_cpus: bool):
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); on Windows run `python main.py` instead")
+    cores = available_cores()
+    workers = workers if workers > 0 else len(cores)
+    threads = plan_threads(len(cores), workers, threads)
+    # BLAS/OpenMP read these at import time; the children inherit them
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    os.environ.setdefault("MKL_NUM_THREADS", str(threads))
+    if Config.ONNX_THREADS <= 0:
+        Config.ONNX_THREADS = threads
+
+    service = load_shared_state()
+    sock = bind_socket(host, port)
+    logger.info(f"Listening on http://{host}:{port} with {workers} workers")
+
+    # objects that exist now live for the whole process; keep the collector from
+    # touching (and thereby copying) their pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int):
+        cpus = None
+        if pin_cpus:
+            cpus = [cores[(index * threads + k) % len(cores)] for k in range(threads)]
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(service, sock, index, threads, cpus)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+        time.sleep(1)  # avoid a fork loop if workers crash on startup
+        spawn(index)
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=Config.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=Config.SERVE_WORKERS, help="0 = one per available core")
+    parser.add_argument("--threads", type=int, default=Config.TORCH_THREADS,
+                        help="torch intra-op threads per worker; 0 = cores // workers")
+    parser.add_argument("--pin-cpus", action="store_true", help="bind each worker to its own cores")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.pin_cpus)
@@ -0,0 +1,58 @@
+"""
+single_flight.py
+
+Single-flight coalescing of identical concurrent requests.
+
+When the bot's retry layer resends a complaint while the first /classify call
+for it is still running, the second caller is attached to the pending
+computation instead of starting another model run. Calls are identified by the
+same normalized-text key as the result cache. The pending computation is a
+concurrent.futures.Future, so followers can block on it from a worker thread or
+await it from the event loop via asyncio.wrap_future.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future
+from typing import Any, Dict, Tuple
+import threading
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._calls = 0
+        self._deduplicated = 0
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """
+        Register interest in `key`. Returns (future, is_leader); the leader must
+        compute the value and call finish(), everyone else just waits on the future.
+        """
+        with self._lock:
+            self._calls += 1
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._deduplicated += 1
+                return fut, False
+            fut = Future()
+            fut.set_running_or_notify_cancel()
+            self._inflight[key] = fut
+            return fut, True
+
+    def finish(self, key: str, fut: Future, result: Any = None, error: BaseException | None = None):
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "deduplicated": self._deduplicated,
+                "in_flight": len(self._inflight),
+            }
@@ -0,0 +1,233 @@
+"""
+static_embedder.py
+
+Static-embedding backend distilled from the encoder (DistilBERT by default):
+no transformer forward pass at request time.
+
+`distill` runs every token of the encoder vocabulary through the model once
+(as "[CLS] token [SEP]", mean pooled like SimpleDistilEmbedder), reduces the
+resulting vectors to --dim dimensions with PCA and scales each row by a Zipf
+weight, log(1 + token id) - the vocabulary is roughly frequency ordered, so
+frequent, uninformative pieces weigh less. Special tokens get a zero row.
+
+    python static_embedder.py distill [--dim 256]
+    python static_embedder.py check [--min-agreement 0.8]
+
+StaticEmbedder then embeds a text by tokenizing it and averaging the table rows
+of its tokens: one gather and one reduceat in numpy. It exposes the same
+embed(texts) / embed_ids(ids) interface as the other engines, so FraudClassifier
+selects it with CLASSIFIER_EMBEDDING_BACKEND=static; prototypes are embedded
+with the table as well. The table (vectors.npy) is memory-mapped.
+
+`check` compares the static engine with torch on the example corpus: how often
+the best subcategory prototype and the final classification agree, and the
+embedding time per text of both.
+"""
+from __future__ import annotations
+
+from itertools import chain
+from typing import Any, Dict, List
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+import metrics
+from config import Config
+from tokenization import effective_max_length, tokenize
+
+logger = logging.getLogger(__name__)
+
+STATIC_FORMAT_VERSION = 1
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+
+
+def pca(vectors: np.ndarray, dim: int):
+    """Project rows onto their top `dim` principal components; returns (projected, explained variance ratio)."""
+    centered = vectors - vectors.mean(0, keepdims=True)
+    _, singular, components = np.linalg.svd(centered, full_matrices=False)
+    dim = min(dim, components.shape[0])
+    variance = singular ** 2
+    return centered @ components[:dim].T, float(variance[:dim].sum() / variance.sum())
+
+
+def zipf_weights(vocab_size: int) -> np.ndarray:
+    return np.log1p(np.arange(vocab_size, dtype=np.float64))
+
+
+def distill(out_dir: str, dim: int = 256, batch_size: int = 1024) -> Dict[str, Any]:
+    """Build the static token table from the encoder vocabulary and write it to out_dir."""
+    from classifier import MODEL_NAME, SimpleDistilEmbedder, tokenizer_version
+
+    embedder = SimpleDistilEmbedder(model_name=MODEL_NAME)
+    tokenizer = embedder.tokenizer
+    vocab_size = len(tokenizer)
+    cls, sep = tokenizer.cls_token_id, tokenizer.sep_token_id
+    logger.info(f"Embedding {vocab_size} vocabulary tokens with {MODEL_NAME}")
+    start = time.perf_counter()
+    token_vectors = np.zeros((vocab_size, embedder.dim), dtype=np.float32)
+    for first in range(0, vocab_size, batch_size):
+        ids = [[cls, token, sep] for token in range(first, min(first + batch_size, vocab_size))]
+        token_vectors[first:first + len(ids)] = embedder.embed_ids(ids)
+    logger.info(f"Embedded the vocabulary in {time.perf_counter() - start:.1f}s; reducing to {dim} dimensions")
+
+    reduced, explained = pca(token_vectors, dim)
+    table = (reduced * zipf_weights(vocab_size)[:, None]).astype(np.float32)
+    table[tokenizer.all_special_ids] = 0.0
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, VECTORS_FILE), table)
+    tokenizer.save_pretrained(os.path.join(out_dir, "tokenizer"))
+    metadata = {
+        "format_version": STATIC_FORMAT_VERSION,
+        "table_id": hashlib.sha256(table.tobytes()).hexdigest()[:16],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model_name": MODEL_NAME,
+        "tokenizer_version": tokenizer_version(tokenizer),
+        "vocab_size": vocab_size,
+        "dim": int(table.shape[1]),
+        "pca_explained_variance": explained,
+        "weighting": "zipf",
+    }
+    with open(os.path.join(out_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    logger.info(f"Wrote {vocab_size}x{table.shape[1]} static table {metadata['table_id']} to {out_dir} "
+                f"({explained:.1%} of variance kept)")
+    return metadata
+
+
+class StaticEmbedder:
+    engine = "static"
+
+    def __init__(self, static_dir: str, max_length: int = Config.MAX_SEQ_LENGTH):
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(static_dir, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("format_version") != STATIC_FORMAT_VERSION:
+            raise ValueError(f"Unsupported static table format {metadata.get('format_version')} in {static_dir}")
+        self.model_name = metadata["model_name"]
+        self.table_id = metadata["table_id"]
+        self.vectors = np.load(os.path.join(static_dir, VECTORS_FILE), mmap_mode="r")
+        self.dim = self.vectors.shape[1]
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.join(static_dir, "tokenizer"), use_fast=True)
+        self.max_length = effective_max_length(self.tokenizer, max_length)
+        logger.info(f"Loaded static table {self.table_id} ({self.vectors.shape[0]}x{self.dim}) from {static_dir}")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        # returns (n, dim) numpy array
+        return self.embed_ids(tokenize(self.tokenizer, texts, self.max_length))
+
+    def embed_ids(self, ids: List[List[int]]) -> np.ndarray:
+        # mean of the token rows of each sequence: one gather + one segmented sum
+        with metrics.PHASE_SECONDS.time("forward"):
+            lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+            flat = np.fromiter(chain.from_iterable(ids), dtype=np.int64, count=int(lengths.sum()))
+            out = np.zeros((len(ids), self.dim), dtype=np.float32)
+            present = lengths > 0
+            if flat.size:
+                offsets = np.cumsum(lengths) - lengths
+                sums = np.add.reduceat(self.vectors[flat], offsets[present], axis=0)
+                out[present] = sums / lengths[present, None]
+        return out
+
+
+def load_static_embedder(static_dir: str, distill_missing: bool = False) -> StaticEmbedder:
+    """
+    Open the static table. Distilling runs the whole vocabulary through the encoder,
+    so serving never does it implicitly: a missing table is an error unless
+    distill_missing is set (the CLI's `check` does).
+    """
+    if not os.path.exists(os.path.join(static_dir, METADATA_FILE)):
+        if not distill_missing:
+            raise FileNotFoundError(f"No static table in {static_dir}; build it with "
+                                    f"`python static_embedder.py distill` before serving the static engine")
+        logger.warning(f"No static table in {static_dir}; distilling one now (runs the full vocabulary once)")
+        distill(static_dir)
+    return StaticEmbedder(static_dir)
+
+
+def check_agreement(min_agreement: float) -> bool:
+    """Compare static vs torch prototype decisions and classifications on the example corpus."""
+    from classifier import FINANCIAL_SUBCATEGORIES, MODEL_NAME, SOCIAL_SUBCATEGORIES, FraudClassifier, model_cache_dir
+    from corpus import load_texts
+
+    texts = load_texts()
+    load_static_embedder(model_cache_dir(Config.STATIC_DIR, MODEL_NAME), distill_missing=True)
+    reference = FraudClassifier(backend="torch", bundle_dir=None)
+    candidate = FraudClassifier(backend="static", bundle_dir=None)
+    if candidate.embedder.engine != "static":
+        print("❌ Backend 'static' could not be loaded")
+        return False
+    subcategories = FINANCIAL_SUBCATEGORIES + SOCIAL_SUBCATEGORIES
+
+    timings, embs = {}, {}
+    for name, clf in (("torch", reference), ("static", candidate)):
+        clf.embedder.embed(texts[:4])  # warm-up
+        start = time.perf_counter()
+        embs[name] = [clf.embedder.embed([text])[0] for text in texts]
+        timings[name] = (time.perf_counter() - start) / len(texts)
+
+    top1 = top3 = primary = final = 0
+    mismatches = []
+    for text, ref_emb, cand_emb in zip(texts, embs["torch"], embs["static"]):
+        ref_scores, cand_scores = reference.score_embedding(ref_emb), candidate.score_embedding(cand_emb)
+        ref_best, _ = ref_scores.best(subcategories)
+        cand_best, _ = cand_scores.best(subcategories)
+        cand_top3 = sorted(subcategories, key=cand_scores.cosine, reverse=True)[:3]
+        top1 += ref_best == cand_best
+        top3 += ref_best in cand_top3
+        primary += (ref_scores.cosine("Financial Fraud") >= ref_scores.cosine("Social Media Fraud")) == \
+                   (cand_scores.cosine("Financial Fraud") >= cand_scores.cosine("Social Media Fraud"))
+        ref = reference.classify(text, scores=ref_scores)
+        cand = candidate.classify(text, scores=cand_scores)
+        if ref[:2] == cand[:2]:
+            final += 1
+        else:
+            mismatches.append((text, ref[:2], cand[:2]))
+
+    n = len(texts)
+    print("=" * 80)
+    print(f"STATIC EMBEDDING AGREEMENT: torch vs static table {candidate.embedder.table_id} ({n} texts)")
+    print("=" * 80)
+    print(f"Best subcategory prototype   {top1}/{n} ({top1 / n:.1%})")
+    print(f"Torch best in static top-3   {top3}/{n} ({top3 / n:.1%})")
+    print(f"Nearer primary prototype     {primary}/{n} ({primary / n:.1%})")
+    print(f"Final classification         {final}/{n} ({final / n:.1%})")
+    print(f"Embedding time per text      torch {timings['torch'] * 1e3:.3f} ms, "
+          f"static {timings['static'] * 1e3:.3f} ms")
+    for text, ref, cand in mismatches:
+        print(f"  ✗ {text[:70]}...")
+        print(f"      torch: {ref}  static: {cand}")
+
+    ok = final / n >= min_agreement
+    print(f"\n{'✅ PASS' if ok else '❌ FAIL'} (classification agreement threshold {min_agreement:.0%})")
+    return ok
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Distill and verify the static-embedding backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_distill = sub.add_parser("distill", help="build the static token table from the encoder")
+    p_distill.add_argument("--out", help="output directory (default: the backbone's directory in STATIC_DIR)")
+    p_distill.add_argument("--dim", type=int, default=256, help="PCA dimensions kept")
+    p_distill.add_argument("--batch-size", type=int, default=1024, help="vocabulary tokens per forward pass")
+    p_check = sub.add_parser("check", help="report prototype and classification agreement vs torch")
+    p_check.add_argument("--min-agreement", type=float, default=0.8)
+    args = parser.parse_args()
+
+    if args.command == "distill":
+        from classifier import MODEL_NAME, model_cache_dir
+
+        out = args.out or model_cache_dir(Config.STATIC_DIR, MODEL_NAME)
+        meta = distill(out, dim=args.dim, batch_size=args.batch_size)
+        print(f"✅ Static table {meta['table_id']} written to {out}")
+    else:
+        sys.exit(0 if check_agreement(args.min_agreement) else 1)
@@ -0,0 +1,58 @@
+"""
+Test script for the frozen classifier bundle: mmap'd safetensors weights and
+keyword tables. Runs without downloading DistilBERT.
+"""
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+import torch
+from safetensors.torch import save_file
+
+from artifact_bundle import KEYWORD_TABLE_ATTRS, _assign, mmap_safetensors
+from classifier import FraudClassifier
+
+
+class TinyEncoder(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.embed = torch.nn.Embedding(10, 4)
+        self.proj = torch.nn.Linear(4, 3)
+        self.register_buffer("position_ids", torch.arange(6).unsqueeze(0), persistent=False)
+
+
+def test_mmap_tensors_match_the_saved_weights():
+    torch.manual_seed(0)
+    source = TinyEncoder()
+    tensors = {n: t.detach().contiguous() for n, t in list(source.named_parameters()) + list(source.named_buffers())}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.safetensors")
+        save_file(tensors, path)
+        loaded = mmap_safetensors(path)
+        assert set(loaded) == set(tensors)
+        for name, tensor in tensors.items():
+            assert loaded[name].dtype == tensor.dtype and torch.equal(loaded[name], tensor), name
+
+        with torch.device("meta"):
+            target = TinyEncoder()
+        for name, tensor in loaded.items():
+            _assign(target, name, tensor)
+        assert not any(t.is_meta for t in list(target.parameters()) + list(target.buffers()))
+        ids = torch.tensor([[1, 2, 3]])
+        assert torch.equal(target.proj(target.embed(ids)), source.proj(source.embed(ids)))
+        assert torch.equal(target.position_ids, source.position_ids)
+
+
+def test_keyword_tables_survive_json_round_trip():
+    classifier = FraudClassifier(load_model=False)
+    tables = {attr: getattr(classifier, attr) for attr in KEYWORD_TABLE_ATTRS}
+    restored = json.loads(json.dumps(tables, ensure_ascii=False))
+    assert restored == tables
+
+
+if __name__ == "__main__":
+    test_mmap_tensors_match_the_saved_weights()
+    test_keyword_tables_survive_json_round_trip()
+    print("✅ All artifact bundle tests passed")
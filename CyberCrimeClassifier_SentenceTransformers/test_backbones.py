@@ -0,0 +1,45 @@
+"""
+Test script for backbone selection: short names, per-backbone artifact directories
+and the side-by-side report. `python backbones.py compare` runs the real models.
+"""
+import os
+import sys
+sys.path.insert(0, '.')
+
+from backbones import format_report
+from classifier import BACKBONES, model_cache_dir
+
+
+def test_backbone_names():
+    assert BACKBONES["distilbert"] == "distilbert-base-uncased"
+    assert BACKBONES["minilm-l6"] == "sentence-transformers/all-MiniLM-L6-v2"
+    assert BACKBONES["minilm-l3"] == "sentence-transformers/paraphrase-MiniLM-L3-v2"
+
+
+def test_artifacts_are_kept_per_backbone():
+    dirs = {model_cache_dir(os.path.join("cache", "onnx"), name) for name in BACKBONES.values()}
+    assert len(dirs) == len(BACKBONES)
+    assert model_cache_dir("cache", "sentence-transformers/all-MiniLM-L6-v2") == \
+        os.path.join("cache", "sentence-transformers--all-MiniLM-L6-v2")
+    assert model_cache_dir("cache", "distilbert-base-uncased") == os.path.join("cache", "distilbert-base-uncased")
+
+
+def test_report_lines():
+    accuracy = {"primary": {"correct": 70, "total": 75}, "subcategory": {"correct": 50, "total": 66},
+                "priority": {"correct": 11, "total": 12}}
+    report = {"backbones": {
+        "minilm-l6": {"parameters": 22_700_000, "dim": 384, "accuracy": accuracy,
+                      "latency": {"p50_ms": 3.2, "p95_ms": 4.1}, "startup": {"total_s": 2.5}, "peak_rss_mb": None},
+        "some/very-long-model-name": {"error": "OSError: not found"},
+    }}
+    header, minilm, missing = format_report(report)
+    assert header.startswith("backbone") and "RSS MB" in header
+    assert "22.7M" in minilm and "384" in minilm and "70/75" in minilm and minilm.endswith("n/a")
+    assert missing.startswith("some/very-long-model-name OSError")
+
+
+if __name__ == "__main__":
+    test_backbone_names()
+    test_artifacts_are_kept_per_backbone()
+    test_report_lines()
+    print("✅ All backbone tests passed")
@@ -0,0 +1,52 @@
+"""
+Test script for the benchmark helpers (percentiles, corpus, result comparison).
+The measurements themselves need the model: python benchmark.py run --out bench.json
+"""
+import sys
+sys.path.insert(0, '.')
+
+from benchmark import compare, fixed_corpus, peak_rss_mb, percentile, summarize
+from corpus import load_texts
+
+
+def test_nearest_rank_percentiles():
+    ordered = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    assert percentile(ordered, 0.50) == 0.050
+    assert percentile(ordered, 0.99) == 0.099
+    summary = summarize(list(reversed(ordered)))
+    assert summary["count"] == 100
+    assert round(summary["p95_ms"], 6) == 95.0 and round(summary["max_ms"], 6) == 100.0
+    assert summarize([0.002])["p99_ms"] == 2.0
+    assert summarize([]) == {"count": 0}
+
+
+def test_fixed_corpus_is_stable_and_cycles():
+    texts = load_texts()
+    assert fixed_corpus() == texts
+    cycled = fixed_corpus(len(texts) * 2 + 1)
+    assert cycled[len(texts)] == texts[0] and cycled[-1] == texts[0]
+
+
+def test_peak_rss_is_reported():
+    rss = peak_rss_mb()
+    assert rss is None or rss > 1
+
+
+def test_compare_reports_changes():
+    base = {"latency": {"classify": summarize([0.010] * 10)},
+            "throughput": [{"threads": 1, "batch_size": 8, "texts_per_second": 100.0}], "peak_rss_mb": 500.0}
+    new = {"latency": {"classify": summarize([0.005] * 10)},
+           "throughput": [{"threads": 1, "batch_size": 8, "texts_per_second": 150.0}], "peak_rss_mb": 400.0}
+    lines = compare(base, new)
+    print("\n".join(lines))
+    assert any(line.startswith("classify") and line.endswith("-50.0%") for line in lines)
+    assert any(line.startswith("t=1 b=8") and line.endswith("+50.0%") for line in lines)
+    assert any(line.startswith("peak_rss_mb") and line.endswith("-20.0%") for line in lines)
+
+
+if __name__ == "__main__":
+    test_nearest_rank_percentiles()
+    test_fixed_corpus_is_stable_and_cycles()
+    test_peak_rss_is_reported()
+    test_compare_reports_changes()
+    print("✅ All benchmark tests passed")
@@ -0,0 +1,82 @@
+"""
+Test script for the offline bulk classifier: streaming readers, chunking and
+checkpoint/resume. A stand-in classify function replaces the model.
+"""
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+from bulk_classify import Checkpoint, read_records, run
+
+
+class Crash(Exception):
+    pass
+
+
+def fake_classify(crash_at_row=None):
+    def classify(rows):
+        if crash_at_row is not None and any(row >= crash_at_row for row, _, _ in rows):
+            raise Crash()
+        return {row: json.dumps({"id": record_id, "row": row, "length": len(text)}) + "\n"
+                for row, record_id, text in rows}
+    return classify
+
+
+def read_output(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def write_jsonl(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            if i == 4:
+                f.write("{not json\n")
+            elif i == 7:
+                f.write(json.dumps({"caseId": f"C{i}", "incidentDescription": "  "}) + "\n")
+            else:
+                f.write(json.dumps({"caseId": f"C{i}", "incidentDescription": "x" * (i + 1)}) + "\n")
+
+
+def test_offsets_resume_reading_midway():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cases.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write('caseId,incidentDescription\nC0,"lost money,\nvia UPI"\nC1,hacked account\nC2,"said ""pay"""\n')
+        records = list(read_records(path, "csv"))
+        assert [r["caseId"] for r, _ in records] == ["C0", "C1", "C2"]
+        assert records[0][0]["incidentDescription"] == "lost money,\nvia UPI"
+        resumed = list(read_records(path, "csv", offset=records[0][1]))
+        assert [r for r, _ in resumed] == [r for r, _ in records[1:]]
+        assert resumed[-1][0]["incidentDescription"] == 'said "pay"'
+
+
+def test_crash_and_resume_writes_every_row_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        src, out = os.path.join(tmp, "cases.jsonl"), os.path.join(tmp, "out.jsonl")
+        write_jsonl(src, 20)
+        try:
+            run(src, out, chunk_size=3, classify=fake_classify(crash_at_row=10))
+        except Crash:
+            pass
+        state = Checkpoint(out + ".checkpoint.json").load()
+        assert state["rows"] == 9 and not state["done"]
+        with open(out, "a", encoding="utf-8") as f:
+            f.write('{"partial": ')  # torn write after the last checkpoint
+        final = run(src, out, chunk_size=3, classify=fake_classify())
+        assert final["done"] and final["rows"] == 20 and final["errors"] == 2
+        lines = read_output(out)
+        assert [line["row"] for line in lines] == list(range(20))
+        assert lines[4]["error"].startswith("invalid JSON") and lines[7]["id"] == "C7" and "error" in lines[7]
+        assert lines[19] == {"id": "C19", "row": 19, "length": 20}
+        assert run(src, out, classify=fake_classify(crash_at_row=0))["rows"] == 20  # already complete
+        assert run(src, out, chunk_size=8, restart=True, classify=fake_classify())["rows"] == 20
+        assert len(read_output(out)) == 20
+
+
+if __name__ == "__main__":
+    test_offsets_resume_reading_midway()
+    test_crash_and_resume_writes_every_row_once()
+    print("✅ All bulk classify tests passed")
@@ -0,0 +1,93 @@
+"""
+Test script for early-exit encoding: margin parsing, calibration and layer-by-layer
+pooling. Uses small randomly initialised DistilBERT and BERT (MiniLM layout)
+encoders, so nothing is downloaded.
+"""
+import math
+import sys
+sys.path.insert(0, '.')
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertModel, DistilBertConfig, DistilBertModel
+
+from classifier import SimpleDistilEmbedder
+from early_exit import calibrate_layer, format_exit_margins, parse_exit_margins
+
+
+class Tokenizer:
+    pad_token_id = 0
+
+
+def make_embedder(bert=False):
+    torch.manual_seed(0)
+    if bert:
+        config = BertConfig(vocab_size=50, hidden_size=32, intermediate_size=64, num_hidden_layers=4,
+                            num_attention_heads=2, max_position_embeddings=64)
+        model = BertModel(config)
+    else:
+        config = DistilBertConfig(vocab_size=50, dim=32, hidden_dim=64, n_layers=4, n_heads=2,
+                                  max_position_embeddings=64)
+        model = DistilBertModel(config)
+    embedder = SimpleDistilEmbedder.__new__(SimpleDistilEmbedder)  # skip the HuggingFace download
+    embedder.device, embedder.model, embedder.tokenizer = "cpu", model.eval(), Tokenizer()
+    embedder.max_length, embedder.length_buckets = 64, [8, 16]
+    return embedder
+
+
+IDS = [[1, 5, 7, 2], [1, 9, 2], [1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 2], [1, 12, 13, 2]]
+
+
+def test_margin_spec():
+    assert parse_exit_margins("") == {}
+    assert parse_exit_margins("4:0.05, 2:0.1") == {2: 0.1, 4: 0.05}
+    assert format_exit_margins({2: 0.1, 3: math.inf}) == "2:0.1000"
+    try:
+        parse_exit_margins("2")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("margin without a layer was accepted")
+
+
+def test_calibration_picks_smallest_safe_margin():
+    margins = [0.9, 0.8, 0.7, 0.6, 0.5, 0.4]
+    agrees = [True, True, True, False, True, True]
+    assert calibrate_layer(margins, agrees, 1.0) == 0.7
+    assert calibrate_layer(margins, agrees, 0.8) == 0.4
+    assert calibrate_layer([0.5, 0.5, 0.1], [True, False, True], 1.0) == math.inf  # ties exit together
+    assert calibrate_layer([], [], 0.9) == math.inf
+
+
+def test_last_layer_matches_the_forward_pass():
+    for bert in (False, True):
+        embedder = make_embedder(bert)
+        assert embedder.n_layers == 4 and embedder.dim == 32
+        by_layer = embedder.embed_ids_layers(IDS, [1, 2, 9])
+        assert sorted(by_layer) == [1, 2, 4]
+        assert np.allclose(by_layer[4], embedder.embed_ids(IDS), atol=1e-5)
+
+
+def test_exited_rows_skip_later_layers():
+    for bert in (False, True):
+        embedder = make_embedder(bert)
+        full = embedder.embed_ids_layers(IDS, [1, 2])
+        seen = []
+
+        def should_exit(layer, rows, embs):
+            seen.append((layer, sorted(rows.tolist())))
+            return np.isin(rows, [0, 2]) if layer == 1 else np.zeros(len(rows), dtype=bool)
+
+        early = embedder.embed_ids_layers(IDS, [1, 2], should_exit)
+        assert sorted(r for layer, rows in seen if layer == 2 for r in rows) == [1, 3]
+        assert np.allclose(early[1], full[1], atol=1e-5)
+        assert not early[4][[0, 2]].any()  # exited at layer 1
+        assert np.allclose(early[4][[1, 3]], full[4][[1, 3]], atol=1e-5)
+
+
+if __name__ == "__main__":
+    test_margin_spec()
+    test_calibration_picks_smallest_safe_margin()
+    test_last_layer_matches_the_forward_pass()
+    test_exited_rows_skip_later_layers()
+    print("✅ All early-exit tests passed")
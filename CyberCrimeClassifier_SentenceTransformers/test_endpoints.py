@@ -0,0 +1,201 @@
+"""
+Test script for the FastAPI endpoints run in-process with TestClient and a
+synthetic embedder (no model download, no running server).
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, '.')
+
+from fastapi.testclient import TestClient
+
+import keyword_tables
+import main
+from inference_executor import InferenceExecutor
+from test_helpers import HashEmbedder, attach_embedder
+
+client = TestClient(main.app)
+
+
+def use_hash_embedder() -> HashEmbedder:
+    main.classifier.prototype_cache_dir = None  # lands on the current table snapshot
+    embedder = attach_embedder(main.classifier)
+    main.batcher.start()
+    main.result_cache.clear()
+    return embedder
+
+
+def test_answer_computed_before_a_reload_is_not_cached():
+    embedder = use_hash_embedder()
+    text = "my upi payment was stolen by a fake customer care number"
+    entered, release = threading.Event(), threading.Event()
+    embedder.gate = (text, entered, release)
+    result = {}
+    request = threading.Thread(target=lambda: result.update(
+        response=client.post("/classify", json={"complaint_text": text})))
+    request.start()
+    assert entered.wait(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tables.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(keyword_tables.export(main.classifier, "v2"), f)
+        assert main.reload_tables(path)["version"] == "v2"
+    assert keyword_tables.export(main.classifier, "v2")["stage_words"] == main.classifier._snapshot.stage_words
+    release.set()
+    request.join(5)
+    embedder.gate = None
+    assert result["response"].status_code == 200
+    # the in-flight request stored its answer after the flush, tagged with the old tables
+    stale = main.result_cache.stats()["stale"]
+    embedder.embedded.clear()
+    assert client.post("/classify", json={"complaint_text": text}).status_code == 200
+    assert embedder.embedded == [text] and main.result_cache.stats()["stale"] == stale + 1
+    embedder.embedded.clear()
+    client.post("/classify", json={"complaint_text": text})
+    assert embedder.embedded == []  # the answer computed with v2 is served from the cache
+
+
+def test_admin_routes_need_the_token():
+    use_hash_embedder()
+    token = main.Config.ADMIN_TOKEN
+    try:
+        main.Config.ADMIN_TOKEN = ""
+        assert client.post("/admin/cache/flush", headers={"X-Admin-Token": ""}).status_code == 403
+        main.Config.ADMIN_TOKEN = "s3cret"
+        for method, path in [("post", "/admin/cache/flush"), ("get", "/admin/tables"),
+                             ("post", "/admin/tables/reload")]:
+            assert getattr(client, method)(path).status_code == 401, path
+            assert getattr(client, method)(path, headers={"X-Admin-Token": "wrong"}).status_code == 401, path
+        client.post("/classify", json={"complaint_text": "upi fraud of rs 500"})
+        response = client.post("/admin/cache/flush", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 200 and response.json() == {"flushed": 1}
+        response = client.get("/admin/tables", headers={"X-Admin-Token": "s3cret"})
+        assert response.json()["version"] == main.classifier.tables_version
+    finally:
+        main.Config.ADMIN_TOKEN = token
+
+
+def test_spacy_loads_before_the_classifier():
+    # classifier.model_ready must imply that NER entities are complete and cacheable
+    assert [step["name"] for step in main.loader.status()["steps"]] == ["spacy", "classifier"]
+
+
+def test_degraded_answers_run_on_the_executor():
+    use_hash_embedder()
+    classifier = main.classifier
+    threads = []
+    build_response = main.build_response
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return build_response(*args, **kwargs)
+
+    main.build_response = recording
+    classifier.model_ready = False
+    completed = main.executor.stats()["completed"]
+    try:
+        response = client.post("/classify", json={"complaint_text": "lost money in a lottery scam"})
+    finally:
+        classifier.model_ready = True
+        main.build_response = build_response
+    assert response.status_code == 200 and response.json()["degraded"] is True
+    assert response.headers["X-Degraded"] == "1"
+    assert threads and threads[0].startswith("inference")  # not the event loop
+    assert main.executor.stats()["completed"] == completed + 1
+    assert main.result_cache.get(main.cache_key("lost money in a lottery scam"),
+                                 main.classifier.tables_version) is None
+
+
+def test_classify_reports_batch_wait_separately():
+    use_hash_embedder()
+    response = client.post("/classify", json={"complaint_text": "my paytm wallet was emptied"})
+    assert response.status_code == 200
+    for header in ("X-Queue-Wait-Ms", "X-Batch-Wait-Ms", "X-Compute-Ms"):
+        assert float(response.headers[header]) >= 0.0
+
+
+def test_batch_endpoint_sheds_load_with_the_executor():
+    use_hash_embedder()
+    executor, release = main.executor, threading.Event()
+    main.executor = InferenceExecutor(workers=1, queue_size=0)
+    busy = main.executor.submit(release.wait)
+    try:
+        response = client.post("/classify/batch", json=[{"complaint_text": "upi fraud of rs 500"}])
+    finally:
+        release.set()
+        busy.result(timeout=5)
+        main.executor.shutdown()
+        main.executor = executor
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
+    response = client.post("/classify/batch", json=[{"complaint_text": "upi fraud of rs 500"}])
+    assert response.status_code == 200 and main.batcher.stats()["items"] > 0
+
+
+def post_batch(texts):
+    response = client.post("/classify/batch", json=[{"complaint_text": t} for t in texts])
+    assert response.status_code == 200 and response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def expected(text):
+    resp = main.build_response(main.classifier.classify(text), main.extract_entities(text))
+    return json.loads(resp.model_dump_json())
+
+
+def test_batch_lines_map_back_to_input_indices():
+    use_hash_embedder()
+    texts = ["Someone hacked my Instagram account and is posting obscene photos of me",
+             "upi fraud rs 500",
+             "Got a call from fake customer care, they took ₹12,000 from my SBI debit card via 9876543210",
+             "loan app harassment"]
+    lines = post_batch(texts)
+    # streamed shortest text first; every line carries the position it had in the request
+    assert [line["index"] for line in lines] == [1, 3, 0, 2]
+    for line in lines:
+        assert {k: v for k, v in line.items() if k != "index"} == expected(texts[line["index"]])
+
+
+def test_batch_mixes_cache_hits_and_misses():
+    embedder = use_hash_embedder()
+    texts = ["my paytm wallet was emptied", "olx buyer never paid", "lottery prize scam", "fake job offer fee"]
+    warm = {i: client.post("/classify", json={"complaint_text": texts[i]}).json() for i in (0, 2)}
+    embedder.embedded.clear()
+    lines = post_batch(texts)
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert sorted(embedder.embedded) == sorted([texts[1], texts[3]])  # only the misses reach the model
+    by_index = {line.pop("index"): line for line in lines}
+    assert all(by_index[i] == warm[i] for i in warm)
+    assert by_index[1] == expected(texts[1]) and by_index[3] == expected(texts[3])
+
+
+def test_batch_rejects_empty_items():
+    use_hash_embedder()
+    response = client.post("/classify/batch", json=[{"complaint_text": "upi fraud"}, {"complaint_text": "  "},
+                                                    {"complaint_text": "hacked"}, {"complaint_text": ""}])
+    assert response.status_code == 400 and "[1, 3]" in response.json()["detail"]
+
+
+def test_batch_waits_for_the_model():
+    use_hash_embedder()
+    main.classifier.model_ready = False
+    try:
+        response = client.post("/classify/batch", json=[{"complaint_text": "upi fraud"}])
+    finally:
+        main.classifier.model_ready = True
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+
+
+if __name__ == "__main__":
+    test_answer_computed_before_a_reload_is_not_cached()
+    test_admin_routes_need_the_token()
+    test_spacy_loads_before_the_classifier()
+    test_degraded_answers_run_on_the_executor()
+    test_classify_reports_batch_wait_separately()
+    test_batch_endpoint_sheds_load_with_the_executor()
+    test_batch_lines_map_back_to_input_indices()
+    test_batch_mixes_cache_hits_and_misses()
+    test_batch_rejects_empty_items()
+    test_batch_waits_for_the_model()
+    print("✅ All endpoint tests passed")
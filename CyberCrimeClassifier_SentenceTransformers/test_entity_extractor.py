@@ -0,0 +1,102 @@
+"""
+Test script for batched spaCy NER and the entity field selector.
+A recording stand-in replaces the spaCy pipeline so the test runs without en_core_web_sm.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import entity_extractor
+from entity_extractor import ENTITY_FIELDS, extract_entities, extract_entities_batch, needs_ner, select_fields
+from corpus import load_texts
+from schema import ComplaintRequest
+
+
+class Ent:
+    def __init__(self, text, label_):
+        self.text, self.label_ = text, label_
+
+
+class Doc:
+    def __init__(self, text):
+        self.ents = [Ent(word, "ORG") for word in text.split() if word.isupper()]
+
+
+class RecordingPipeline:
+    """Tags every all-caps word as an ORG and records how it was called."""
+
+    def __init__(self):
+        self.calls, self.pipe_calls = [], []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return Doc(text)
+
+    def pipe(self, texts, batch_size=None, n_process=None):
+        texts = list(texts)
+        self.pipe_calls.append((texts, batch_size, n_process))
+        return (Doc(t) for t in texts)
+
+
+def with_pipeline(test):
+    def run():
+        saved = entity_extractor.nlp
+        entity_extractor.nlp = RecordingPipeline()
+        try:
+            test(entity_extractor.nlp)
+        finally:
+            entity_extractor.nlp = saved
+    return run
+
+
+@with_pipeline
+def test_ner_can_be_skipped(nlp):
+    text = "Paid ₹2,000 to SBI agent on PhonePe"
+    full = extract_entities(text)
+    assert full["orgs"] == ["SBI"] and full["amount"] == "₹2,000"
+    regex_only = extract_entities(text, ner=False)
+    assert regex_only["orgs"] == [] and regex_only["amount"] == "₹2,000"
+    assert nlp.calls == [text]
+
+
+@with_pipeline
+def test_batch_pipes_only_texts_that_need_ner(nlp):
+    texts = ["HDFC called me", "lost Rs 500", "ICICI and AXIS blocked my card"]
+    results = extract_entities_batch(texts, batch_size=2, n_process=1, ner=[True, False, True])
+    assert nlp.pipe_calls == [([texts[0], texts[2]], 2, 1)]
+    assert [r["orgs"] for r in results] == [["HDFC"], [], ["ICICI", "AXIS"]]
+    assert results[1]["amount"] == "Rs 500"
+    extract_entities_batch(texts, ner=False)
+    assert len(nlp.pipe_calls) == 1
+
+
+@with_pipeline
+def test_batch_matches_single_text_extraction(nlp):
+    texts = load_texts() + ["", "Paid ₹2,000 to SBI agent at 9876543210 on 12/05/2024, UTR AB12CD34EF56"]
+    flags = [i % 3 != 1 for i in range(len(texts))]
+    assert extract_entities_batch(texts, batch_size=4, ner=flags) == \
+        [extract_entities(t, ner=flag) for t, flag in zip(texts, flags)]
+    entity_extractor.nlp = None  # regex-only mode
+    assert extract_entities_batch(texts) == [extract_entities(t) for t in texts]
+
+
+def test_field_selector():
+    assert needs_ner(None) and needs_ner(["amount", "persons"])
+    assert not needs_ner(["amount", "upi_id"])
+    ents = {field: None for field in ENTITY_FIELDS}
+    assert list(select_fields(ents, ["upi_id", "amount"])) == ["amount", "upi_id"]
+    assert select_fields(ents, None) is ents
+    assert ComplaintRequest(complaint_text="x", entity_fields=["amount"]).entity_fields == ["amount"]
+    try:
+        ComplaintRequest(complaint_text="x", entity_fields=["amount", "salary"])
+    except ValueError as e:
+        assert "salary" in str(e)
+    else:
+        raise AssertionError("unknown entity field was accepted")
+
+
+if __name__ == "__main__":
+    test_ner_can_be_skipped()
+    test_batch_pipes_only_texts_that_need_ner()
+    test_batch_matches_single_text_extraction()
+    test_field_selector()
+    print("✅ All entity extractor tests passed")
@@ -0,0 +1,137 @@
+"""
+Fuzz and benchmark corpus for the single-pass entity scanner (entity_extractor.ENTITY_RE).
+
+The fuzz corpus builds complaint-like texts from typed entity fragments and
+checks that the scanner reports exactly the planted entities, each under its own
+type (the digits of an account number or UPI ID are not also a phone number). On
+the labelled example corpus it must agree with the per-type regexes it replaced.
+
+The adversarial corpus (long digit runs, '@'-dense text, long word runs, ...)
+checks that scan time grows linearly with input length. Run the script directly
+for a timing table of the old sequential regexes vs the scanner.
+"""
+from collections import Counter
+import random
+import re
+import sys
+import time
+sys.path.insert(0, '.')
+
+from entity_extractor import ENTITY_TYPES, extract_entities, scan
+from config import Config
+from corpus import load_texts
+
+# the sequential patterns extract_entities used before the combined scanner
+REFERENCE = {
+    "amount": (re.compile(r"(₹|Rs\.?\s?|INR\s?)[\s]*\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", flags=re.IGNORECASE), 0),
+    "phone": (re.compile(r"(?:\+91|91|0)?[-\s]?(?:\d{10}|\d{5}[-\s]?\d{5}|\d{3}[-\s]?\d{3}[-\s]?\d{4})"), 0),
+    "upi": (re.compile(r"[\w\.\-]{2,256}@[a-zA-Z]{2,64}"), 0),
+    "url": (re.compile(r"https?://\S+|www\.\S+", flags=re.IGNORECASE), 0),
+    "account": (re.compile(r"\b(?:account|acc|a/c)[\s\#\:\-]*(\d{9,18})\b", flags=re.IGNORECASE), 1),
+    "txn": (re.compile(r"(?:transaction|txn|ref|reference|utr)[\s\#\:\-]*([A-Z0-9]{10,20})\b", flags=re.IGNORECASE), 1),
+    "date": (re.compile(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b"), 0),
+}
+
+# fuzz fragments: (text, entity type or None, value the scanner must report)
+FRAGMENTS = [
+    ("I lost", None, None), ("money", None, None), ("scammer", None, None), ("call me on", None, None),
+    ("via PhonePe", None, None), ("bank said", None, None), ("please help", None, None), ("SBI", None, None),
+    ("@", None, None), ("-", None, None),
+    ("₹5,000", "amount", "₹5,000"), ("Rs.15000", "amount", "Rs.15000"), ("rs 250", "amount", "rs 250"),
+    ("INR 1,20,000.50", "amount", "INR 1,20,000.50"),
+    ("9876543210", "phone", "9876543210"), ("+91-9876543210", "phone", "+91-9876543210"),
+    ("98765 43210", "phone", "98765 43210"), ("080-123-4567", "phone", "080-123-4567"),
+    ("test@okaxis", "upi", "test@okaxis"), ("9876543210@ybl", "upi", "9876543210@ybl"),
+    ("fraud.user-1@paytm", "upi", "fraud.user-1@paytm"),
+    ("http://scam.example.com/login", "url", "http://scam.example.com/login"),
+    ("www.fake-bank.in/a@b", "url", "www.fake-bank.in/a@b"),
+    ("account 123456789012", "account", "123456789012"), ("a/c: 9876543210", "account", "9876543210"),
+    ("acc#12345678901", "account", "12345678901"), ("txn ABCD123456XY", "txn", "ABCD123456XY"),
+    ("UTR: 412345678901", "txn", "412345678901"), ("reference 1234567890AB", "txn", "1234567890AB"),
+    ("12/05/2024", "date", "12/05/2024"), ("2024-05-12", "date", "2024-05-12"), ("1-2-24", "date", "1-2-24"),
+]
+SEPARATORS = [" ", ", ", ". ", " - ", "\n"]
+
+
+def fuzz_texts(count, seed=0):
+    """Random complaint-like texts and the entities planted in them."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12))]
+        expected = Counter((kind, value) for _, kind, value in parts if kind)
+        yield rng.choice(SEPARATORS).join(text for text, _, _ in parts), expected
+
+
+def adversarial_texts(n):
+    """Inputs of about n characters that make naive patterns rescan or backtrack."""
+    return {
+        "digits": "1" * n,
+        "digits_spaced": "12345 " * (n // 6),
+        "at_dense": "a@" * (n // 2),
+        "digits_at": ("9" * 255 + "@") * (n // 256),
+        "word_run": "a" * n,
+        "dotted_run": "a.-" * (n // 3),
+        "currency_commas": "₹1" + "," * n,
+        "keywords": "account txn ref utr " * (n // 20),
+        "urls": "www." * (n // 4),
+    }
+
+
+def reference_scan(text):
+    return {kind: [m.group(group) for m in pattern.finditer(text)] for kind, (pattern, group) in REFERENCE.items()}
+
+
+def best_time(fn, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_scanner_finds_exactly_the_planted_entities():
+    for text, expected in fuzz_texts(5000):
+        found = Counter((kind, value.strip(" ,.\n")) for kind, values in scan(text).items() for value in values)
+        assert found == expected, (text, found - expected, expected - found)
+
+
+def test_scanner_matches_sequential_patterns_on_labelled_corpus():
+    for text in load_texts():
+        reference, found = reference_scan(text), scan(text)
+        for kind in ENTITY_TYPES:
+            assert sorted(found[kind]) == sorted(reference[kind]), (text, kind)
+
+
+def test_upi_digits_are_not_a_phone_number():
+    found = scan("sent to 9876543210@ybl, call 9876543210")
+    assert found["upi"] == ["9876543210@ybl"] and found["phone"] == [" 9876543210"]
+    assert scan("account 123456789012")["phone"] == []
+
+
+def test_scan_time_is_linear_on_adversarial_inputs():
+    small, large = adversarial_texts(4000), adversarial_texts(32000)
+    for name in small:
+        ratio = best_time(scan, large[name]) / max(best_time(scan, small[name]), 1e-5)
+        print(f"{name:16s} 8x input -> {ratio:.1f}x time")
+        assert ratio < 20, (name, ratio)  # quadratic would be ~64x
+
+
+def test_input_is_capped():
+    text = "lost ₹500 " + "a" * Config.ENTITY_MAX_CHARS + " call 9876543210"
+    result = extract_entities(text, ner=False)
+    assert result["amount"] == "₹500" and result["phone_numbers"] == []
+
+
+if __name__ == "__main__":
+    test_scanner_finds_exactly_the_planted_entities()
+    test_scanner_matches_sequential_patterns_on_labelled_corpus()
+    test_upi_digits_are_not_a_phone_number()
+    test_scan_time_is_linear_on_adversarial_inputs()
+    test_input_is_capped()
+    print(f"\n{'input':16s} {'chars':>7s} {'sequential ms':>14s} {'scanner ms':>11s}")
+    for n in (1000, 10000):
+        for name, text in adversarial_texts(n).items():
+            print(f"{name:16s} {len(text):7d} {best_time(reference_scan, text) * 1000:14.2f} "
+                  f"{best_time(scan, text) * 1000:11.2f}")
+    print("✅ All entity scanner tests passed")
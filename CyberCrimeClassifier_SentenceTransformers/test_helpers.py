@@ -0,0 +1,50 @@
+"""
+Shared fixtures for the test scripts: a deterministic synthetic embedder and a
+FraudClassifier scored with it, so prototype and reload logic can be tested
+without downloading a model.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import numpy as np
+
+from classifier import FraudClassifier
+
+
+class HashEmbedder:
+    """Bag-of-words vectors: each word adds 1 to a dimension picked by its characters."""
+    engine, model_name, max_length = "test", "hash", 64
+    dim = 32
+
+    class tokenizer:
+        vocab_size = 0
+
+    def __init__(self):
+        self.embedded = []  # every text embedded, in order
+        self.gate = None  # (text, entered, release): embedding `text` blocks until released
+
+    def embed(self, texts):
+        self.embedded += list(texts)
+        if self.gate is not None and self.gate[0] in texts:
+            self.gate[1].set()
+            self.gate[2].wait(5)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().replace(".", " ").split():
+                out[i, sum(map(ord, word)) % self.dim] += 1.0
+        return out
+
+
+def attach_embedder(classifier: FraudClassifier) -> HashEmbedder:
+    """Embed the classifier's prototypes with a fresh HashEmbedder and mark it ready."""
+    classifier.embedder = HashEmbedder()
+    classifier._embed_prototypes()
+    classifier.model_ready = True
+    return classifier.embedder
+
+
+def make_classifier(tables_file="", k=0, cache_dir=None) -> FraudClassifier:
+    classifier = FraudClassifier(load_model=False, prototype_cache_dir=cache_dir, exit_margins="",
+                                 prototype_centroids=k, tables_file=tables_file)
+    attach_embedder(classifier)
+    return classifier
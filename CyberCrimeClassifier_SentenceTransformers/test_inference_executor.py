@@ -0,0 +1,69 @@
+"""
+Test script for the bounded inference executor and its load shedding.
+"""
+import sys
+import threading
+import time
+sys.path.insert(0, '.')
+
+from inference_executor import InferenceExecutor, Overloaded
+
+
+def test_queue_full_is_rejected_immediately():
+    executor = InferenceExecutor(workers=1, queue_size=1)
+    release = threading.Event()
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: "queued")
+    try:
+        executor.submit(lambda: "rejected")
+        raise AssertionError("expected Overloaded")
+    except Overloaded as e:
+        assert e.reason == "queue_full"
+        assert e.retry_after >= 1
+    release.set()
+    assert running.result(timeout=5).value is True
+    assert queued.result(timeout=5).value == "queued"
+    stats = executor.stats()
+    print(f"Stats: {stats}")
+    assert stats["completed"] == 2 and stats["rejected_queue_full"] == 1
+    executor.shutdown()
+
+
+def test_queue_wait_and_compute_are_reported_separately():
+    executor = InferenceExecutor(workers=1, queue_size=4)
+    first = executor.submit(lambda: time.sleep(0.1))
+    second = executor.submit(lambda: "done")
+    timed = second.result(timeout=5)
+    assert timed.value == "done"
+    assert timed.queue_wait >= 0.05
+    assert timed.compute < 0.05
+    assert first.result(timeout=5).compute >= 0.05
+    executor.shutdown()
+
+
+def test_deadline_sheds_jobs_that_cannot_start_in_time():
+    executor = InferenceExecutor(workers=1, queue_size=8, deadline_ms=150)
+    executor.submit(lambda: time.sleep(0.1)).result(timeout=5)  # learn a ~100ms compute time
+    running = executor.submit(lambda: time.sleep(0.3))  # slower than predicted
+    queued = executor.submit(lambda: "late")  # predicted wait ~100ms, actual ~300ms
+    try:
+        executor.submit(lambda: "rejected")  # predicted wait ~200ms > 150ms
+        raise AssertionError("expected Overloaded")
+    except Overloaded as e:
+        assert e.reason == "deadline"
+    running.result(timeout=5)
+    try:
+        queued.result(timeout=5)
+        raise AssertionError("expected the queued job to expire")
+    except Overloaded as e:
+        assert e.reason == "deadline"
+    stats = executor.stats()
+    assert stats["rejected_deadline"] == 1 and stats["expired_in_queue"] == 1
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_queue_full_is_rejected_immediately()
+    test_queue_wait_and_compute_are_reported_separately()
+    test_deadline_sheds_jobs_that_cannot_start_in_time()
+    print("✅ All inference executor tests passed")
@@ -0,0 +1,60 @@
+"""
+Test script for the multi-pattern keyword automaton.
+Checks that hit counts match the naive `sum(1 for kw in keywords if kw in text)`.
+"""
+import random
+import sys
+sys.path.insert(0, '.')
+
+import keyword_automaton
+from keyword_automaton import KeywordAutomaton, _PyAutomaton
+
+GROUPS = {
+    "financial:UPI Fraud": ["upi fraud", "upi id", "upi", "imps", "via upi"],
+    "financial:Credit Card Fraud": ["credit card", "cvv", "card limit", "credit limit"],
+    "strong:Credit Card Fraud": ["credit card", "cc", "cvv", "credit limit"],
+    "platform:X": ["twitter", "x account", " x ", "tweet"],
+    "signal:social": ["facebook", "x", "profile", "account", "hack"],
+    "word:@": ["@"],
+    "dupes": ["scam", "scam"],
+}
+
+
+def naive_counts(text):
+    return {g: sum(1 for kw in kws if kw in text) for g, kws in GROUPS.items()}
+
+
+def test_counts_match_naive_substring_checks():
+    automaton = KeywordAutomaton(GROUPS)
+    vocabulary = sorted({kw for kws in GROUPS.values() for kw in kws}) + ["my", "was", "a", "c"]
+    random.seed(0)
+    texts = ["my credit card cvv was stolen via upi", "hacked x account on twitter", ""]
+    texts += [" ".join(random.choice(vocabulary) for _ in range(random.randint(1, 10))) for _ in range(500)]
+    for text in texts:
+        hits = automaton.scan(text)
+        expected = naive_counts(text)
+        got = {g: hits.count(g) for g in GROUPS}
+        assert got == expected, (text, got, expected)
+
+
+def test_pure_python_automaton_finds_overlapping_patterns():
+    patterns = ["he", "she", "his", "hers", "credit", "credit card", "card"]
+    automaton = _PyAutomaton(patterns)
+    found = {patterns[i] for i in automaton.matches("ushers pay by credit card")}
+    assert found == {"he", "she", "hers", "credit", "credit card", "card"}
+
+
+def test_first_respects_group_order():
+    automaton = KeywordAutomaton({"platform:Instagram": ["insta"], "platform:Facebook": ["facebook"]})
+    hits = automaton.scan("facebook and insta")
+    assert hits.first(["platform:Instagram", "platform:Facebook"]) == "platform:Instagram"
+    assert hits.first(["platform:Facebook", "platform:Instagram"]) == "platform:Facebook"
+    assert hits.count("unknown") == 0
+
+
+if __name__ == "__main__":
+    print(f"Using {'pyahocorasick' if keyword_automaton.ahocorasick else 'pure-Python'} automaton")
+    test_counts_match_naive_substring_checks()
+    test_pure_python_automaton_finds_overlapping_patterns()
+    test_first_respects_group_order()
+    print("✅ All keyword automaton tests passed")
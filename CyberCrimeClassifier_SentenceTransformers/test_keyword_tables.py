@@ -0,0 +1,232 @@
+"""
+Test script for keyword table files and hot reloads: validation, diffs, the file
+watcher and FraudClassifier.reload_tables() with a synthetic embedder (no model
+download).
+"""
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+
+import keyword_tables
+from classifier import FraudClassifier, FINANCIAL_SUBCATEGORIES, SOCIAL_SUBCATEGORIES
+from test_helpers import HashEmbedder, make_classifier
+
+
+def write_tables(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+def test_validation():
+    version, tables = keyword_tables.validate({"version": "v1", "stage_words": ["card"]})
+    assert version == "v1" and tables == {"stage_words": ["card"]}
+    known_keys = make_classifier().table_keys()
+    assert keyword_tables.validate({"version": "v1", "financial_keywords": {"Gaming App Fraud": ["ludo"]}},
+                                   known_keys)[1]
+    for bad in [{"stage_words": ["card"]}, {"version": "v1", "nope": []},
+                {"version": "v1", "financial_keywords": {"UPI Fraud": "upi"}}, {"version": "v1", "stage_words": [""]},
+                # a key the subcategory lists do not know would get a prototype but no label
+                {"version": "v1", "financial_keywords": {"Quikr Fraud": ["quikr"]}},
+                {"version": "v1", "issue_keywords": {"Spam": ["spam"]}}]:
+        try:
+            keyword_tables.validate(bad, known_keys)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad}")
+
+
+def test_diff():
+    old = {"financial_keywords": {"A": ["a"], "B": ["b"]}, "stage_words": ["x"]}
+    new = {"financial_keywords": {"A": ["a"], "B": ["b", "bb"], "C": ["c"]}, "stage_words": ["y"]}
+    assert keyword_tables.diff(old, new) == {"financial_keywords": ["B", "C"], "stage_words": ["*"]}
+    assert keyword_tables.diff(old, old) == {}
+
+
+def test_reload_reembeds_only_changed_prototypes():
+    with tempfile.TemporaryDirectory() as tmp:
+        for k in (0, 2):
+            builtin = make_classifier(k=k)
+            data = keyword_tables.export(builtin, "v1")
+            live = make_classifier(write_tables(tmp, "v1.json", data), k=k)
+            assert live.tables_version == "v1" and np.array_equal(live.proto_matrix, builtin.proto_matrix)
+
+            changed = copy.deepcopy(data)
+            changed["version"] = "v2"
+            changed["financial_keywords"]["OLX Fraud"] = ["olx", "quikr listing scam"]
+            path = write_tables(tmp, "v2.json", changed)
+            old = live._snapshot
+            live.embedder.embedded.clear()
+            summary = live.reload_tables(path)
+            assert summary["reembedded"] == ["OLX Fraud"] and summary["previous_version"] == "v1"
+            assert summary["changed_tables"] == {"financial_keywords": ["OLX Fraud"]}
+            assert set(live.embedder.embedded) <= {"olx", "quikr listing scam", "olx . quikr listing scam"}
+
+            # in-flight callers holding the old snapshot still see the old tables
+            assert old.financial_keywords["OLX Fraud"] == data["financial_keywords"]["OLX Fraud"]
+            assert live._snapshot is not old and live.tables_version == "v2"
+            assert live.scan_keywords("quikr listing scam").any("financial:OLX Fraud")
+            assert not old.keyword_automaton.scan("quikr listing scam").any("financial:OLX Fraud")
+
+            fresh = make_classifier(path, k=k)
+            assert live._snapshot.proto_row_keys == fresh.proto_row_keys
+            assert np.allclose(live._snapshot.proto_matrix, fresh.proto_matrix, atol=1e-6)
+            text = "sold my phone on quikr listing scam, buyer never paid"
+            assert live.classify(text) == fresh.classify(text)
+
+
+def single_prototype_matrix(classifier):
+    """The default-mode matrix: primary rows are the mean of the unnormalized subcategory embeddings."""
+    keys = list(classifier.prototype_texts)
+    raw = HashEmbedder().embed(list(classifier.prototype_texts.values()))
+    fin = raw[[i for i, k in enumerate(keys) if k in FINANCIAL_SUBCATEGORIES]].mean(0)
+    soc = raw[[i for i, k in enumerate(keys) if k in SOCIAL_SUBCATEGORIES]].mean(0)
+    matrix = np.vstack([raw, fin, soc])
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_reload_keeps_primary_prototypes_of_a_fresh_build():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = make_classifier(cache_dir=tmp)
+        assert np.allclose(first.proto_matrix, single_prototype_matrix(first), atol=1e-6)
+        # a restart maps the cached matrix; its row norms let the reload rebuild the primary rows
+        live = make_classifier(cache_dir=tmp)
+        assert live.embedder.embedded == []
+        data = keyword_tables.export(live, "v2")
+        data["financial_keywords"]["OLX Fraud"] = ["quikr", "olx"]
+        data["issue_keywords"]["Hack"] = ["account takeover"]
+        assert live.financial_keywords["OLX Fraud"] != ["quikr", "olx"]  # the export is a copy
+        summary = live.reload_tables(write_tables(tmp, "v2.json", data))
+        assert summary["changed_tables"] == {"financial_keywords": ["OLX Fraud"], "issue_keywords": ["Hack"]}
+        assert "OLX Fraud" in summary["reembedded"] and "Instagram - Impersonation" not in summary["reembedded"]
+        assert np.allclose(live._snapshot.proto_matrix, single_prototype_matrix(live._snapshot), atol=1e-6)
+
+
+def test_tables_left_out_of_a_reload_fall_back_to_the_builtin_ones():
+    builtin = make_classifier()
+    live = make_classifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        live.reload_tables(write_tables(tmp, "v1.json", {"version": "v1", "stage_words": ["zzz"],
+                                                        "financial_keywords": {"OLX Fraud": ["quikr"]}}))
+        assert live._snapshot.stage_words == ["zzz"]
+        path = write_tables(tmp, "v2.json", {"version": "v2"})
+        summary = live.reload_tables(path)
+        restarted = make_classifier(path)
+    # a restart with the same file must give the same tables and classifications
+    snapshot = live._snapshot
+    assert snapshot.stage_words == builtin.stage_words == restarted.stage_words
+    assert snapshot.financial_keywords == builtin.financial_keywords
+    assert "OLX Fraud" in summary["reembedded"] and "Investment/Trading/IPO Fraud" in summary["reembedded"]
+    assert np.allclose(snapshot.proto_matrix, restarted.proto_matrix, atol=1e-6)
+    text = "my @ upi id was used, sold on olx but quikr buyer never paid"
+    assert live.classify(text) == restarted.classify(text)
+
+
+def test_request_in_flight_keeps_its_snapshot():
+    live = make_classifier()
+    before = live.score_text("in flight")
+    entered, release = threading.Event(), threading.Event()
+    embed = live.embedder.embed
+
+    def slow_embed(texts):
+        if texts == ["in flight"]:
+            entered.set()
+            release.wait(5)
+        return embed(texts)
+
+    live.embedder.embed = slow_embed
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(scores=live.score_text("in flight")))
+    worker.start()
+    entered.wait(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        data = keyword_tables.export(live, "v2")
+        data["financial_keywords"]["OLX Fraud"] = ["in flight"]
+        live.reload_tables(write_tables(tmp, "v2.json", data))
+    release.set()
+    worker.join(5)
+    # score_text -> score_texts -> score_embedding all ran on the snapshot pinned at entry
+    assert np.allclose(result["scores"].sims, before.sims)
+    assert live.score_text("in flight").cosine("OLX Fraud") > before.cosine("OLX Fraud")
+
+
+def test_holder_attributes_follow_the_reload():
+    live = make_classifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        data = keyword_tables.export(live, "v2")
+        data["financial_keywords"]["OLX Fraud"] = ["quikr"]
+        live.reload_tables(write_tables(tmp, "v2.json", data))
+    snapshot = live._snapshot
+    # the object callers hold keeps no tables of its own
+    assert set(vars(live)) == {"_snapshot", "_calls", "_reload_lock"}
+    assert live.financial_keywords is snapshot.financial_keywords and live.proto_matrix is snapshot.proto_matrix
+    assert live.keyword_automaton.scan("quikr").any("financial:OLX Fraud")
+    assert keyword_tables.export(live, "v2") == data
+    live.long_doc_pooling = "max"  # writes go to the current snapshot too
+    assert snapshot.long_doc_pooling == "max" and "long_doc_pooling" not in vars(live)
+
+
+def test_reload_rejects_unknown_subcategories():
+    live = make_classifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        data = keyword_tables.export(live, "v2")
+        data["financial_keywords"]["Quikr Fraud"] = ["quikr"]
+        try:
+            live.reload_tables(write_tables(tmp, "v2.json", data))
+        except ValueError as e:
+            assert "Quikr Fraud" in str(e)
+        else:
+            raise AssertionError("a subcategory missing from FINANCIAL_SUBCATEGORIES was accepted")
+    assert live.tables_version == "builtin" and "Quikr Fraud" not in live.proto_index
+
+
+def test_reload_needs_a_ready_model():
+    classifier = FraudClassifier(load_model=False, prototype_cache_dir=None, tables_file="")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_tables(tmp, "t.json", {"version": "v1"})
+        try:
+            classifier.reload_tables(path)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("reloaded before the model was loaded")
+
+
+def test_watcher_retries_until_reload_succeeds():
+    calls = []
+
+    def on_change(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise RuntimeError("still loading")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_tables(tmp, "t.json", {"version": "v1"})
+        watcher = keyword_tables.TableWatcher(path, on_change, interval=60)
+        assert not watcher.poll()  # unchanged since the watcher started
+        time.sleep(0.01)
+        write_tables(tmp, "t.json", {"version": "v2-longer"})
+        assert not watcher.poll() and watcher.poll()  # first attempt fails, second succeeds
+        assert not watcher.poll() and len(calls) == 2
+
+
+if __name__ == "__main__":
+    test_validation()
+    test_diff()
+    test_reload_reembeds_only_changed_prototypes()
+    test_reload_keeps_primary_prototypes_of_a_fresh_build()
+    test_tables_left_out_of_a_reload_fall_back_to_the_builtin_ones()
+    test_request_in_flight_keeps_its_snapshot()
+    test_holder_attributes_follow_the_reload()
+    test_reload_rejects_unknown_subcategories()
+    test_reload_needs_a_ready_model()
+    test_watcher_retries_until_reload_succeeds()
+    print("✅ All keyword table tests passed")
@@ -0,0 +1,71 @@
+"""
+Test script for the Prometheus metrics exposition used by GET /metrics.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import metrics
+from metrics import Counter, Histogram
+
+
+def test_counter_renders_labelled_series():
+    counter = Counter("test_decisions_total", "Decisions per stage", ["stage"])
+    counter.inc("0_strong_financial")
+    counter.inc("0_strong_financial")
+    counter.inc("3_social", amount=3)
+    lines = counter.render()
+    assert lines[:2] == ["# HELP test_decisions_total Decisions per stage", "# TYPE test_decisions_total counter"]
+    assert 'test_decisions_total{stage="0_strong_financial"} 2' in lines
+    assert 'test_decisions_total{stage="3_social"} 3' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("test_seconds", "Phase latency", ["phase"], buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 2.0):
+        hist.observe(value, "forward")
+    lines = hist.render()
+    print("\n".join(lines))
+    assert 'test_seconds_bucket{phase="forward",le="0.01"} 2' in lines  # upper bounds are inclusive
+    assert 'test_seconds_bucket{phase="forward",le="0.1"} 3' in lines
+    assert 'test_seconds_bucket{phase="forward",le="1"} 3' in lines
+    assert 'test_seconds_bucket{phase="forward",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{phase="forward"} 4' in lines
+    assert hist.count("forward") == 4
+
+
+def test_timer_records_one_observation():
+    hist = Histogram("test_timer_seconds", "Timed block")
+    with hist.time():
+        sum(range(1000))
+    assert hist.count() == 1
+
+
+def test_capture_keeps_raw_observations_inside_the_block():
+    hist = Histogram("test_capture_seconds", "Captured", ["phase"])
+    hist.observe(1.0, "forward")
+    with hist.capture() as samples:
+        hist.observe(0.25, "forward")
+        hist.observe(0.5, "scoring")
+        hist.observe(0.75, "forward")
+    hist.observe(2.0, "forward")
+    assert samples == {("forward",): [0.25, 0.75], ("scoring",): [0.5]}
+    assert hist.count("forward") == 4
+
+
+def test_registry_render_covers_every_stage_name():
+    for stage in metrics.STAGE_NAMES:
+        metrics.STAGE_DECISIONS.inc(stage)
+    text = metrics.render()
+    assert text.endswith("\n")
+    for stage in metrics.STAGE_NAMES:
+        assert f'classifier_stage_decisions_total{{stage="{stage}"}}' in text
+    assert "# TYPE classifier_phase_seconds histogram" in text
+
+
+if __name__ == "__main__":
+    test_counter_renders_labelled_series()
+    test_histogram_buckets_are_cumulative()
+    test_timer_records_one_observation()
+    test_capture_keeps_raw_observations_inside_the_block()
+    test_registry_render_covers_every_stage_name()
+    print("✅ All metrics tests passed")
@@ -0,0 +1,67 @@
+"""
+Test script for background model loading and keyword-only (degraded) classification.
+Runs without downloading DistilBERT: the classifier is built with load_model=False.
+"""
+import sys
+import threading
+sys.path.insert(0, '.')
+
+from model_loader import ModelLoader
+from classifier import FraudClassifier
+
+
+def test_loader_reports_progress_until_ready():
+    started, release = threading.Event(), threading.Event()
+
+    def load_classifier():
+        started.set()
+        release.wait()
+
+    loader = ModelLoader([("classifier", load_classifier), ("spacy", lambda: None)])
+    assert loader.status()["status"] == "pending"
+    loader.start()
+    assert started.wait(timeout=5)
+    status = loader.status()
+    assert status["status"] == "loading" and not loader.ready
+    assert status["steps"][0]["state"] == "loading" and status["steps"][1]["state"] == "pending"
+    release.set()
+    assert loader.wait(timeout=5)
+    status = loader.status()
+    print(f"Status: {status}")
+    assert status["status"] == "ready" and status["progress"] == "2/2"
+
+
+def test_failed_step_is_reported():
+    def broken():
+        raise RuntimeError("model download failed")
+
+    loader = ModelLoader([("classifier", broken), ("spacy", lambda: None)])
+    loader.start()
+    assert not loader.wait(timeout=0.5)
+    status = loader.status()
+    assert status["status"] == "failed" and loader.failed
+    assert status["steps"][0]["error"] == "model download failed"
+    assert status["steps"][1]["state"] == "pending"
+
+
+def test_keyword_only_classification_before_model_load():
+    classifier = FraudClassifier(load_model=False)
+    assert not classifier.model_ready and classifier.embedder is None
+    cases = [
+        ("I lost ₹5000 via UPI to fraud@okaxis", "Financial Fraud", "UPI Fraud"),
+        ("Someone hacked my Instagram account and changed the password", "Social Media Fraud", "Instagram - Hack"),
+    ]
+    for text, primary, sub in cases:
+        result = classifier.classify_keywords(text)
+        print(f"{text} -> {result}")
+        assert result[:2] == (primary, sub)
+        assert result[2] >= 0.5
+    # complaints only the embedding fallback could place come back with zero confidence
+    assert classifier.classify_keywords("hello there")[2:] == (0.0, 0.0)
+
+
+if __name__ == "__main__":
+    test_loader_reports_progress_until_ready()
+    test_failed_step_is_reported()
+    test_keyword_only_classification_before_model_load()
+    print("✅ All model loader tests passed")
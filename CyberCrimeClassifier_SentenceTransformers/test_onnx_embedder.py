@@ -0,0 +1,91 @@
+"""
+Test script for the ONNX Runtime backend: export, int8 quantization and the
+manifest that ties each graph to the model and library versions it was built
+from. Uses small randomly initialised DistilBERT encoders saved to a temporary
+directory, so nothing is downloaded.
+"""
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+import numpy as np
+import torch
+from transformers import DistilBertConfig, DistilBertModel, DistilBertTokenizerFast
+
+from classifier import SimpleDistilEmbedder
+from onnx_embedder import MANIFEST_FILE, OnnxDistilEmbedder, export_onnx, onnx_path, read_manifest
+
+WORDS = ["upi", "fraud", "otp", "bank", "account", "hacked", "instagram", "loan", "app", "lottery", "scam", "money"]
+TEXTS = ["upi fraud", "my instagram account hacked", "loan app scam took money from my bank account", "otp"]
+
+
+def save_model(directory, seed):
+    torch.manual_seed(seed)
+    vocab = os.path.join(directory, "vocab.txt")
+    os.makedirs(directory, exist_ok=True)
+    with open(vocab, "w", encoding="utf-8") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    DistilBertTokenizerFast(vocab_file=vocab).save_pretrained(directory)
+    config = DistilBertConfig(vocab_size=len(WORDS) + 5, dim=32, hidden_dim=64, n_layers=2, n_heads=2,
+                              max_position_embeddings=64)
+    DistilBertModel(config).save_pretrained(directory)
+    return directory
+
+
+def cosines(a, b):
+    return (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_embed_matches_the_torch_embedder():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = save_model(os.path.join(tmp, "model"), seed=0)
+        reference = SimpleDistilEmbedder(device="cpu", model_name=model_dir).embed(TEXTS)
+        fp32 = OnnxDistilEmbedder(model_dir, os.path.join(tmp, "onnx")).embed(TEXTS)
+        assert fp32.shape == reference.shape
+        assert np.allclose(fp32, reference, atol=1e-4)
+        int8 = OnnxDistilEmbedder(model_dir, os.path.join(tmp, "onnx"), int8=True).embed(TEXTS)
+        assert int8.shape == reference.shape and cosines(int8, reference).min() > 0.95
+
+
+def test_manifest_reuses_only_matching_graphs():
+    with tempfile.TemporaryDirectory() as tmp:
+        onnx_dir = os.path.join(tmp, "onnx")
+        first = save_model(os.path.join(tmp, "first"), seed=0)
+        export_onnx(first, onnx_dir, int8=True)
+        manifest = read_manifest(onnx_dir)
+        assert manifest["fp32"]["model_name"] == first and manifest["fp32"]["torch"] == torch.__version__
+        assert manifest["int8"]["source_sha256"] == manifest["fp32"]["sha256"]
+
+        fp32, int8 = onnx_path(onnx_dir, int8=False), onnx_path(onnx_dir, int8=True)
+        os.utime(fp32, (0, 0))
+        os.utime(int8, (0, 0))
+        export_onnx(first, onnx_dir, int8=True)
+        assert os.path.getmtime(fp32) == 0 and os.path.getmtime(int8) == 0  # up to date: reused as-is
+
+        # a graph exported by another torch release is exported again
+        manifest["fp32"]["torch"] = "0.0"
+        with open(os.path.join(onnx_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        export_onnx(first, onnx_dir)
+        assert os.path.getmtime(fp32) > 0 and read_manifest(onnx_dir)["fp32"]["torch"] == torch.__version__
+
+        # a new fp32 graph makes the int8 graph quantized from the old one stale
+        second = save_model(os.path.join(tmp, "second"), seed=1)
+        export_onnx(second, onnx_dir)
+        manifest = read_manifest(onnx_dir)
+        assert manifest["fp32"]["model_name"] == second
+        assert manifest["int8"]["source_sha256"] != manifest["fp32"]["sha256"]
+        export_onnx(second, onnx_dir, int8=True)
+        manifest = read_manifest(onnx_dir)
+        assert os.path.getmtime(int8) > 0 and manifest["int8"]["source_sha256"] == manifest["fp32"]["sha256"]
+        reference = SimpleDistilEmbedder(device="cpu", model_name=second).embed(TEXTS)
+        served = OnnxDistilEmbedder(second, onnx_dir, int8=True).embed(TEXTS)
+        assert cosines(served, reference).min() > 0.95
+
+
+if __name__ == "__main__":
+    test_embed_matches_the_torch_embedder()
+    test_manifest_reuses_only_matching_graphs()
+    print("✅ All ONNX embedder tests passed")
@@ -0,0 +1,70 @@
+"""
+Test script for the multi-centroid prototype bank: clustering, grouped max-pooling
+and scoring through FraudClassifier with a synthetic embedder (no model download).
+"""
+import sys
+sys.path.insert(0, '.')
+
+import numpy as np
+
+import prototype_bank
+from classifier import PRIMARY_CATEGORIES
+from test_helpers import HashEmbedder, make_classifier
+
+
+def test_kmeans_separates_directions():
+    rng = np.random.default_rng(0)
+    a, b = np.eye(8)[0], np.eye(8)[1]
+    vectors = np.vstack([a + 0.05 * rng.normal(size=(5, 8)), b + 0.05 * rng.normal(size=(4, 8))])
+    centroids, labels = prototype_bank.spherical_kmeans(vectors, 2)
+    assert centroids.shape == (2, 8) and np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-6)
+    assert len(set(labels[:5])) == 1 and len(set(labels[5:])) == 1 and labels[0] != labels[5]
+    assert prototype_bank.spherical_kmeans(vectors[:1], 4)[0].shape == (1, 8)  # k capped at the phrase count
+
+
+def test_group_offsets_and_max_pool():
+    assert prototype_bank.group_offsets(["a", "b", "c"]) is None
+    offsets = prototype_bank.group_offsets(["a", "a", "b", "c", "c", "c"])
+    assert offsets.tolist() == [0, 2, 3]
+    sims = np.array([[0.1, 0.5, 0.2, 0.0, 0.9, 0.3]])
+    assert prototype_bank.max_pool(sims, offsets).tolist() == [[0.5, 0.2, 0.9]]
+    try:
+        prototype_bank.group_offsets(["a", "b", "a"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("non-contiguous prototype rows were accepted")
+
+
+def test_build_embeds_each_phrase_once():
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts])
+
+    matrix, row_keys = prototype_bank.build({"x": ["ab", "abcd", "a"], "y": ["ab"]}, embed, k=2)
+    assert calls == [["ab", "abcd", "a"]]
+    assert row_keys == ["x", "x", "y"] and matrix.shape == (3, 2)
+
+
+def test_bank_scores_every_keyword_phrase():
+    single, bank = make_classifier(k=0), make_classifier(k=3)
+    assert single.proto_offsets is None and single.proto_keys == single.proto_row_keys
+    assert bank.proto_keys == single.proto_keys and bank.proto_keys[-2:] == PRIMARY_CATEGORIES
+    assert len(bank.proto_row_keys) > len(bank.proto_keys)
+    assert max(bank.proto_row_keys.count(k) for k in bank.proto_keys) == 3
+    assert bank.proto_matrix.flags["C_CONTIGUOUS"] and bank.proto_matrix.dtype == np.float32
+    # "forex" is the 9th Investment keyword: outside the joined prototype, inside the bank
+    emb = HashEmbedder().embed(["forex"])[0]
+    assert bank.score_embedding(emb).cosine("Investment/Trading/IPO Fraud") > \
+        single.score_embedding(emb).cosine("Investment/Trading/IPO Fraud")
+    assert len(bank.score_embedding(emb).sims) == len(bank.proto_keys)
+
+
+if __name__ == "__main__":
+    test_kmeans_separates_directions()
+    test_group_offsets_and_max_pool()
+    test_build_embeds_each_phrase_once()
+    test_bank_scores_every_keyword_phrase()
+    print("✅ All prototype bank tests passed")
@@ -0,0 +1,64 @@
+"""
+Test script for the on-disk prototype embedding cache.
+Runs without DistilBERT - only numpy is needed.
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+import numpy as np
+
+import prototype_cache
+
+
+def test_roundtrip_is_memory_mapped():
+    identity = {"model_name": "distilbert-base-uncased", "tokenizer_version": "t1", "prototypes": {"A": "a . b"}}
+    key = prototype_cache.compute_key(identity)
+    matrix = np.random.rand(3, 8).astype(np.float32)
+    with tempfile.TemporaryDirectory() as d:
+        norms = np.array([1.5, 2.0, 0.25], dtype=np.float32)
+        prototype_cache.save(d, key, matrix, ["A", "Financial Fraud", "Social Media Fraud"], identity, norms)
+        loaded = prototype_cache.load(d, key)
+        assert loaded is not None
+        cached, keys, row_norms = loaded
+        assert isinstance(cached, np.memmap)
+        assert np.array_equal(row_norms, norms)
+        assert keys == ["A", "Financial Fraud", "Social Media Fraud"]
+        assert np.array_equal(np.asarray(cached), matrix)
+
+
+def test_changed_keywords_miss_and_keep_other_entries():
+    identity = {"model_name": "m", "financial_keywords": {"UPI Fraud": ["upi"]}}
+    changed = {"model_name": "m", "financial_keywords": {"UPI Fraud": ["upi", "bhim"]}}
+    old_key, new_key = prototype_cache.compute_key(identity), prototype_cache.compute_key(changed)
+    assert old_key != new_key
+    matrix = np.ones((2, 4), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as d:
+        prototype_cache.save(d, old_key, matrix, ["a", "b"], identity)
+        assert prototype_cache.load(d, new_key) is None
+        prototype_cache.save(d, new_key, matrix, ["a", "b"], changed)
+        assert prototype_cache.load(d, new_key) is not None
+        # another process may still be serving the old tables from the same directory
+        assert prototype_cache.load(d, old_key) is not None
+
+
+def test_keeps_the_most_recently_used_entries():
+    matrix = np.ones((2, 4), dtype=np.float32)
+    keys = [prototype_cache.compute_key({"model_name": f"m{i}"}) for i in range(4)]
+    with tempfile.TemporaryDirectory() as d:
+        for i, key in enumerate(keys[:3]):
+            prototype_cache.save(d, key, matrix, ["a", "b"], {"model_name": f"m{i}"}, keep=3)
+            os.utime(os.path.join(d, f"prototypes_{key[:16]}.json"), (i, i))  # saved in order m0, m1, m2
+        assert prototype_cache.load(d, keys[0]) is not None  # a hit makes m0 the most recent
+        prototype_cache.save(d, keys[3], matrix, ["a", "b"], {"model_name": "m3"}, keep=3)
+        assert prototype_cache.load(d, keys[1]) is None
+        assert not os.path.exists(os.path.join(d, f"prototypes_{keys[1][:16]}.npy"))
+        assert all(prototype_cache.load(d, key) is not None for key in (keys[0], keys[2], keys[3]))
+
+
+if __name__ == "__main__":
+    test_roundtrip_is_memory_mapped()
+    test_changed_keywords_miss_and_keep_other_entries()
+    test_keeps_the_most_recently_used_entries()
+    print("✅ All prototype cache tests passed")
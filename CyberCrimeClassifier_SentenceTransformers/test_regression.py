@@ -0,0 +1,63 @@
+"""
+Test script for the accuracy + latency regression harness.
+Uses the keyword-only engine, which needs no model download.
+"""
+import copy
+import sys
+sys.path.insert(0, '.')
+
+from corpus import load_examples
+from regression import check, evaluate, format_report, newly_failing, regressions, run
+
+
+def test_labels_are_checked_like_the_test_scripts():
+    example = {"expected_primary": "Financial Fraud", "expected_sub_contains": "upi"}
+    assert check(example, "Financial Fraud", "UPI Related Frauds", "HIGH") == {"primary": True, "subcategory": True}
+    example = {"expected_sub": "Instagram - Hack", "expected_priority": "LOW"}
+    assert check(example, "Social Media Fraud", "Instagram - Fake Account", "LOW") == \
+        {"subcategory": False, "priority": True}
+
+
+def test_keyword_only_engine_report():
+    report = run(["keyword-only"], repeat=1)
+    result = report["engines"]["keyword-only"]
+    print("\n".join(format_report(report)))
+    examples = load_examples()
+    assert report["examples"] == len(examples) == len(result["examples"])
+    assert result["accuracy"]["primary"]["total"] == sum(1 for e in examples if "expected_primary" in e)
+    assert result["accuracy"]["priority"]["total"] == sum(1 for e in examples if "expected_priority" in e)
+    assert set(result["per_priority"]) <= {"HIGH", "MEDIUM", "LOW"}
+    assert sum(g["total"] for g in result["per_subcategory"].values()) == result["accuracy"]["subcategory"]["total"]
+    assert result["latency"]["count"] == len(examples)
+    assert regressions(report, copy.deepcopy(report)) == []
+
+
+def test_thresholds_against_baseline():
+    examples = [{"text": "a", "source": "x", "expected_primary": "Financial Fraud", "expected_sub": "UPI"},
+                {"text": "b", "source": "x", "expected_primary": "Social Media Fraud", "expected_sub": "Instagram - Hack"}]
+    right = {"a": ("Financial Fraud", "UPI", 1, 1), "b": ("Social Media Fraud", "Instagram - Hack", 1, 1)}
+    wrong = {**right, "b": ("Financial Fraud", "Others", 1, 1)}
+    good = evaluate(right.get, examples, repeat=1)
+    bad = evaluate(wrong.get, examples, repeat=1)
+    assert good["accuracy"]["subcategory"]["accuracy"] == 1.0 and bad["accuracy"]["subcategory"]["accuracy"] == 0.5
+    baseline, report = {"engines": {"torch": good}}, {"engines": {"torch": bad}}
+    problems = regressions(report, baseline)
+    assert any("subcategory accuracy fell from 1.000 to 0.500" in p for p in problems)
+    assert any("primary accuracy" in p for p in problems)
+    assert regressions(report, baseline, max_accuracy_drop=0.5) == []
+    assert [r["text"] for r in newly_failing(bad, good)] == ["b"]
+
+    slow = copy.deepcopy(good)
+    slow["latency"]["p95_ms"] = good["latency"]["p95_ms"] * 3
+    assert regressions({"engines": {"torch": slow}}, baseline) == []  # within the timer-noise slack
+    assert any("p95 latency grew" in p for p in regressions({"engines": {"torch": slow}}, baseline, p95_slack_ms=0))
+    assert regressions({"engines": {"torch": slow}}, baseline, max_p95_increase=2.5, p95_slack_ms=0) == []
+    assert any("below 0.900" in p for p in regressions(report, None, min_accuracy=0.9))
+    assert regressions({"engines": {"onnx": {"error": "engine unavailable"}}}) == ["onnx: engine unavailable"]
+
+
+if __name__ == "__main__":
+    test_labels_are_checked_like_the_test_scripts()
+    test_keyword_only_engine_report()
+    test_thresholds_against_baseline()
+    print("✅ All regression harness tests passed")
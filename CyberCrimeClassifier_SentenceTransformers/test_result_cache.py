@@ -0,0 +1,62 @@
+"""
+Test script for the /classify result cache (LRU + TTL).
+"""
+import sys
+import time
+sys.path.insert(0, '.')
+
+from result_cache import ResultCache, cache_key, normalize_text
+
+
+def test_normalization_ignores_whitespace_differences():
+    assert normalize_text("  I lost\n₹5000   via UPI ") == "I lost ₹5000 via UPI"
+    assert cache_key("Fake  Instagram profile") == cache_key(" Fake Instagram\tprofile\n")
+    assert cache_key("Fake Instagram profile") != cache_key("Fake Facebook profile")
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.put("c", 3)  # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["evictions"] == 1
+    assert cache.clear() == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache(max_size=10, ttl_seconds=0.05)
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_other_version_is_a_miss():
+    cache = ResultCache(max_size=10, ttl_seconds=60)
+    cache.put("k", "old answer", version="v1")
+    assert cache.get("k", version="v1") == "old answer"
+    assert cache.get("k", version="v2") is None  # computed with the old tables
+    assert cache.get("k", version="v1") is None  # and dropped
+    assert cache.stats()["stale"] == 1
+
+
+def test_zero_size_disables_cache():
+    cache = ResultCache(max_size=0)
+    cache.put("k", "v")
+    assert cache.get("k") is None
+
+
+if __name__ == "__main__":
+    test_normalization_ignores_whitespace_differences()
+    test_lru_eviction_and_counters()
+    test_entries_expire_after_ttl()
+    test_other_version_is_a_miss()
+    test_zero_size_disables_cache()
+    print("✅ All result cache tests passed")
@@ -0,0 +1,80 @@
+"""
+Test script for prototype scoring: the single GEMV behind
+FraudClassifier.score_embedding must give the same cosines, and classify() the
+same answers, as scoring each prototype separately with cosine_sim. Uses the
+synthetic HashEmbedder (no model download).
+"""
+import sys
+sys.path.insert(0, '.')
+
+import numpy as np
+
+from classifier import FINANCIAL_SUBCATEGORIES, SOCIAL_SUBCATEGORIES, PrototypeScores, cosine_sim
+from corpus import load_texts
+from test_helpers import HashEmbedder, make_classifier
+
+
+class SilentEmbedder(HashEmbedder):
+    """HashEmbedder that embeds the texts in `silent` as zero vectors."""
+
+    def __init__(self, silent):
+        super().__init__()
+        self.silent = set(silent)
+
+    def embed(self, texts):
+        out = super().embed(texts)
+        out[[i for i, text in enumerate(texts) if text in self.silent]] = 0.0
+        return out
+
+
+def make_silent_classifier():
+    classifier = make_classifier()
+    classifier.embedder = SilentEmbedder([classifier.prototype_texts["Others"]])
+    classifier._embed_prototypes()
+    return classifier
+
+
+def prototype_embs(classifier):
+    """Per-prototype embeddings as the classifier kept them before the matrix: primaries are subcategory means."""
+    texts = classifier.prototype_texts
+    embs = dict(zip(texts, classifier.embedder.embed(list(texts.values()))))
+    embs["Financial Fraud"] = np.mean([embs[k] for k in texts if k in FINANCIAL_SUBCATEGORIES], 0)
+    embs["Social Media Fraud"] = np.mean([embs[k] for k in texts if k in SOCIAL_SUBCATEGORIES], 0)
+    return embs
+
+
+def loop_scores(classifier, embs, emb):
+    """PrototypeScores from one cosine_sim call per prototype (the path the GEMV replaced)."""
+    sims = np.array([cosine_sim(emb, embs[k]) for k in classifier.proto_keys], dtype=np.float32)
+    return PrototypeScores(sims, classifier.proto_index)
+
+
+def test_gemv_matches_per_prototype_cosines():
+    classifier = make_silent_classifier()
+    embs = prototype_embs(classifier)
+    assert not embs["Others"].any()  # a zero prototype row
+    texts = ["upi fraud of rs 5000 via phonepe", "someone hacked my instagram account", "others"]
+    for emb in list(HashEmbedder().embed(texts)) + [np.zeros(HashEmbedder.dim, dtype=np.float32)]:
+        scores = classifier.score_embedding(emb)
+        for key in classifier.proto_keys:
+            assert abs(scores.cosine(key) - cosine_sim(emb, embs[key])) < 1e-5, key
+            assert abs(scores.confidence(key) - (cosine_sim(emb, embs[key]) + 1) / 2) < 1e-5, key
+    zero = classifier.score_embedding(np.zeros(HashEmbedder.dim, dtype=np.float32))
+    assert not zero.sims.any() and zero.cosine("Others") == 0.0
+
+
+def test_classify_matches_per_prototype_scoring_on_the_corpus():
+    classifier = make_silent_classifier()
+    embs = prototype_embs(classifier)
+    for text in load_texts():
+        emb = classifier.embedder.embed([text])[0]
+        fast = classifier.classify(text)
+        slow = classifier.classify(text, scores=loop_scores(classifier, embs, emb))
+        assert fast[:2] == slow[:2], text
+        assert np.allclose(fast[2:], slow[2:], atol=1e-5), text
+
+
+if __name__ == "__main__":
+    test_gemv_matches_per_prototype_cosines()
+    test_classify_matches_per_prototype_scoring_on_the_corpus()
+    print("✅ All scoring tests passed")
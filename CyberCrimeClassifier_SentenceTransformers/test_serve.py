@@ -0,0 +1,90 @@
+"""
+Test script for the pre-fork server: worker/thread planning, and a worker forked
+from the master's loaded state classifying with it. The model is the synthetic
+HashEmbedder (no model download).
+"""
+import json
+import os
+import sys
+sys.path.insert(0, '.')
+
+import classifier as classifier_module
+from serve import available_cores, init_worker, load_shared_state, plan_threads
+from test_helpers import HashEmbedder
+
+
+class ForkAwareEmbedder(HashEmbedder):
+    """HashEmbedder that records the pid of the process its after_fork hook ran in."""
+
+    def __init__(self):
+        super().__init__()
+        self.forked_in = None
+
+    def after_fork(self):
+        self.forked_in = os.getpid()
+
+
+def test_threads_split_cores_evenly():
+    assert plan_threads(cores=16, workers=4, threads=0) == 4
+    assert plan_threads(cores=6, workers=4, threads=0) == 1
+    assert plan_threads(cores=2, workers=8, threads=0) == 1  # never below one thread
+    assert plan_threads(cores=16, workers=4, threads=2) == 2  # explicit value wins
+
+
+def test_available_cores_is_not_empty():
+    cores = available_cores()
+    print(f"Cores: {cores}")
+    assert cores and all(isinstance(c, int) for c in cores)
+
+
+def test_forked_worker_classifies_with_the_master_state():
+    if not hasattr(os, "fork"):
+        print("fork() not available; skipping")
+        return
+    import main
+
+    create_embedder, cache_dir = classifier_module.create_embedder, main.classifier.prototype_cache_dir
+    classifier_module.create_embedder = lambda backend="torch", device=None: ForkAwareEmbedder()
+    main.classifier.prototype_cache_dir = None
+    main.classifier.model_ready = False
+    try:
+        service = load_shared_state()
+    finally:
+        classifier_module.create_embedder = create_embedder
+        main.classifier.prototype_cache_dir = cache_dir
+    embedder = service.classifier.embedder
+    assert isinstance(embedder, ForkAwareEmbedder) and service.classifier.model_ready
+    text = "someone hacked my instagram account and is asking my friends for money"
+    embedder.embedded.clear()
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_end)
+            init_worker(service, threads=1)
+            result = {"pid": os.getpid(), "forked_in": embedder.forked_in,
+                      "embedded": embedder.embedded, "classified": service.classifier.classify(text)}
+            with os.fdopen(write_end, "w") as f:
+                json.dump(result, f)
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        child = json.load(f)
+    assert os.waitpid(pid, 0)[1] == 0
+    assert child["forked_in"] == child["pid"] != os.getpid()  # after_fork ran in the worker
+    assert child["embedded"] == [text]  # the worker embedded with the master's model
+    assert embedder.forked_in is None and embedder.embedded == []  # the master is untouched
+    expected = service.classifier.classify(text)
+    assert child["classified"][:2] == list(expected[:2])
+    assert abs(child["classified"][2] - expected[2]) < 1e-6 and abs(child["classified"][3] - expected[3]) < 1e-6
+
+
+if __name__ == "__main__":
+    test_threads_split_cores_evenly()
+    test_available_cores_is_not_empty()
+    test_forked_worker_classifies_with_the_master_state()
+    print("✅ All serve tests passed")
@@ -0,0 +1,65 @@
+"""
+Test script for single-flight coalescing of identical concurrent requests.
+"""
+import sys
+import threading
+import time
+sys.path.insert(0, '.')
+
+from single_flight import SingleFlight
+
+
+def call(flight, key, fn):
+    """What main._start_inference does, with fn run on the calling thread."""
+    fut, leader = flight.begin(key)
+    if leader:
+        try:
+            flight.finish(key, fut, result=fn())
+        except Exception as e:
+            flight.finish(key, fut, error=e)
+    return fut.result(timeout=5)
+
+
+def test_identical_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        time.sleep(0.2)
+        return "classified"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(call(flight, "same-text", slow))) for _ in range(5)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    stats = flight.stats()
+    print(f"Stats: {stats}")
+    assert results == ["classified"] * 5
+    assert len(runs) == 1
+    assert stats["calls"] == 5 and stats["deduplicated"] == 4 and stats["in_flight"] == 0
+
+
+def test_errors_reach_followers_and_key_is_released():
+    flight = SingleFlight()
+    fut, leader = flight.begin("k")
+    follower, follower_leads = flight.begin("k")
+    assert leader and not follower_leads and follower is fut
+    flight.finish("k", fut, error=ValueError("boom"))
+    try:
+        follower.result(timeout=1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    # the next call starts a fresh computation
+    assert call(flight, "k", lambda: 42) == 42
+
+
+if __name__ == "__main__":
+    test_identical_concurrent_calls_share_one_computation()
+    test_errors_reach_followers_and_key_is_released()
+    print("✅ All single-flight tests passed")
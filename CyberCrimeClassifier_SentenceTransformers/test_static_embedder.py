@@ -0,0 +1,73 @@
+"""
+Test script for the static-embedding engine: PCA reduction and pooled table lookups.
+The table here is synthetic; `python static_embedder.py check` compares a distilled
+table with DistilBERT.
+"""
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+import numpy as np
+
+import static_embedder
+from static_embedder import StaticEmbedder, load_static_embedder, pca, zipf_weights
+
+
+def make_embedder(vectors):
+    embedder = StaticEmbedder.__new__(StaticEmbedder)  # skip loading a distilled table from disk
+    embedder.vectors, embedder.dim = vectors, vectors.shape[1]
+    return embedder
+
+
+def test_pca_keeps_the_dominant_directions():
+    rng = np.random.default_rng(0)
+    basis = rng.normal(size=(3, 32))
+    vectors = rng.normal(size=(500, 3)) @ basis + 0.01 * rng.normal(size=(500, 32))
+    reduced, explained = pca(vectors, 3)
+    assert reduced.shape == (500, 3) and explained > 0.99
+    full, explained_full = pca(vectors, 64)
+    assert full.shape == (500, 32) and abs(explained_full - 1.0) < 1e-9
+    centered = vectors - vectors.mean(0)
+    assert np.allclose(np.linalg.norm(full, axis=1), np.linalg.norm(centered, axis=1))
+
+
+def test_zipf_weights_grow_with_rank():
+    weights = zipf_weights(5)
+    assert weights[0] == 0 and all(np.diff(weights) > 0)
+
+
+def test_embed_ids_is_the_mean_of_token_rows():
+    vectors = np.arange(20, dtype=np.float32).reshape(10, 2)
+    embedder = make_embedder(vectors)
+    ids = [[1, 2, 3], [], [9], [4, 4]]
+    out = embedder.embed_ids(ids)
+    assert out.dtype == np.float32 and out.shape == (4, 2)
+    for row, seq in zip(out, ids):
+        expected = vectors[seq].mean(0) if seq else np.zeros(2)
+        assert np.allclose(row, expected)
+    assert embedder.embed_ids([]).shape == (0, 2)
+
+
+def test_missing_table_fails_fast():
+    distilled = []
+    distill = static_embedder.distill
+    static_embedder.distill = distilled.append
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                load_static_embedder(tmp)
+            except FileNotFoundError as e:
+                assert "python static_embedder.py distill" in str(e)
+            else:
+                raise AssertionError("a missing static table was not reported")
+    finally:
+        static_embedder.distill = distill
+    assert distilled == []  # serving never distills implicitly
+
+
+if __name__ == "__main__":
+    test_pca_keeps_the_dominant_directions()
+    test_zipf_weights_grow_with_rank()
+    test_embed_ids_is_the_mean_of_token_rows()
+    test_missing_table_fails_fast()
+    print("✅ All static embedder tests passed")
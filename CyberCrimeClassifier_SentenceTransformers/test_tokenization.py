@@ -0,0 +1,107 @@
+"""
+Test script for length-tier bucketing of embedder batches and long-document windows.
+Uses a whitespace tokenizer so it runs without downloading DistilBERT.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import metrics
+from tokenization import bucket_groups, effective_max_length, pad_bucketed, parse_buckets, tokenize, window_ids
+
+
+class WhitespaceTokenizer:
+    pad_token_id = 0
+    model_max_length = 512
+
+    # every word becomes one token id (its length + 100); [CLS]=1 and [SEP]=2 wrap each sequence
+    def __call__(self, texts, truncation=False, max_length=None, add_special_tokens=True):
+        ids = [[100 + len(word) for word in text.split()] for text in texts]
+        if add_special_tokens:
+            ids = [self.build_inputs_with_special_tokens(x) for x in ids]
+        if truncation and max_length:
+            ids = [x[:max_length] for x in ids]
+        return {"input_ids": ids}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [1] + list(ids) + [2]
+
+
+def test_parse_buckets_and_max_length():
+    assert parse_buckets("128, 32,64,") == [32, 64, 128]
+    assert parse_buckets("") == []
+    tokenizer = WhitespaceTokenizer()
+    assert effective_max_length(tokenizer, 1024) == 512
+    assert effective_max_length(tokenizer, 256) == 256
+    assert effective_max_length(tokenizer, 0) == 512  # 0: the model's own limit
+    tokenizer.model_max_length = int(1e30)  # "unknown" sentinel
+    assert effective_max_length(tokenizer, 1024) == 1024
+    assert effective_max_length(tokenizer, 0) == 512
+
+
+def test_groups_by_smallest_fitting_tier():
+    lengths = [70, 3, 40, 200, 5, 64]
+    groups = bucket_groups(lengths, [32, 64, 128])
+    assert groups == [[1, 4], [2, 5], [0], [3]]  # <=32, <=64, <=128, longer
+    assert bucket_groups(lengths, []) == [[1, 4, 2, 5, 0, 3]]
+
+
+def test_each_tier_is_padded_to_its_own_longest_text():
+    texts = ["a b", "a b c d e f g h i j", "a", "a b c d e f g h i j k l m n o p q r s t"]
+    padding_before = metrics.TOKENS.value("padding")
+    ids = tokenize(WhitespaceTokenizer(), texts, max_length=16)
+    batches = list(pad_bucketed(ids, buckets=[4, 16], pad_id=0))
+    assert [indices for indices, _, _ in batches] == [[2, 0], [1, 3]]
+    (_, short_ids, short_mask), (_, long_ids, long_mask) = batches
+    assert short_ids.shape == (2, 4) and long_ids.shape == (2, 16)  # last text truncated to 16
+    assert short_mask.tolist() == [[1, 1, 1, 0], [1, 1, 1, 1]]
+    assert long_mask[0].sum() == 12 and long_mask[1].sum() == 16
+    assert long_ids[0, 12:].tolist() == [0] * 4
+    # 1 padding token in the short tier + 4 in the long tier
+    assert metrics.TOKENS.value("padding") - padding_before == 5
+
+
+def test_only_texts_beyond_the_cap_count_as_truncated():
+    tokenizer = WhitespaceTokenizer()
+    before = metrics.TRUNCATED_TEXTS.value()
+    exact, longer = " ".join(["a"] * 6), " ".join(["a"] * 7)  # 8 and 9 tokens with [CLS]/[SEP]
+    ids = tokenize(tokenizer, [exact, longer], max_length=8)
+    assert ids[0] == tokenizer([exact])["input_ids"][0]
+    assert len(ids[1]) == 8 and ids[1][0] == 1 and ids[1][-1] == 2  # body cut, special tokens kept
+    assert metrics.TRUNCATED_TEXTS.value() == before + 1
+
+
+def test_windows_overlap_and_cover_the_whole_text():
+    tokenizer = WhitespaceTokenizer()
+    text = " ".join("x" * (i % 7 + 1) for i in range(20))
+    body = tokenizer([text], add_special_tokens=False)["input_ids"][0]
+    short, = window_ids(tokenizer, ["a bb"], max_length=8, stride=2, max_windows=10)
+    assert short == tokenize(tokenizer, ["a bb"], max_length=8)  # fits: same ids as without windows
+    windows, = window_ids(tokenizer, [text], max_length=8, stride=2, max_windows=10)
+    assert all(len(w) <= 8 and w[0] == 1 and w[-1] == 2 for w in windows)
+    assert windows[0][1:-1] == body[:6] and windows[-1][1:-1] == body[-6:]
+    assert windows[1][1:-1] == body[4:10]  # 6-token spans overlapping by 2
+    assert len(windows) == 5
+
+
+def test_window_budget_keeps_first_and_last_windows():
+    tokenizer = WhitespaceTokenizer()
+    text = " ".join(["word"] * 100)
+    exhausted_before = metrics.WINDOW_BUDGET_EXHAUSTED.value()
+    windows, = window_ids(tokenizer, [text], max_length=12, stride=2, max_windows=3)
+    assert len(windows) == 3
+    assert metrics.WINDOW_BUDGET_EXHAUSTED.value() == exhausted_before + 1
+    body = tokenizer([text], add_special_tokens=False)["input_ids"][0]
+    assert windows[0][1:-1] == body[:10] and windows[-1][1:-1] == body[-10:]
+
+
+if __name__ == "__main__":
+    test_parse_buckets_and_max_length()
+    test_groups_by_smallest_fitting_tier()
+    test_each_tier_is_padded_to_its_own_longest_text()
+    test_only_texts_beyond_the_cap_count_as_truncated()
+    test_windows_overlap_and_cover_the_whole_text()
+    test_window_budget_keeps_first_and_last_windows()
+    print("✅ All tokenization tests passed")
@@ -0,0 +1,128 @@
+"""
+tokenization.py
+
+Length-aware tokenization shared by the torch and ONNX embedders.
+
+Texts are tokenized once without padding, truncated to `max_length` tokens,
+then sorted by length and grouped into sequence-length tiers (e.g. <=32, <=64,
+<=128 tokens). Each tier is padded only to its own longest member and run as a
+separate forward pass, so a short complaint batched next to a long forwarded
+message is not padded to the long one. Attention cost grows quadratically with
+sequence length, so this keeps mixed-length batches cheap.
+
+Real vs padding token counts are recorded in metrics so the padding waste of
+the chosen tiers can be watched on /metrics.
+"""
+from __future__ import annotations
+
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+
+
+def parse_buckets(spec: str) -> List[int]:
+    """'32,64,128' -> [32, 64, 128]; empty -> [] (one group per call)."""
+    return sorted({int(part) for part in spec.split(",") if part.strip()})
+
+
+# assumed when the tokenizer does not know its model's limit (BERT-family encoders)
+DEFAULT_MODEL_MAX_LENGTH = 512
+
+
+def effective_max_length(tokenizer, max_length: int) -> int:
+    """
+    Cap max_length at what the model supports; max_length <= 0 means the model's
+    own limit (tokenizers report a huge sentinel when it is unknown).
+    """
+    model_max = getattr(tokenizer, "model_max_length", None) or 0
+    if model_max > 100_000:
+        model_max = 0
+    if max_length <= 0:
+        return model_max or DEFAULT_MODEL_MAX_LENGTH
+    return min(max_length, model_max) if model_max else max_length
+
+
+def bucket_groups(lengths: Sequence[int], buckets: Sequence[int]) -> List[List[int]]:
+    """
+    Group indices by the smallest tier that fits their length, shortest tier
+    first; lengths beyond the last tier share one final group.
+    """
+    groups: dict = {}
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        tier = next((b for b in buckets if lengths[i] <= b), None)
+        groups.setdefault(tier, []).append(i)
+    return [groups[t] for t in sorted(groups, key=lambda t: (t is None, t or 0))]
+
+
+def tokenize(tokenizer, texts: List[str], max_length: int) -> List[List[int]]:
+    """
+    Token ids per text (with special tokens), truncated to max_length, unpadded.
+    The body is cut before adding the special tokens, as the tokenizer's own
+    truncation does, so only texts that really exceed max_length count as truncated.
+    """
+    with metrics.PHASE_SECONDS.time("tokenize"):
+        bodies = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        span = max_length - tokenizer.num_special_tokens_to_add()
+        ids = [tokenizer.build_inputs_with_special_tokens(body[:span]) for body in bodies]
+    truncated = sum(1 for body in bodies if len(body) > span)
+    if truncated:
+        metrics.TRUNCATED_TEXTS.inc(amount=truncated)
+    return ids
+
+
+def pad_bucketed(ids: List[List[int]], buckets: Sequence[int],
+                 pad_id: int) -> Iterator[Tuple[List[int], np.ndarray, np.ndarray]]:
+    """
+    Yield (indices, input_ids, attention_mask) per length tier. Arrays are int64
+    and padded to the longest sequence of the tier; `indices` map rows back to `ids`.
+    """
+    lengths = [len(x) for x in ids]
+    for indices in bucket_groups(lengths, buckets):
+        width = max(lengths[i] for i in indices)
+        input_ids = np.full((len(indices), width), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(indices), width), dtype=np.int64)
+        for row, i in enumerate(indices):
+            input_ids[row, :lengths[i]] = ids[i]
+            attention_mask[row, :lengths[i]] = 1
+        metrics.FORWARD_SEQ_LENGTH.observe(width)
+        real = int(attention_mask.sum())
+        metrics.TOKENS.inc("real", amount=real)
+        metrics.TOKENS.inc("padding", amount=input_ids.size - real)
+        yield indices, input_ids, attention_mask
+
+
+def _window_starts(n_tokens: int, span: int, stride: int, max_windows: int) -> List[int]:
+    step = max(1, span - stride)
+    starts = list(range(0, n_tokens - span, step)) + [n_tokens - span]  # last window ends at the text end
+    if len(starts) <= max_windows:
+        return starts
+    metrics.WINDOW_BUDGET_EXHAUSTED.inc()
+    if max_windows == 1:
+        return starts[:1]
+    # keep the first and last window and spread the rest evenly in between
+    return [starts[round(i * (len(starts) - 1) / (max_windows - 1))] for i in range(max_windows)]
+
+
+def window_ids(tokenizer, texts: List[str], max_length: int, stride: int,
+               max_windows: int) -> List[List[List[int]]]:
+    """
+    Split each text into overlapping windows of at most max_length tokens
+    (special tokens included) that overlap by `stride` tokens. A text that fits
+    in one window gives exactly the ids tokenize() would. At most `max_windows`
+    windows are kept per text, bounding the worst-case cost of one request.
+    """
+    with metrics.PHASE_SECONDS.time("tokenize"):
+        bodies = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+    span = max_length - tokenizer.num_special_tokens_to_add()
+    result = []
+    for body in bodies:
+        if len(body) <= span:
+            windows = [tokenizer.build_inputs_with_special_tokens(body)]
+        else:
+            windows = [tokenizer.build_inputs_with_special_tokens(body[start:start + span])
+                       for start in _window_starts(len(body), span, min(stride, span - 1), max(1, max_windows))]
+        metrics.WINDOWS_PER_TEXT.observe(len(windows))
+        result.append(windows)
+    return result